@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark del camino de recepción síncrono (recv_message_sync).
+
+Compara, para mensajes de 1 a 50 MB enviados por un socketpair:
+  - concat: la versión original, que arma el cuerpo con data += chunk
+  - recv_into: buffer preasignado + memoryview + sock.recv_into
+
+Uso (dentro de TP_2):
+    python -m benchmarks.bench_recv --sizes 1,5,10,25,50
+"""
+import argparse
+import json
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from common.protocol import PROTOCOL_V2, encode_message, recv_message_sync
+
+
+def _recvall_concat(sock, n: int) -> bytes:
+    # Implementación original de common/protocol.py (copia cuadrática)
+    data = b""
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def _recv_concat(sock) -> Any:
+    # Mismo framing v2 que recv_message_sync, pero leyendo con concatenación
+    from common.protocol import _ATTACHMENT_STRUCT, _V2_HEADER_STRUCT, _restore_attachments
+    from common.serialization import get_codec_by_id
+
+    _, codec_id, n_attachments, length = _V2_HEADER_STRUCT.unpack(
+        _recvall_concat(sock, _V2_HEADER_STRUCT.size)
+    )
+    body = _recvall_concat(sock, length)
+    attachments = []
+    for _ in range(n_attachments):
+        (att_length,) = _ATTACHMENT_STRUCT.unpack(_recvall_concat(sock, _ATTACHMENT_STRUCT.size))
+        attachments.append(_recvall_concat(sock, att_length))
+    return _restore_attachments(get_codec_by_id(codec_id).loads(body), attachments)
+
+
+def _measure(receiver: Callable[[socket.socket], Any], frame: List[bytes], repeat: int) -> float:
+    a, b = socket.socketpair()
+    try:
+        def sender() -> None:
+            for _ in range(repeat):
+                for buf in frame:
+                    a.sendall(buf)
+
+        thread = threading.Thread(target=sender)
+        start = time.perf_counter()
+        thread.start()
+        for _ in range(repeat):
+            receiver(b)
+        elapsed = time.perf_counter() - start
+        thread.join()
+        return elapsed / repeat
+    finally:
+        a.close()
+        b.close()
+
+
+def run(sizes_mb: List[float], repeat: int) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for size_mb in sizes_mb:
+        payload = {"status": "success", "screenshot": bytes(int(size_mb * 1024 * 1024))}
+        frame = encode_message(payload, PROTOCOL_V2)
+
+        concat_s = _measure(_recv_concat, frame, repeat)
+        into_s = _measure(
+            lambda sock: recv_message_sync(sock, PROTOCOL_V2, max_size=1 << 30),
+            frame,
+            repeat,
+        )
+        results.append({
+            "size_mb": size_mb,
+            "concat_ms": round(concat_s * 1000, 2),
+            "recv_into_ms": round(into_s * 1000, 2),
+            "speedup": round(concat_s / into_s, 2),
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de recepción de mensajes grandes")
+    parser.add_argument(
+        "--sizes",
+        default="1,5,10,25,50",
+        help="Tamaños en MB separados por coma (default: 1,5,10,25,50)",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Imprimir resultados como JSON")
+    args = parser.parse_args()
+
+    sizes = [float(s) for s in args.sizes.split(",") if s.strip()]
+    results = run(sizes, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'MB':>6} {'concat ms':>11} {'recv_into ms':>13} {'speedup':>8}")
+    for r in results:
+        print(f"{r['size_mb']:>6} {r['concat_ms']:>11} {r['recv_into_ms']:>13} {r['speedup']:>8}")
+
+
+if __name__ == "__main__":
+    main()
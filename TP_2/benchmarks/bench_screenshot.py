@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark de generate_dummy_screenshot.
+
+Compara renders por segundo de:
+  - scratch: la versión original (canvas nuevo + fuente + texto completo)
+  - template: copia de la plantilla precalentada + solo la línea de la URL
+
+Opcionalmente incluye el encoding PNG para ver el costo total del render.
+
+Uso (dentro de TP_2):
+    python -m benchmarks.bench_screenshot -n 500 [--encode]
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from PIL import Image, ImageDraw
+
+from processor.screenshot import generate_dummy_screenshot, image_to_bytes, warm_up
+
+
+def _render_scratch(url: str) -> Image.Image:
+    # Implementación original de processor/screenshot.py
+    img = Image.new("RGB", (800, 600), color=(255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    draw.text((20, 20), f"Screenshot of:\n{url}", fill=(0, 0, 0))
+    return img
+
+
+def _measure(render: Callable[[str], Image.Image], iterations: int, encode: bool) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        img = render(f"https://example.com/page/{i}?q=benchmark")
+        if encode:
+            image_to_bytes(img)
+    return time.perf_counter() - start
+
+
+def run(iterations: int, encode: bool) -> List[Dict[str, Any]]:
+    warm_up()
+    results: List[Dict[str, Any]] = []
+    for name, render in (("scratch", _render_scratch), ("template", generate_dummy_screenshot)):
+        elapsed = _measure(render, iterations, encode)
+        results.append({
+            "variant": name,
+            "renders_per_sec": round(iterations / elapsed, 1),
+            "ms_per_render": round(elapsed / iterations * 1000, 3),
+        })
+    results[1]["speedup"] = round(
+        results[1]["renders_per_sec"] / results[0]["renders_per_sec"], 2
+    )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark del render de screenshots")
+    parser.add_argument("-n", "--iterations", type=int, default=500)
+    parser.add_argument(
+        "--encode",
+        action="store_true",
+        help="Incluir el encoding PNG en cada iteración",
+    )
+    parser.add_argument("--json", action="store_true", help="Imprimir resultados como JSON")
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.encode)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'variante':>10} {'renders/s':>11} {'ms/render':>10}")
+    for r in results:
+        print(f"{r['variant']:>10} {r['renders_per_sec']:>11} {r['ms_per_render']:>10}")
+    print(f"speedup: {results[1]['speedup']}x")
+
+
+if __name__ == "__main__":
+    main()
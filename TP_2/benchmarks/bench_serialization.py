@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de serialización de los mensajes entre servidores.
+
+Compara, sobre una respuesta representativa del Servidor B (screenshot +
+thumbnails + métricas de performance):
+  - v1: JSON con imágenes en base64 (formato original)
+  - v2: header con cada codec instalado (json / orjson / msgpack) + adjuntos
+
+Uso (dentro de TP_2):
+    python -m benchmarks.bench_serialization -n 200
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from common.protocol import PROTOCOL_V1, PROTOCOL_V2, decode_message, encode_message
+from common.serialization import available_codecs
+
+
+def build_payload() -> Dict[str, Any]:
+    """
+    Arma una respuesta como la que devuelve el Servidor B. Si Pillow está
+    instalado se usan imágenes reales; si no, bytes de tamaño similar.
+    """
+    try:
+        from processor.image_processor import create_thumbnails
+        from processor.screenshot import generate_dummy_screenshot, image_to_bytes
+
+        img = generate_dummy_screenshot("https://example.com/una/ruta/de/prueba?q=1")
+        screenshot = image_to_bytes(img)
+        thumbnails = create_thumbnails(img)
+    except ImportError:
+        screenshot = bytes(range(256)) * 40
+        thumbnails = [bytes(range(256)) * 12, bytes(range(256)) * 4]
+
+    return {
+        "status": "success",
+        "request_id": 12345,
+        "screenshot": screenshot,
+        "thumbnails": thumbnails,
+        "performance": {
+            "load_time_ms": 231,
+            "total_size_kb": 1234.56,
+            "num_requests": 1,
+        },
+    }
+
+
+def _timeit(func: Callable[[], Any], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return time.perf_counter() - start
+
+
+def run(iterations: int) -> List[Dict[str, Any]]:
+    payload = build_payload()
+    variants = [("v1", PROTOCOL_V1, "json")]
+    variants += [(f"v2/{codec}", PROTOCOL_V2, codec) for codec in available_codecs()]
+
+    results: List[Dict[str, Any]] = []
+    for label, version, codec in variants:
+        frame = b"".join(encode_message(payload, version, codec))
+
+        encode_s = _timeit(lambda: b"".join(encode_message(payload, version, codec)), iterations)
+        decode_s = _timeit(lambda: decode_message(frame, version), iterations)
+
+        results.append({
+            "variant": label,
+            "bytes": len(frame),
+            "encode_msgs_per_s": round(iterations / encode_s, 1),
+            "decode_msgs_per_s": round(iterations / decode_s, 1),
+            "encode_mb_per_s": round(len(frame) * iterations / encode_s / 1e6, 1),
+            "decode_mb_per_s": round(len(frame) * iterations / decode_s / 1e6, 1),
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de serialización del protocolo")
+    parser.add_argument("-n", "--iterations", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="Imprimir resultados como JSON")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'variante':<12} {'bytes':>9} {'enc msg/s':>11} {'dec msg/s':>11} {'enc MB/s':>9} {'dec MB/s':>9}")
+    for r in results:
+        print(f"{r['variant']:<12} {r['bytes']:>9} {r['encode_msgs_per_s']:>11} "
+              f"{r['decode_msgs_per_s']:>11} {r['encode_mb_per_s']:>9} {r['decode_mb_per_s']:>9}")
+
+
+if __name__ == "__main__":
+    main()
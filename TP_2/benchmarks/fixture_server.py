@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Servidor HTTP local con páginas sintéticas para los benchmarks de carga.
+
+Rutas:
+  /page/<id>       HTML de tamaño y cantidad de links/imágenes configurables
+  /static/<name>   sub-recursos (imágenes) de tamaño fijo
+
+Uso (dentro de TP_2):
+    python -m benchmarks.fixture_server -p 8800 --page-kb 64 --links 50 --images 5
+"""
+import argparse
+import asyncio
+import functools
+
+from aiohttp import web
+
+
+def build_page(page_id: str, page_kb: int, links: int, images: int) -> bytes:
+    """
+    Arma una página determinística con título, meta tags, headers, links,
+    imágenes y párrafos de relleno hasta llegar a ~page_kb KB.
+    """
+    parts = [
+        "<!DOCTYPE html><html><head>",
+        f"<title>Página sintética {page_id}</title>",
+        '<meta charset="utf-8">',
+        '<meta name="description" content="Página sintética para pruebas de carga">',
+        '<meta name="keywords" content="benchmark, scraping, carga">',
+        f'<meta property="og:title" content="Página {page_id}">',
+        "</head><body>",
+        f"<h1>Página {page_id}</h1>",
+    ]
+    for i in range(links):
+        parts.append(f'<a href="/page/{page_id}-{i}">Link {i}</a>')
+    for i in range(images):
+        parts.append(f'<img src="/static/img-{i}.png" alt="imagen {i}">')
+
+    paragraph = (
+        "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do "
+        "eiusmod tempor incididunt ut labore et dolore magna aliqua.</p>"
+    )
+    size = sum(len(p) for p in parts)
+    target = page_kb * 1024
+    section = 0
+    while size < target:
+        if section % 20 == 0:
+            heading = f"<h2>Sección {section // 20}</h2>"
+            parts.append(heading)
+            size += len(heading)
+        parts.append(paragraph)
+        size += len(paragraph)
+        section += 1
+
+    parts.append("</body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def create_app(
+    page_kb: int = 32,
+    links: int = 20,
+    images: int = 5,
+    asset_kb: int = 2,
+    delay_ms: float = 0,
+) -> web.Application:
+    app = web.Application()
+    render = functools.lru_cache(maxsize=4096)(
+        lambda page_id: build_page(page_id, page_kb, links, images)
+    )
+    asset = b"\x89PNG\r\n\x1a\n" + bytes(max(asset_kb * 1024 - 8, 0))
+    delay = delay_ms / 1000
+
+    async def page(request: web.Request) -> web.Response:
+        if delay:
+            await asyncio.sleep(delay)
+        return web.Response(
+            body=render(request.match_info["page_id"]),
+            content_type="text/html",
+            charset="utf-8",
+        )
+
+    async def static(request: web.Request) -> web.Response:
+        if delay:
+            await asyncio.sleep(delay)
+        return web.Response(body=asset, content_type="image/png")
+
+    app.router.add_get("/page/{page_id}", page)
+    app.router.add_get("/static/{name}", static)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor de páginas sintéticas")
+    parser.add_argument("-i", "--ip", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, default=8800)
+    parser.add_argument("--page-kb", type=int, default=32, help="Tamaño de cada página (default: 32)")
+    parser.add_argument("--links", type=int, default=20, help="Links por página (default: 20)")
+    parser.add_argument("--images", type=int, default=5, help="Imágenes por página (default: 5)")
+    parser.add_argument("--asset-kb", type=int, default=2, help="Tamaño de cada imagen (default: 2)")
+    parser.add_argument(
+        "--delay-ms",
+        type=float,
+        default=0,
+        help="Latencia artificial por respuesta, en ms (default: 0)",
+    )
+    args = parser.parse_args()
+
+    app = create_app(args.page_kb, args.links, args.images, args.asset_kb, args.delay_ms)
+    web.run_app(app, host=args.ip, port=args.port, print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
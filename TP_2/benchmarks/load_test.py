@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del pipeline completo (Servidor A + Servidor B).
+
+Levanta como subprocesos:
+  - el servidor de páginas sintéticas (benchmarks.fixture_server)
+  - server_processing.py (Servidor B)
+  - server_scraping.py (Servidor A)
+y los ataca con un generador de carga asíncrono (aiohttp) con la
+concurrencia indicada. Al final imprime un reporte JSON con throughput,
+latencias p50/p95/p99 y tasa de errores, más las métricas de ambos
+servidores.
+
+Uso (dentro de TP_2):
+    python -m benchmarks.load_test -n 500 -c 32 --page-kb 64 --links 50
+    python -m benchmarks.load_test -n 500 -c 32 \\
+        --processing-args "--engine asyncio -n 4" \\
+        --scraping-args "--parser-backend stream -w 16"
+    # contra un Servidor A que ya está corriendo (no levanta nada)
+    python -m benchmarks.load_test --target http://127.0.0.1:8000 \\
+        --fixture-url http://127.0.0.1:8800
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiohttp
+
+from common.protocol import recv_message_sync, send_message_sync
+
+
+TP2_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, proc: subprocess.Popen, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"El proceso {proc.args} terminó al arrancar (código {proc.returncode})")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Timeout esperando el puerto {port} de {proc.args}")
+
+
+def _start(args: Sequence[str], log_path: Optional[str]) -> subprocess.Popen:
+    # Sesión propia: al terminar se mata el grupo completo, incluidos los
+    # hijos del pool de procesos (que heredan el socket de escucha)
+    log = open(log_path, "ab") if log_path else subprocess.DEVNULL
+    return subprocess.Popen(
+        [sys.executable, *args],
+        cwd=TP2_DIR,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+        start_new_session=True,
+    )
+
+
+def _stop(proc: subprocess.Popen) -> None:
+    if proc.poll() is not None:
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> Optional[float]:
+    """
+    Percentil por rango más cercano sobre una lista ya ordenada.
+    """
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(q * len(sorted_values) / 100) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class LoadStats:
+    def __init__(self) -> None:
+        self.latencies_ms: List[float] = []
+        self.status_codes: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.partial = 0
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies_ms)
+        total = sum(self.status_codes.values()) + sum(self.errors.values())
+        failed = sum(self.errors.values()) + sum(
+            count for code, count in self.status_codes.items() if code != 200
+        )
+
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return round(value, 2) if value is not None else None
+
+        return {
+            "requests": total,
+            "duration_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 2) if elapsed > 0 else None,
+            "latency_ms": {
+                "min": rounded(latencies[0] if latencies else None),
+                "mean": rounded(sum(latencies) / len(latencies) if latencies else None),
+                "p50": rounded(percentile(latencies, 50)),
+                "p95": rounded(percentile(latencies, 95)),
+                "p99": rounded(percentile(latencies, 99)),
+                "max": rounded(latencies[-1] if latencies else None),
+            },
+            "errors": failed,
+            "error_rate": round(failed / total, 4) if total else 0.0,
+            # 200 pero sin processing_data (el Servidor B falló o no respondió)
+            "partial": self.partial,
+            "status_codes": {str(code): count for code, count in sorted(self.status_codes.items())},
+            "exceptions": dict(self.errors),
+        }
+
+
+async def _one_request(
+    session: aiohttp.ClientSession,
+    target: str,
+    url: str,
+    stats: LoadStats,
+) -> None:
+    start = time.perf_counter()
+    try:
+        async with session.get(f"{target}/scrape", params={"url": url}) as resp:
+            body = await resp.read()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            stats.status_codes[resp.status] += 1
+            stats.latencies_ms.append(elapsed_ms)
+            if resp.status == 200 and json.loads(body).get("processing_data") is None:
+                stats.partial += 1
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        stats.errors[type(e).__name__] += 1
+
+
+async def run_load(
+    target: str,
+    fixture_url: str,
+    requests: int,
+    concurrency: int,
+    url_pool: int,
+    timeout: float,
+    warmup: int = 0,
+) -> Dict[str, Any]:
+    """
+    Lanza 'requests' pedidos a /scrape con 'concurrency' en vuelo a la vez.
+    url_pool > 0 repite ese número de URLs distintas (ejercita cache y
+    single-flight); 0 usa una URL distinta por pedido.
+    """
+    def url_for(i: int) -> str:
+        page_id = i % url_pool if url_pool > 0 else i
+        return f"{fixture_url}/page/{page_id}"
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        if warmup:
+            warm_stats = LoadStats()
+            await asyncio.gather(*[
+                _one_request(session, target, f"{fixture_url}/page/warmup-{i}", warm_stats)
+                for i in range(warmup)
+            ])
+
+        stats = LoadStats()
+        counter = itertools.count()
+
+        async def worker() -> None:
+            while True:
+                i = next(counter)
+                if i >= requests:
+                    return
+                await _one_request(session, target, url_for(i), stats)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+        report = stats.report(elapsed)
+        report["server_metrics"] = {"scraping": await _scraping_metrics(session, target)}
+        return report
+
+
+async def _scraping_metrics(session: aiohttp.ClientSession, target: str) -> Any:
+    try:
+        async with session.get(f"{target}/metrics", params={"format": "json"}) as resp:
+            return await resp.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        return None
+
+
+def _processing_metrics(port: int) -> Any:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+            send_message_sync(sock, {"command": "stats"})
+            reply = recv_message_sync(sock)
+            return reply.get("metrics") if isinstance(reply, dict) else None
+    except (OSError, ValueError):
+        return None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Prueba de carga del pipeline de scraping")
+    parser.add_argument("-n", "--requests", type=int, default=200, help="Pedidos a /scrape (default: 200)")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="Pedidos en vuelo (default: 16)")
+    parser.add_argument("--warmup", type=int, default=4, help="Pedidos de calentamiento (default: 4)")
+    parser.add_argument(
+        "--url-pool",
+        type=int,
+        default=0,
+        help="Cantidad de URLs distintas a repetir (0 = una por pedido, default: 0)",
+    )
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout por pedido en s (default: 60)")
+    parser.add_argument("--page-kb", type=int, default=32, help="Tamaño de las páginas (default: 32)")
+    parser.add_argument("--links", type=int, default=20, help="Links por página (default: 20)")
+    parser.add_argument("--images", type=int, default=5, help="Imágenes por página (default: 5)")
+    parser.add_argument("--delay-ms", type=float, default=0, help="Latencia del fixture en ms (default: 0)")
+    parser.add_argument(
+        "--processing-args",
+        default="",
+        help='Argumentos extra para server_processing.py (ej: "--engine asyncio -n 4")',
+    )
+    parser.add_argument(
+        "--scraping-args",
+        default="",
+        help='Argumentos extra para server_scraping.py (ej: "-w 16 --parser-backend stream")',
+    )
+    parser.add_argument(
+        "--target",
+        default=None,
+        help="URL de un Servidor A ya levantado (no se levanta ningún servidor)",
+    )
+    parser.add_argument(
+        "--fixture-url",
+        default=None,
+        help="Con --target: URL base de un fixture_server ya levantado",
+    )
+    parser.add_argument("--log-dir", default=None, help="Guardar la salida de cada servidor acá")
+    parser.add_argument("-o", "--output", default=None, help="Escribir el reporte JSON en este archivo")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    config = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "url_pool": args.url_pool,
+        "page_kb": args.page_kb,
+        "links": args.links,
+        "images": args.images,
+        "delay_ms": args.delay_ms,
+        "processing_args": args.processing_args,
+        "scraping_args": args.scraping_args,
+    }
+
+    processes: List[subprocess.Popen] = []
+    processing_port: Optional[int] = None
+
+    def log_path(name: str) -> Optional[str]:
+        return os.path.join(args.log_dir, f"{name}.log") if args.log_dir else None
+
+    try:
+        if args.target:
+            if not args.fixture_url:
+                raise SystemExit("--target requiere --fixture-url")
+            target, fixture_url = args.target.rstrip("/"), args.fixture_url.rstrip("/")
+        else:
+            fixture_port, processing_port, scraping_port = _free_port(), _free_port(), _free_port()
+            fixture = _start([
+                "-m", "benchmarks.fixture_server", "-p", str(fixture_port),
+                "--page-kb", str(args.page_kb), "--links", str(args.links),
+                "--images", str(args.images), "--delay-ms", str(args.delay_ms),
+            ], log_path("fixture"))
+            processes.append(fixture)
+            processing = _start([
+                "server_processing.py", "-i", "127.0.0.1", "-p", str(processing_port),
+                *shlex.split(args.processing_args),
+            ], log_path("processing"))
+            processes.append(processing)
+            _wait_for_port(fixture_port, fixture)
+            _wait_for_port(processing_port, processing)
+
+            scraping = _start([
+                "server_scraping.py", "-i", "127.0.0.1", "-p", str(scraping_port),
+                "--processing-ip", "127.0.0.1", "--processing-port", str(processing_port),
+                *shlex.split(args.scraping_args),
+            ], log_path("scraping"))
+            processes.append(scraping)
+            _wait_for_port(scraping_port, scraping)
+
+            target = f"http://127.0.0.1:{scraping_port}"
+            fixture_url = f"http://127.0.0.1:{fixture_port}"
+
+        report = asyncio.run(run_load(
+            target,
+            fixture_url,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            url_pool=args.url_pool,
+            timeout=args.timeout,
+            warmup=args.warmup,
+        ))
+        if processing_port is not None:
+            report["server_metrics"]["processing"] = _processing_metrics(processing_port)
+    finally:
+        for proc in reversed(processes):
+            _stop(proc)
+
+    report = {"config": config, **report}
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
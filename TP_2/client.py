@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import argparse
 import json
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import requests
 
@@ -23,18 +23,85 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "url",
+        nargs="?",
         help="URL a analizar (ej: https://example.com)",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "-b", "--batch",
+        metavar="ARCHIVO",
+        help="Archivo con una URL por línea; se envía a /scrape/batch "
+             "y se muestran los resultados a medida que llegan",
+    )
+    parser.add_argument(
+        "-f", "--fields",
+        help="Campos a pedir, separados por coma (scraping_data, screenshot, "
+             "thumbnails, performance; default: todos)",
+    )
+    args = parser.parse_args()
+    if not args.url and not args.batch:
+        parser.error("Indicar una URL o un archivo con --batch")
+    return args
+
+
+def _iter_batch_body(path: str):
+    """
+    Lee el archivo de URLs de a una línea, así el body se sube en
+    streaming sin cargar toda la lista en memoria.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            url = line.strip()
+            if url and not url.startswith("#"):
+                yield (json.dumps({"url": url}) + "\n").encode("utf-8")
+
+
+def run_batch(base_url: str, path: str, fields: Optional[str] = None) -> None:
+    endpoint = f"{base_url}/scrape/batch"
+    print(f"[CLIENT] Enviando batch al servidor A: {path}")
+
+    ok = errors = 0
+    try:
+        with requests.post(
+            endpoint,
+            data=_iter_batch_body(path),
+            headers={"Content-Type": "application/x-ndjson"},
+            params={"fields": fields} if fields else None,
+            stream=True,
+            timeout=60,
+        ) as resp:
+            print(f"[CLIENT] Código de respuesta HTTP: {resp.status_code}")
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("status") == "success":
+                    ok += 1
+                    title = (data.get("scraping_data") or {}).get("title")
+                    print(f"[OK]    {data.get('url')} -> {title}")
+                else:
+                    errors += 1
+                    print(f"[ERROR] {data.get('url')} -> {data.get('error')}")
+    except Exception as e:
+        print(f"[CLIENT] Error de red al conectar con el servidor A: {e}")
+        return
+
+    print(f"\n[CLIENT] Batch terminado: {ok} OK, {errors} con error")
 
 
 def main() -> None:
     args = parse_args()
 
     base_url = f"http://{args.ip}:{args.port}"
+
+    if args.batch:
+        run_batch(base_url, args.batch, args.fields)
+        return
+
     endpoint = f"{base_url}/scrape"
 
     params = {"url": args.url}
+    if args.fields:
+        params["fields"] = args.fields
 
     print(f"[CLIENT] Enviando URL al servidor A: {args.url}")
     try:
@@ -71,6 +138,8 @@ def main() -> None:
     print(f"Tiempo de carga (ms): {perf.get('load_time_ms')}")
     print(f"Tamaño total (KB): {perf.get('total_size_kb')}")
     print(f"Número de requests: {perf.get('num_requests')}")
+    if perf.get("ttfb_ms") is not None:
+        print(f"TTFB del documento (ms): {perf.get('ttfb_ms')}")
 
     # Avisar si vino screenshot
     screenshot = processing.get("screenshot")
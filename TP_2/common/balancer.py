@@ -0,0 +1,301 @@
+import asyncio
+import bisect
+import hashlib
+import itertools
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .connection_pool import ProcessingConnectionPool
+from .metrics import MetricsRegistry
+
+
+STRATEGIES = ("least-outstanding", "consistent-hash")
+
+# Nodos virtuales por backend en el anillo de hashing
+VIRTUAL_NODES = 100
+
+
+def parse_backends(value: str) -> List[Tuple[str, int]]:
+    """
+    Convierte "10.0.0.1:9000,[::1]:9001" en [("10.0.0.1", 9000), ("::1", 9001)].
+    """
+    backends: List[Tuple[str, int]] = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if item.startswith("["):
+            host, sep, port = item[1:].partition("]:")
+        else:
+            host, sep, port = item.rpartition(":")
+        if not sep or not host or not port.isdigit():
+            raise ValueError(f"Backend inválido: {item!r} (se espera host:puerto)")
+        backends.append((host, int(port)))
+    if not backends:
+        raise ValueError("Hay que indicar al menos un backend")
+    return backends
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class Backend:
+    """
+    Un Servidor B: su pool de conexiones más el estado de salud y las
+    estadísticas de latencia que usa el balanceador.
+    """
+
+    def __init__(self, host: str, port: int, pool: ProcessingConnectionPool) -> None:
+        self.host = host
+        self.port = port
+        self.name = f"[{host}]:{port}" if ":" in host else f"{host}:{port}"
+        self.pool = pool
+        self.healthy = True
+        # Fallas seguidas de pedidos reales y de probes, por separado: un
+        # ping que responde no borra las fallas de los pedidos
+        self.consecutive_failures = 0
+        self.probe_failures = 0
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+        self.last_ms: Optional[float] = None
+        self.avg_ms: Optional[float] = None
+
+    def record_success(self, elapsed_ms: float) -> None:
+        self.requests += 1
+        self.consecutive_failures = 0
+        self.last_ms = elapsed_ms
+        # Promedio móvil exponencial: sigue los cambios sin guardar historia
+        self.avg_ms = elapsed_ms if self.avg_ms is None else 0.8 * self.avg_ms + 0.2 * elapsed_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "connections": self.pool.size,
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "probe_failures": self.probe_failures,
+            "ejections": self.ejections,
+            "last_ms": round(self.last_ms, 2) if self.last_ms is not None else None,
+            "avg_ms": round(self.avg_ms, 2) if self.avg_ms is not None else None,
+        }
+
+
+class ProcessingBalancer:
+    """
+    Reparte los pedidos entre varios Servidores B:
+      - least-outstanding: el backend sano con menos pedidos en vuelo
+      - consistent-hash: siempre el mismo backend para la misma clave (URL
+        normalizada), así el cache de cada nodo se mantiene caliente; si
+        el nodo está caído se usa el siguiente del anillo y solo se mueven
+        las claves de ese nodo
+
+    Un backend se expulsa tras 'max_failures' errores de conexión seguidos
+    en pedidos, o tras 'max_failures' probes seguidos (comando "ping")
+    sin respuesta válida, y se readmite cuando un probe vuelve a responder. Las
+    fallas de pedidos solo se reinician con un pedido exitoso: un backend
+    que responde pings pero falla los pedidos reales vuelve a salir de
+    rotación en su siguiente falla. Si no queda ninguno sano se prueba
+    con todos antes de fallar.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[Tuple[str, int]],
+        strategy: str = "least-outstanding",
+        pool_size: int = 4,
+        codecs: Optional[Sequence[str]] = None,
+        probe_interval: float = 5.0,
+        probe_timeout: float = 2.0,
+        max_failures: int = 3,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Estrategia desconocida: {strategy!r}")
+        if not backends:
+            raise ValueError("Hay que indicar al menos un backend")
+        self.strategy = strategy
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.max_failures = max_failures
+        self.backends = [
+            Backend(host, port, ProcessingConnectionPool(
+                host=host,
+                port=port,
+                max_size=pool_size,
+                codecs=codecs,
+            ))
+            for host, port in backends
+        ]
+        self._ring: List[Tuple[int, int]] = sorted(
+            (_hash(f"{backend.name}#{i}"), index)
+            for index, backend in enumerate(self.backends)
+            for i in range(VIRTUAL_NODES)
+        )
+        self._ring_keys = [point for point, _ in self._ring]
+        self._rotation = itertools.count()
+        self._probe_task: Optional[asyncio.Task] = None
+
+        self._latency = None
+        self._requests_total = None
+        if metrics is not None:
+            self._register_metrics(metrics)
+
+    def _register_metrics(self, metrics: MetricsRegistry) -> None:
+        self._latency = metrics.histogram(
+            "backend_seconds",
+            "Latencia de los pedidos a cada Servidor B, en segundos",
+            ("backend",),
+        )
+        self._requests_total = metrics.counter(
+            "backend_requests_total",
+            "Pedidos a cada Servidor B según resultado",
+            ("backend", "outcome"),
+        )
+        healthy = metrics.gauge(
+            "backend_healthy",
+            "1 si el Servidor B está en rotación, 0 si fue expulsado",
+            ("backend",),
+        )
+        for backend in self.backends:
+            healthy.set_function(lambda b=backend: 1 if b.healthy else 0, backend=backend.name)
+
+    # Compatibilidad con ProcessingConnectionPool (métricas y /health)
+
+    @property
+    def size(self) -> int:
+        return sum(backend.pool.size for backend in self.backends)
+
+    @property
+    def in_flight(self) -> int:
+        return sum(backend.outstanding for backend in self.backends)
+
+    # Selección de backend
+
+    def _candidates(self, key: Optional[str]) -> List[Backend]:
+        """
+        Backends en orden de preferencia para este pedido.
+        """
+        healthy = [b for b in self.backends if b.healthy] or list(self.backends)
+
+        if self.strategy == "consistent-hash" and key is not None:
+            allowed = set(map(id, healthy))
+            ordered: List[Backend] = []
+            start = bisect.bisect(self._ring_keys, _hash(key))
+            for offset in range(len(self._ring)):
+                backend = self.backends[self._ring[(start + offset) % len(self._ring)][1]]
+                if id(backend) in allowed and backend not in ordered:
+                    ordered.append(backend)
+                    if len(ordered) == len(healthy):
+                        break
+            return ordered
+
+        # least-outstanding; a igual carga se rota para no cargar siempre al primero
+        shift = next(self._rotation) % len(healthy)
+        rotated = healthy[shift:] + healthy[:shift]
+        return sorted(rotated, key=lambda b: b.outstanding)
+
+    async def request(self, payload: Dict[str, Any], key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Envía el payload al backend elegido; si falla la conexión se
+        intenta con el siguiente candidato.
+        """
+        last_error: Optional[Exception] = None
+        for backend in self._candidates(key):
+            backend.outstanding += 1
+            start = time.perf_counter()
+            try:
+                response = await backend.pool.request(payload)
+            except ConnectionError as e:
+                last_error = e
+                self._record_failure(backend)
+                continue
+            finally:
+                backend.outstanding -= 1
+
+            elapsed = time.perf_counter() - start
+            backend.record_success(elapsed * 1000)
+            if self._latency is not None:
+                self._latency.observe(elapsed, backend=backend.name)
+                self._requests_total.inc(backend=backend.name, outcome="success")
+            return response
+
+        assert last_error is not None
+        raise last_error
+
+    def _record_failure(self, backend: Backend) -> None:
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        if self._requests_total is not None:
+            self._requests_total.inc(backend=backend.name, outcome="error")
+        if backend.consecutive_failures >= self.max_failures:
+            self._eject(backend, f"{backend.consecutive_failures} pedidos fallidos seguidos")
+
+    def _record_probe_failure(self, backend: Backend) -> None:
+        backend.probe_failures += 1
+        if backend.probe_failures >= self.max_failures:
+            self._eject(backend, f"{backend.probe_failures} pings fallidos seguidos")
+
+    def _eject(self, backend: Backend, reason: str) -> None:
+        if backend.healthy:
+            backend.healthy = False
+            backend.ejections += 1
+            print(f"[Balancer] Backend {backend.name} expulsado ({reason})")
+
+    # Health checks
+
+    async def probe(self, backend: Backend) -> bool:
+        try:
+            reply = await asyncio.wait_for(
+                backend.pool.request({"command": "ping"}),
+                timeout=self.probe_timeout,
+            )
+        except (ConnectionError, asyncio.TimeoutError):
+            self._record_probe_failure(backend)
+            return False
+
+        # Un Servidor B viejo sin "ping" igual responde un objeto (con
+        # "Comando desconocido"): está vivo. Cualquier otra cosa no es un
+        # Servidor B sano y cuenta como probe fallido.
+        if not isinstance(reply, dict):
+            self._record_probe_failure(backend)
+            return False
+        backend.probe_failures = 0
+        if not backend.healthy:
+            backend.healthy = True
+            print(f"[Balancer] Backend {backend.name} readmitido")
+        return True
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            await asyncio.gather(
+                *(self.probe(backend) for backend in self.backends),
+                return_exceptions=True,
+            )
+
+    def start(self) -> None:
+        if self._probe_task is None and self.probe_interval > 0:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "backends": [backend.snapshot() for backend in self.backends],
+        }
+
+    async def close(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+        for backend in self.backends:
+            await backend.pool.close()
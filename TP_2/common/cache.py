@@ -0,0 +1,231 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estima cuántos bytes ocupa un valor cacheado.
+    Para bytes/str se usa su largo; para el resto, el tamaño en JSON.
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value) + 8 * len(value)
+    return len(json.dumps(value, default=str))
+
+
+class ByteLRUCache:
+    """
+    Cache LRU en memoria acotado por bytes (no por cantidad de entradas).
+    Cada entrada tiene su propio TTL. Es thread-safe.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    @property
+    def current_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            value, expires_at, size = entry
+            if expires_at <= now:
+                del self._data[key]
+                self._bytes -= size
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: float, size: Optional[int] = None) -> bool:
+        """
+        Guarda un valor. Devuelve False si no entra en el cache
+        (más grande que max_bytes o TTL no positivo).
+        """
+        if size is None:
+            size = estimate_size(value)
+        if ttl <= 0 or size > self.max_bytes:
+            return False
+
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            self._data[key] = (value, time.time() + ttl, size)
+            self._bytes += size
+
+            # Desalojar lo menos usado hasta volver al límite
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.stats["evictions"] += 1
+        return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+
+def _encode_for_disk(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, list):
+        return [_encode_for_disk(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _encode_for_disk(v) for k, v in value.items()}
+    return value
+
+
+def _decode_from_disk(value: Any) -> Any:
+    if isinstance(value, dict):
+        if set(value) == {"__bytes__"}:
+            return base64.b64decode(value["__bytes__"])
+        return {k: _decode_from_disk(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode_from_disk(v) for v in value]
+    return value
+
+
+class DiskCache:
+    """
+    Segundo nivel de cache en disco: un archivo JSON por clave
+    (nombre = sha256 de la clave) con su fecha de expiración.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0}
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Devuelve (valor, ttl_restante) o None si no existe o expiró.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.stats["misses"] += 1
+            return None
+
+        remaining = entry.get("expires_at", 0) - time.time()
+        if entry.get("key") != key or remaining <= 0:
+            self.stats["misses"] += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        self.stats["hits"] += 1
+        return _decode_from_disk(entry.get("value")), remaining
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        entry = {
+            "key": key,
+            "expires_at": time.time() + ttl,
+            "value": _encode_for_disk(value),
+        }
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            # Reemplazo atómico para que otro lector no vea un archivo a medias
+            os.replace(tmp_path, path)
+            self.stats["writes"] += 1
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+class TieredCache:
+    """
+    Combina el LRU en memoria con un nivel opcional en disco.
+    Lo que se encuentra en disco se vuelve a subir a memoria.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None) -> None:
+        self.memory = ByteLRUCache(max_bytes)
+        self.disk = DiskCache(disk_dir) if disk_dir else None
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+
+        found = self.disk.get(key)
+        if found is None:
+            return None
+        value, remaining = found
+        self.memory.set(key, value, remaining)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "memory": dict(self.memory.stats),
+            "memory_bytes": self.memory.current_bytes,
+            "memory_max_bytes": self.memory.max_bytes,
+            "memory_entries": len(self.memory),
+        }
+        if self.disk is not None:
+            stats["disk"] = dict(self.disk.stats)
+        return stats
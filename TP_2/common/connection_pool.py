@@ -0,0 +1,258 @@
+import asyncio
+import itertools
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from .protocol import (
+    PROTOCOL_V1,
+    PROTOCOL_V2,
+    accepted_codec,
+    accepted_version,
+    hello_message,
+    recv_message_async,
+    send_message_async,
+)
+
+
+class ProcessingConnection:
+    """
+    Conexión TCP persistente hacia el Servidor B.
+    Varias peticiones pueden estar en vuelo al mismo tiempo sobre el mismo
+    socket: cada mensaje lleva un 'request_id' y la respuesta se entrega
+    al future que lo está esperando. Si quien espera se cancela (el cliente
+    HTTP se fue o venció su deadline) se le avisa al Servidor B con el
+    comando "cancel" para que no siga trabajando para nadie.
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        version: int = PROTOCOL_V1,
+        codec: str = "json",
+    ) -> None:
+        self._reader = reader
+        self._writer = writer
+        self.version = version
+        self.codec = codec
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._write_lock = asyncio.Lock()
+        self.closed = False
+        self._background: Set[asyncio.Task] = set()
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def request(self, request_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Envía un payload y espera la respuesta con el mismo request_id.
+        """
+        if self.closed:
+            raise ConnectionError("La conexión con el Servidor B está cerrada")
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        sent = False
+        try:
+            message = dict(payload)
+            message["request_id"] = request_id
+            async with self._write_lock:
+                # send_message_async escribe el mensaje entero antes de su
+                # primer await: desde acá el Servidor B lo va a recibir
+                sent = True
+                await send_message_async(self._writer, message, self.version, self.codec)
+            return await future
+        except asyncio.CancelledError:
+            if sent and not self.closed:
+                task = asyncio.ensure_future(self._send_cancel(request_id))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _send_cancel(self, request_id: int) -> None:
+        try:
+            async with self._write_lock:
+                await send_message_async(
+                    self._writer,
+                    {"command": "cancel", "target": request_id},
+                    self.version,
+                    self.codec,
+                )
+        except (ConnectionError, OSError):
+            pass
+
+    async def _read_loop(self) -> None:
+        """
+        Lee respuestas del socket y las despacha según su request_id.
+        Si el socket se cae, todas las peticiones pendientes fallan con
+        ConnectionError para que el pool pueda reintentar en otra conexión.
+        """
+        error: Exception = ConnectionError("Conexión con el Servidor B cerrada")
+        try:
+            while True:
+                message = await recv_message_async(self._reader, self.version)
+                request_id = None
+                if isinstance(message, dict):
+                    request_id = message.pop("request_id", None)
+
+                future = self._pending.get(request_id)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except asyncio.CancelledError:
+            pass
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            error = ConnectionError(f"Conexión con el Servidor B perdida: {e}")
+        except Exception as e:
+            error = ConnectionError(f"Respuesta inválida del Servidor B: {e}")
+        finally:
+            self.closed = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._writer.close()
+
+    async def close(self) -> None:
+        self.closed = True
+        self._reader_task.cancel()
+        try:
+            await self._reader_task
+        except asyncio.CancelledError:
+            pass
+        try:
+            await self._writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+class ProcessingConnectionPool:
+    """
+    Pool de conexiones persistentes hacia el Servidor B.
+      - reutiliza sockets entre requests (sin handshake por /scrape)
+      - abre como máximo max_size conexiones
+      - cuando todas están ocupadas, multiplexa sobre la menos cargada
+      - descarta conexiones muertas y reconecta en la siguiente petición
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        max_size: int = 4,
+        connect_timeout: float = 5.0,
+        retries: int = 1,
+        protocol_version: int = PROTOCOL_V2,
+        codecs: Optional[Sequence[str]] = None,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size debe ser >= 1")
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.protocol_version = protocol_version
+        # Preferencia de codecs a ofrecer en el hello (None = todos los instalados)
+        self.codecs = codecs
+        self._connections: List[ProcessingConnection] = []
+        self._connect_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+
+    @property
+    def size(self) -> int:
+        return len(self._connections)
+
+    @property
+    def in_flight(self) -> int:
+        return sum(c.in_flight for c in self._connections if not c.closed)
+
+    async def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Envía el payload por alguna conexión del pool y devuelve la respuesta.
+        Si la conexión se cae a mitad de camino se reintenta en otra.
+        """
+        last_error: Optional[Exception] = None
+        for _ in range(self.retries + 1):
+            conn = await self._acquire()
+            try:
+                return await conn.request(next(self._ids), payload)
+            except ConnectionError as e:
+                last_error = e
+        assert last_error is not None
+        raise last_error
+
+    async def _acquire(self) -> ProcessingConnection:
+        self._connections = [c for c in self._connections if not c.closed]
+
+        least_busy = self._least_busy()
+        if least_busy is not None and (
+            least_busy.in_flight == 0 or len(self._connections) >= self.max_size
+        ):
+            return least_busy
+
+        async with self._connect_lock:
+            # Otra tarea pudo haber abierto una conexión mientras esperábamos
+            self._connections = [c for c in self._connections if not c.closed]
+            if len(self._connections) < self.max_size:
+                conn = await self._open_connection()
+                self._connections.append(conn)
+                return conn
+
+        least_busy = self._least_busy()
+        if least_busy is None:
+            raise ConnectionError("No hay conexiones disponibles al Servidor B")
+        return least_busy
+
+    def _least_busy(self) -> Optional[ProcessingConnection]:
+        alive = [c for c in self._connections if not c.closed]
+        if not alive:
+            return None
+        return min(alive, key=lambda c: c.in_flight)
+
+    async def _open_connection(self) -> ProcessingConnection:
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port),
+                timeout=self.connect_timeout,
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ConnectionError(
+                f"No se pudo conectar al Servidor B {self.host}:{self.port}: {e}"
+            ) from e
+
+        version, codec = PROTOCOL_V1, "json"
+        try:
+            if self.protocol_version > PROTOCOL_V1:
+                version, codec = await asyncio.wait_for(
+                    self._negotiate(reader, writer),
+                    timeout=self.connect_timeout,
+                )
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            writer.close()
+            raise ConnectionError(
+                f"No se pudo conectar al Servidor B {self.host}:{self.port}: {e}"
+            ) from e
+        return ProcessingConnection(reader, writer, version, codec)
+
+    async def _negotiate(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> Tuple[int, str]:
+        """
+        Hello en v1 antes de cualquier otro mensaje: si el servidor no
+        conoce el comando responde un error y seguimos en v1 con JSON.
+        """
+        versions = tuple(range(PROTOCOL_V1, self.protocol_version + 1))
+        await send_message_async(writer, hello_message(versions, self.codecs))
+        reply = await recv_message_async(reader)
+        version = accepted_version(reply)
+        codec = accepted_codec(reply) if version >= PROTOCOL_V2 else "json"
+        return version, codec
+
+    async def close(self) -> None:
+        connections, self._connections = self._connections, []
+        for conn in connections:
+            await conn.close()
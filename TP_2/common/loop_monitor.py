@@ -0,0 +1,59 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+
+class LoopLagMonitor:
+    """
+    Mide el lag del event loop: una tarea duerme 'interval' segundos y
+    compara cuánto tardó realmente en despertar. Si algo bloquea el loop
+    (por ejemplo un parseo pesado), el retraso aparece en estas métricas.
+    """
+
+    def __init__(self, interval: float = 0.1) -> None:
+        self.interval = interval
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.avg_ms = 0.0
+        self.samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag_ms = max((time.perf_counter() - start - self.interval) * 1000, 0.0)
+            self._record(lag_ms)
+
+    def _record(self, lag_ms: float) -> None:
+        self.samples += 1
+        self.last_ms = lag_ms
+        self.max_ms = max(self.max_ms, lag_ms)
+        # Promedio móvil exponencial: refleja el comportamiento reciente
+        alpha = 0.1
+        if self.samples == 1:
+            self.avg_ms = lag_ms
+        else:
+            self.avg_ms = (1 - alpha) * self.avg_ms + alpha * lag_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "last_ms": round(self.last_ms, 2),
+            "avg_ms": round(self.avg_ms, 2),
+            "max_ms": round(self.max_ms, 2),
+            "samples": self.samples,
+        }
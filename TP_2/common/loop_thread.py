@@ -0,0 +1,37 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+
+class LoopThread:
+    """
+    Event loop corriendo en un hilo propio. Permite usar código asyncio
+    (por ejemplo una ClientSession compartida) desde código con hilos:
+    submit() devuelve un concurrent.futures.Future.
+    """
+
+    def __init__(self, name: str = "loop-thread") -> None:
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._started = False
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self) -> None:
+        if not self._started:
+            self._thread.start()
+            self._started = True
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        if not self._started:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self.loop.close()
+        self._started = False
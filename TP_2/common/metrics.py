@@ -0,0 +1,294 @@
+import abc
+import bisect
+import contextlib
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+
+# Límites (en segundos) de los buckets de latencia por defecto
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name}: se esperaban las etiquetas {self.labelnames}, "
+                f"llegaron {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """
+        Lista de (sufijo del nombre, etiquetas formateadas, valor).
+        """
+
+    @abc.abstractmethod
+    def snapshot(self) -> Any:
+        """
+        Valores actuales en un formato serializable (para "stats" y /health).
+        """
+
+
+class _Value(_Metric):
+    """
+    Métrica de un solo valor por combinación de etiquetas. Además de
+    actualizarse a mano, el valor se puede calcular al momento de exportar
+    con una función (set_function), útil para leer el estado de un pool,
+    una cola o un contador que ya existe en otro objeto.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def _add(self, amount: float, labels: Dict[str, Any]) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_function(self, func: Callable[[], float], **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = func
+
+    def get(self, **labels: Any) -> float:
+        key = self._key(labels)
+        with self._lock:
+            func = self._functions.get(key)
+            value = self._values.get(key, 0.0)
+        return float(func()) if func is not None else value
+
+    def _collect(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, func in functions:
+            try:
+                values[key] = float(func())
+            except Exception:
+                # Un valor que no se puede leer no rompe el resto del reporte
+                continue
+        return values
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [
+            ("", _format_labels(self.labelnames, key), value)
+            for key, value in self._collect().items()
+        ]
+
+    def snapshot(self) -> Any:
+        values = self._collect()
+        if not self.labelnames:
+            return values.get((), 0.0)
+        return {",".join(key): value for key, value in values.items()}
+
+
+class Counter(_Value):
+    """
+    Contador monotónico (requests, errores, bytes...).
+    """
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if amount < 0:
+            raise ValueError("Un counter solo puede crecer")
+        self._add(amount, labels)
+
+
+class Gauge(_Value):
+    """
+    Valor instantáneo (en vuelo, profundidad de cola, conexiones...).
+    """
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self._add(-amount, labels)
+
+
+class Histogram(_Metric):
+    """
+    Histograma con buckets acumulativos, suma y cantidad, como los de
+    Prometheus. Los valores se registran en segundos.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por etiqueta: [conteo por bucket (+Inf al final), suma, cantidad]
+        self._data: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._data.get(key)
+            if data is None:
+                data = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._data[key] = data
+            data[0][index] += 1
+            data[1] += value
+            data[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """
+        Mide la duración del bloque (también si termina con excepción).
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _collect(self) -> Dict[LabelValues, Tuple[List[int], float, int]]:
+        with self._lock:
+            return {key: (list(d[0]), d[1], d[2]) for key, d in self._data.items()}
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        samples: List[Tuple[str, str, float]] = []
+        for key, (counts, total, count) in self._collect().items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                samples.append(("_bucket", _format_labels(self.labelnames, key, le), cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, count))
+        return samples
+
+    @staticmethod
+    def _quantile(q: float, bounds: Sequence[float], counts: List[int], count: int) -> Any:
+        # Estimación por bucket: se devuelve el límite superior del bucket
+        if count == 0:
+            return None
+        target = q * count
+        cumulative = 0
+        for bound, bucket_count in zip(bounds, counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return bound if bound != float("inf") else "+Inf"
+        return None
+
+    def snapshot(self) -> Any:
+        result: Dict[str, Any] = {}
+        for key, (counts, total, count) in self._collect().items():
+            bounds = self.buckets + (float("inf"),)
+            result[",".join(key)] = {
+                "count": count,
+                "sum_s": round(total, 6),
+                "avg_ms": round(total / count * 1000, 3) if count else None,
+                "p50_le_s": self._quantile(0.50, bounds, counts, count),
+                "p95_le_s": self._quantile(0.95, bounds, counts, count),
+                "p99_le_s": self._quantile(0.99, bounds, counts, count),
+            }
+        if not self.labelnames:
+            return result.get("", {"count": 0})
+        return result
+
+
+class MetricsRegistry:
+    """
+    Conjunto de métricas de un proceso. Se exporta en el formato de texto
+    de Prometheus (render) o como dict para mandarlo por el protocolo
+    (snapshot).
+    """
+
+    def __init__(self, prefix: str = "") -> None:
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Métrica ya registrada con otra definición: {metric.name}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self.prefix + name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(self.prefix + name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(self.prefix + name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        Formato de exposición de texto de Prometheus (versión 0.0.4).
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
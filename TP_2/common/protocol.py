@@ -1,77 +1,421 @@
 import struct
-from typing import Any
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from asyncio import StreamReader, StreamWriter
 
-from .serialization import to_json_bytes, from_json_bytes
+from .metrics import MetricsRegistry
+from .serialization import (
+    available_codecs,
+    bytes_to_base64,
+    choose_codec,
+    Codec,
+    from_json_bytes,
+    get_codec,
+    get_codec_by_id,
+    to_json_bytes,
+)
 
 
-# Estructura binaria: entero sin signo de 4 bytes big-endian
+# Versiones del protocolo:
+#   v1: 4 bytes de longitud + JSON (los bytes viajan como base64)
+#   v2: header binario + JSON + adjuntos binarios crudos (sin base64)
+PROTOCOL_V1 = 1
+PROTOCOL_V2 = 2
+SUPPORTED_VERSIONS = (PROTOCOL_V1, PROTOCOL_V2)
+
+# Formato con el que arranca toda conexión: (versión, codec)
+DEFAULT_WIRE = (PROTOCOL_V1, "json")
+
+# Estructura binaria v1: entero sin signo de 4 bytes big-endian
 _HEADER_STRUCT = struct.Struct("!I")
 
+# Estructura binaria v2:
+#   versión (1 byte) | id de codec (1 byte) | cantidad de adjuntos (2 bytes)
+#   | largo del header serializado (4 bytes)
+# seguido del header (JSON, orjson o msgpack según el codec) y de cada
+# adjunto como 4 bytes de longitud + bytes crudos.
+_V2_HEADER_STRUCT = struct.Struct("!BBHI")
+_ATTACHMENT_STRUCT = struct.Struct("!I")
+
+# Marcador que reemplaza a un valor bytes dentro del JSON v2
+_ATTACHMENT_KEY = "__attachment__"
+
+
+# Tamaño máximo de un mensaje (header + adjuntos). Se verifica con el
+# header, antes de reservar memoria para el cuerpo.
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+
+class ProtocolError(ConnectionError):
+    """
+    El peer mandó algo que no respeta el protocolo. La conexión
+    queda en un estado desconocido y hay que cerrarla.
+    """
+
+
+class MessageTooLargeError(ProtocolError):
+    """
+    El mensaje anunciado supera el tamaño máximo permitido.
+    """
+
+
+class TrafficStats:
+    """
+    Bytes y mensajes enviados/recibidos por este proceso con el protocolo,
+    sumando todas las conexiones (la usan las métricas de ambos servidores).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.messages_in = 0
+        self.messages_out = 0
+
+    def record_in(self, size: int) -> None:
+        with self._lock:
+            self.bytes_in += size
+            self.messages_in += 1
+
+    def record_out(self, size: int) -> None:
+        with self._lock:
+            self.bytes_out += size
+            self.messages_out += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "messages_in": self.messages_in,
+                "messages_out": self.messages_out,
+            }
+
+
+TRAFFIC = TrafficStats()
+
+
+def register_traffic_metrics(registry: MetricsRegistry) -> None:
+    """
+    Expone los contadores de TRAFFIC en un registro de métricas.
+    """
+    bytes_total = registry.counter(
+        "protocol_bytes_total",
+        "Bytes transferidos con el protocolo entre servidores",
+        ("direction",),
+    )
+    messages_total = registry.counter(
+        "protocol_messages_total",
+        "Mensajes transferidos con el protocolo entre servidores",
+        ("direction",),
+    )
+    bytes_total.set_function(lambda: TRAFFIC.bytes_in, direction="in")
+    bytes_total.set_function(lambda: TRAFFIC.bytes_out, direction="out")
+    messages_total.set_function(lambda: TRAFFIC.messages_in, direction="in")
+    messages_total.set_function(lambda: TRAFFIC.messages_out, direction="out")
+
+
+def set_max_message_size(max_size: int) -> None:
+    """
+    Cambia el límite por defecto para todo el proceso (--max-message-mb).
+    """
+    global MAX_MESSAGE_SIZE
+    if max_size <= 0:
+        raise ValueError("El tamaño máximo de mensaje debe ser positivo")
+    MAX_MESSAGE_SIZE = max_size
+
+
+def _limit(max_size: Optional[int]) -> int:
+    return MAX_MESSAGE_SIZE if max_size is None else max_size
+
+
+def _check_size(size: int, limit: int) -> int:
+    if size > limit:
+        raise MessageTooLargeError(
+            f"Mensaje de {size} bytes supera el máximo de {limit} bytes"
+        )
+    return size
+
+
+# Negociación de versión
+#
+# El cliente abre la conexión mandando, en v1, {"command": "hello",
+# "protocol_versions": [1, 2], "codecs": [...]}. El servidor responde en v1
+# con la versión y el codec elegidos y desde ahí ambos usan esa versión en
+# esa conexión. Un peer que no manda hello (o no lo entiende) sigue
+# hablando v1 (siempre JSON).
+
+def hello_message(
+    versions: Tuple[int, ...] = SUPPORTED_VERSIONS,
+    codecs: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    return {
+        "command": "hello",
+        "protocol_versions": list(versions),
+        "codecs": list(codecs if codecs is not None else available_codecs()),
+    }
+
+
+def negotiate_version(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], int, str]:
+    """
+    Atiende un hello del lado servidor.
+    Devuelve (respuesta a enviar en v1, versión y codec a usar desde ahora).
+    """
+    offered = payload.get("protocol_versions") or [PROTOCOL_V1]
+    common = [v for v in offered if v in SUPPORTED_VERSIONS]
+    version = max(common) if common else PROTOCOL_V1
+    codec = choose_codec(payload.get("codecs") or []) if version >= PROTOCOL_V2 else "json"
+    reply = {"status": "success", "protocol_version": version, "codec": codec}
+    return reply, version, codec
+
+
+def accepted_version(reply: Any) -> int:
+    """
+    Interpreta la respuesta a un hello del lado cliente.
+    """
+    if isinstance(reply, dict):
+        version = reply.get("protocol_version")
+        if version in SUPPORTED_VERSIONS:
+            return version
+    return PROTOCOL_V1
+
+
+def accepted_codec(reply: Any) -> str:
+    """
+    Codec elegido por el servidor (JSON si no lo informa o no lo tenemos).
+    """
+    if isinstance(reply, dict):
+        return choose_codec([reply.get("codec") or "json"])
+    return "json"
+
+
+# Codificación
+
+def _extract_attachments(obj: Any, attachments: List[bytes]) -> Any:
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        attachments.append(obj)
+        return {_ATTACHMENT_KEY: len(attachments) - 1}
+    if isinstance(obj, dict):
+        return {k: _extract_attachments(v, attachments) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_extract_attachments(v, attachments) for v in obj]
+    return obj
+
+
+def _restore_attachments(obj: Any, attachments: List[bytes]) -> Any:
+    if isinstance(obj, dict):
+        if len(obj) == 1 and _ATTACHMENT_KEY in obj:
+            try:
+                return attachments[obj[_ATTACHMENT_KEY]]
+            except (IndexError, TypeError):
+                raise ProtocolError("Referencia a adjunto inválida") from None
+        return {k: _restore_attachments(v, attachments) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_restore_attachments(v, attachments) for v in obj]
+    return obj
+
+
+def encode_message(obj: Any, version: int = PROTOCOL_V1, codec: str = "json") -> List[bytes]:
+    """
+    Codifica un mensaje en una lista de buffers listos para escribir
+    (se devuelven por separado para no concatenar adjuntos grandes).
+    El codec solo aplica a v2; v1 es siempre JSON.
+    """
+    if version == PROTOCOL_V1:
+        body = to_json_bytes(bytes_to_base64(obj))
+        return [_HEADER_STRUCT.pack(len(body)), body]
+
+    if version != PROTOCOL_V2:
+        raise ValueError(f"Versión de protocolo no soportada: {version}")
+
+    selected = get_codec(codec)
+    attachments: List[bytes] = []
+    header_obj = _extract_attachments(obj, attachments)
+    body = selected.dumps(header_obj)
+
+    buffers = [
+        _V2_HEADER_STRUCT.pack(PROTOCOL_V2, selected.codec_id, len(attachments), len(body)),
+        body,
+    ]
+    for data in attachments:
+        buffers.append(_ATTACHMENT_STRUCT.pack(len(data)))
+        buffers.append(data)
+    return buffers
+
+
+def _check_v2_header(header_data: bytes) -> Tuple[Codec, int, int]:
+    version, codec_id, n_attachments, length = _V2_HEADER_STRUCT.unpack(header_data)
+    if version != PROTOCOL_V2:
+        raise ProtocolError(f"Se esperaba un mensaje v2 y llegó versión {version}")
+    try:
+        codec = get_codec_by_id(codec_id)
+    except ValueError as e:
+        raise ProtocolError(str(e)) from None
+    return codec, n_attachments, length
+
+
+def decode_message(data: bytes, version: int = PROTOCOL_V1) -> Any:
+    """
+    Decodifica un mensaje completo que ya está en memoria
+    (útil para tests y benchmarks, sin socket de por medio).
+    """
+    view = memoryview(data)
+    if version == PROTOCOL_V1:
+        (length,) = _HEADER_STRUCT.unpack(view[:_HEADER_STRUCT.size])
+        return from_json_bytes(bytes(view[_HEADER_STRUCT.size:_HEADER_STRUCT.size + length]))
+
+    codec, n_attachments, length = _check_v2_header(view[:_V2_HEADER_STRUCT.size])
+    offset = _V2_HEADER_STRUCT.size
+    body = view[offset:offset + length]
+    offset += length
+
+    attachments: List[bytes] = []
+    for _ in range(n_attachments):
+        (att_length,) = _ATTACHMENT_STRUCT.unpack(view[offset:offset + _ATTACHMENT_STRUCT.size])
+        offset += _ATTACHMENT_STRUCT.size
+        attachments.append(bytes(view[offset:offset + att_length]))
+        offset += att_length
+
+    return _restore_attachments(codec.loads(bytes(body)), attachments)
+
 
 # Versión asíncrona (asyncio)
 
-async def send_message_async(writer: StreamWriter, obj: Any) -> None:
+async def send_message_async(
+    writer: StreamWriter,
+    obj: Any,
+    version: int = PROTOCOL_V1,
+    codec: str = "json",
+) -> None:
     """
     Envía un mensaje usando el protocolo:
-      4 bytes de longitud + JSON en bytes.
+      v1: 4 bytes de longitud + JSON en bytes.
+      v2: header binario + header serializado con el codec + adjuntos binarios.
     """
-    body = to_json_bytes(obj)
-    header = _HEADER_STRUCT.pack(len(body))
-    writer.write(header + body)
+    buffers = encode_message(obj, version, codec)
+    writer.writelines(buffers)
     await writer.drain()
+    TRAFFIC.record_out(sum(len(b) for b in buffers))
 
 
-async def recv_message_async(reader: StreamReader) -> Any:
+async def recv_message_async(
+    reader: StreamReader,
+    version: int = PROTOCOL_V1,
+    max_size: Optional[int] = None,
+) -> Any:
     """
-    Recibe un mensaje usando el protocolo:
-      4 bytes de longitud + JSON en bytes.
+    Recibe un mensaje usando el protocolo de la versión indicada.
     Devuelve el objeto Python.
     """
-    header_data = await reader.readexactly(_HEADER_STRUCT.size)
-    (length,) = _HEADER_STRUCT.unpack(header_data)
+    limit = _limit(max_size)
+
+    if version == PROTOCOL_V1:
+        header_data = await reader.readexactly(_HEADER_STRUCT.size)
+        (length,) = _HEADER_STRUCT.unpack(header_data)
+        _check_size(length, limit)
+        body = await reader.readexactly(length)
+        TRAFFIC.record_in(_HEADER_STRUCT.size + length)
+        return from_json_bytes(body)
+
+    header_data = await reader.readexactly(_V2_HEADER_STRUCT.size)
+    codec, n_attachments, length = _check_v2_header(header_data)
+    total = _check_size(length, limit)
     body = await reader.readexactly(length)
-    return from_json_bytes(body)
+
+    attachments: List[bytes] = []
+    for _ in range(n_attachments):
+        (att_length,) = _ATTACHMENT_STRUCT.unpack(
+            await reader.readexactly(_ATTACHMENT_STRUCT.size)
+        )
+        total = _check_size(total + att_length, limit)
+        attachments.append(await reader.readexactly(att_length))
+
+    TRAFFIC.record_in(
+        _V2_HEADER_STRUCT.size + n_attachments * _ATTACHMENT_STRUCT.size + total
+    )
+    return _restore_attachments(codec.loads(body), attachments)
 
 
 # Versión síncrona (socketserver)
 
-def _recvall(sock, n: int) -> bytes:
+def _recv_exact(sock, n: int, what: str) -> bytearray:
+    """
+    Lee exactamente n bytes en un buffer preasignado usando recv_into,
+    sin copias intermedias (en lugar de ir concatenando chunks).
+    """
+    buf = bytearray(n)
+    view = memoryview(buf)
+    received = 0
+    while received < n:
+        count = sock.recv_into(view[received:], n - received)
+        if count == 0:
+            raise ConnectionError(f"No se pudo leer {what} del mensaje")
+        received += count
+    return buf
+
+
+def _sendall_buffers(sock, buffers: List[bytes]) -> None:
     """
-    Lee exactamente n bytes desde el socket, a menos que se corte antes.
+    Envía varios buffers sin concatenarlos (sendmsg = scatter/gather).
+    Si el socket no soporta sendmsg (por ejemplo en Windows) se concatena.
     """
-    data = b""
-    while len(data) < n:
-        chunk = sock.recv(n - len(data))
-        if not chunk:
-            break
-        data += chunk
-    return data
+    if not hasattr(sock, "sendmsg"):
+        sock.sendall(b"".join(buffers))
+        return
+
+    views = [memoryview(b) for b in buffers if len(b)]
+    while views:
+        sent = sock.sendmsg(views)
+        # Envío parcial: descartar lo que ya salió y seguir con el resto
+        while sent and views:
+            if sent >= len(views[0]):
+                sent -= len(views[0])
+                views.pop(0)
+            else:
+                views[0] = views[0][sent:]
+                sent = 0
 
 
-def send_message_sync(sock, obj: Any) -> None:
+def send_message_sync(sock, obj: Any, version: int = PROTOCOL_V1, codec: str = "json") -> None:
     """
     Envía un mensaje por un socket bloqueante.
     """
-    body = to_json_bytes(obj)
-    header = _HEADER_STRUCT.pack(len(body))
-    sock.sendall(header + body)
+    buffers = encode_message(obj, version, codec)
+    _sendall_buffers(sock, buffers)
+    TRAFFIC.record_out(sum(len(b) for b in buffers))
 
 
-def recv_message_sync(sock) -> Any:
+def recv_message_sync(sock, version: int = PROTOCOL_V1, max_size: Optional[int] = None) -> Any:
     """
     Recibe un mensaje completo por un socket bloqueante
     y lo devuelve como objeto Python.
     """
-    header_data = _recvall(sock, _HEADER_STRUCT.size)
-    if not header_data:
-        raise ConnectionError("No se pudo leer el header del mensaje")
+    limit = _limit(max_size)
+
+    if version == PROTOCOL_V1:
+        header_data = _recv_exact(sock, _HEADER_STRUCT.size, "el header")
+        (length,) = _HEADER_STRUCT.unpack(header_data)
+        _check_size(length, limit)
+
+        body = _recv_exact(sock, length, "el cuerpo")
+        TRAFFIC.record_in(_HEADER_STRUCT.size + length)
+        return from_json_bytes(body)
 
-    (length,) = _HEADER_STRUCT.unpack(header_data)
+    header_data = _recv_exact(sock, _V2_HEADER_STRUCT.size, "el header")
+    codec, n_attachments, length = _check_v2_header(header_data)
+    total = _check_size(length, limit)
+    body = _recv_exact(sock, length, "el cuerpo")
 
-    body = _recvall(sock, length)
-    if not body:
-        raise ConnectionError("No se pudo leer el cuerpo del mensaje")
+    attachments: List[bytes] = []
+    for _ in range(n_attachments):
+        (att_length,) = _ATTACHMENT_STRUCT.unpack(
+            _recv_exact(sock, _ATTACHMENT_STRUCT.size, "un adjunto")
+        )
+        total = _check_size(total + att_length, limit)
+        attachments.append(_recv_exact(sock, att_length, "un adjunto"))
 
-    return from_json_bytes(body)
+    TRAFFIC.record_in(
+        _V2_HEADER_STRUCT.size + n_attachments * _ATTACHMENT_STRUCT.size + total
+    )
+    return _restore_attachments(codec.loads(body), attachments)
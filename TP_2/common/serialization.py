@@ -1,5 +1,16 @@
+import base64
 import json
-from typing import Any
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence, Union
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack es opcional
+    msgpack = None
 
 
 def to_json_bytes(obj: Any) -> bytes:
@@ -9,8 +20,98 @@ def to_json_bytes(obj: Any) -> bytes:
     return json.dumps(obj).encode("utf-8")
 
 
-def from_json_bytes(data: bytes) -> Any:
+def from_json_bytes(data: Union[bytes, bytearray, memoryview]) -> Any:
     """
     Deserializa bytes UTF-8 que contienen JSON a un objeto Python.
+    Acepta el buffer directamente (bytes o bytearray) sin copiarlo antes.
+    """
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def bytes_to_base64(obj: Any) -> Any:
+    """
+    Devuelve una copia del objeto donde todo valor bytes pasa a ser un
+    string base64, para poder serializarlo como JSON (por ejemplo al
+    responderle al cliente HTTP o al hablar protocolo v1).
     """
-    return json.loads(data.decode("utf-8"))
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return base64.b64encode(obj).decode("ascii")
+    if isinstance(obj, dict):
+        return {k: bytes_to_base64(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [bytes_to_base64(v) for v in obj]
+    return obj
+
+
+# Registro de codecs
+#
+# Cada codec tiene un id de 1 byte que viaja en el header de los mensajes
+# v2, así el receptor sabe cómo decodificar sin estado extra.
+
+class Codec(NamedTuple):
+    codec_id: int
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+CODECS: Dict[str, Codec] = {}
+CODECS_BY_ID: Dict[int, Codec] = {}
+
+
+def register_codec(codec: Codec) -> None:
+    if codec.codec_id in CODECS_BY_ID and CODECS_BY_ID[codec.codec_id].name != codec.name:
+        raise ValueError(f"Id de codec repetido: {codec.codec_id}")
+    CODECS[codec.name] = codec
+    CODECS_BY_ID[codec.codec_id] = codec
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(
+            f"Codec no disponible: {name!r} (disponibles: {', '.join(CODECS)})"
+        ) from None
+
+
+def get_codec_by_id(codec_id: int) -> Codec:
+    try:
+        return CODECS_BY_ID[codec_id]
+    except KeyError:
+        raise ValueError(f"Id de codec desconocido: {codec_id}") from None
+
+
+def available_codecs() -> List[str]:
+    """
+    Codecs instalados, del más rápido al más lento (orden de preferencia).
+    """
+    preference = ("orjson", "msgpack", "json")
+    return [name for name in preference if name in CODECS]
+
+
+def choose_codec(offered: Sequence[str]) -> str:
+    """
+    Elige el primer codec ofrecido que esté disponible localmente.
+    JSON siempre está, así que es el último recurso.
+    """
+    for name in offered:
+        if name in CODECS:
+            return name
+    return "json"
+
+
+register_codec(Codec(0, "json", to_json_bytes, json.loads))
+
+if orjson is not None:
+    register_codec(Codec(1, "orjson", orjson.dumps, orjson.loads))
+
+if msgpack is not None:
+    register_codec(Codec(
+        2,
+        "msgpack",
+        lambda obj: msgpack.packb(obj, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False),
+    ))
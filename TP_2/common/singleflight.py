@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Deduplicación de trabajo concurrente ("single-flight"):
+    si llegan varias llamadas con la misma clave mientras la primera
+    sigue en curso, todas esperan el mismo future en lugar de repetir
+    el trabajo. Al terminar, la clave se libera.
+
+    Se cuenta cuántos esperan cada trabajo: si uno se cancela (su cliente
+    se fue) el trabajo sigue para los demás, pero si se cancelan todos
+    se cancela también el trabajo.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.stats: Dict[str, int] = {"leaders": 0, "shared": 0, "cancelled": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["shared"] += 1
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # shield: si un cliente se va, no se cancela el trabajo de los demás
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if self._waiters[task] == 0:
+                del self._waiters[task]
+                if not task.done():
+                    # Ya no lo espera nadie; la clave se libera ya para que
+                    # un pedido nuevo no se sume a un trabajo cancelado
+                    task.cancel()
+                    self._forget(key, task)
+                    self.stats["cancelled"] += 1
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Evitar el warning "exception was never retrieved"
+        if task.done() and not task.cancelled():
+            task.exception()
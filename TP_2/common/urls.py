@@ -0,0 +1,34 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normaliza una URL para usarla como clave de cache / deduplicación:
+      - esquema y host en minúsculas
+      - sin puerto por defecto (80/443)
+      - path vacío -> "/"
+      - query ordenada
+      - sin fragmento (#...)
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"
+
+    netloc = host
+    if parts.port is not None and parts.port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username
+        if parts.password:
+            userinfo += f":{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+
+    return urlunsplit((scheme, netloc, path, query, ""))
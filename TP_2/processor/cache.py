@@ -0,0 +1,123 @@
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from common.cache import TieredCache
+from common.urls import normalize_url
+
+
+# Campos de la respuesta del Servidor B que se cachean y su TTL por defecto
+# (en segundos). El screenshot y los thumbnails cambian poco; las métricas
+# de rendimiento envejecen rápido.
+DEFAULT_TTLS: Dict[str, float] = {
+    "screenshot": 24 * 3600,
+    "thumbnails": 24 * 3600,
+    "performance": 300,
+}
+
+# Campos que acompañan a otro y se guardan con su mismo TTL: un hit
+# tiene que devolver la misma forma que un cálculo nuevo
+COMPANION_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "thumbnails": ("thumbnails_info",),
+}
+
+
+class ResultCache:
+    """
+    Cache de resultados del Servidor B indexado por URL normalizada.
+    Cada campo se guarda por separado con su propio TTL, así un
+    screenshot puede seguir vigente aunque la performance haya expirado.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+        ttls: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self._store = TieredCache(max_bytes, disk_dir)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "partial_hits": 0, "misses": 0}
+
+    @property
+    def has_disk(self) -> bool:
+        """
+        True si hay nivel en disco: una consulta puede leer archivos.
+        """
+        return self._store.disk is not None
+
+    @staticmethod
+    def _key(url: str, field: str) -> str:
+        return f"{field}:{normalize_url(url)}"
+
+    def get_fields(self, url: str, fields: Iterable[str]) -> Dict[str, Any]:
+        """
+        Devuelve los campos vigentes que haya en cache (puede ser un
+        subconjunto), con sus campos acompañantes (ver COMPANION_FIELDS).
+        Un campo sin sus acompañantes cuenta como ausente.
+        """
+        fields = list(fields)
+        found: Dict[str, Any] = {}
+        for field in fields:
+            value = self._store.get(self._key(url, field))
+            if value is None:
+                continue
+            companions: Dict[str, Any] = {}
+            for companion in COMPANION_FIELDS.get(field, ()):
+                companion_value = self._store.get(self._key(url, companion))
+                if companion_value is None:
+                    break
+                companions[companion] = companion_value
+            else:
+                found[field] = value
+                found.update(companions)
+
+        hits = sum(1 for field in fields if field in found)
+
+        with self._lock:
+            if hits == len(fields):
+                self.stats["hits"] += 1
+            elif hits:
+                self.stats["partial_hits"] += 1
+            else:
+                self.stats["misses"] += 1
+        return found
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve un resultado completo si todos los campos están vigentes.
+        """
+        found = self.get_fields(url, self.ttls)
+        if any(field not in found for field in self.ttls):
+            return None
+        result: Dict[str, Any] = {"status": "success"}
+        result.update(found)
+        result["cached"] = True
+        return result
+
+    def put(self, url: str, result: Dict[str, Any]) -> None:
+        """
+        Guarda los campos de un resultado exitoso.
+        No se cachean errores (ni métricas de performance con error).
+        """
+        if result.get("status") != "success":
+            return
+        for field, ttl in self.ttls.items():
+            value = result.get(field)
+            if value is None:
+                continue
+            if isinstance(value, dict) and value.get("error"):
+                continue
+            self._store.set(self._key(url, field), value, ttl)
+            for companion in COMPANION_FIELDS.get(field, ()):
+                if result.get(companion) is not None:
+                    self._store.set(self._key(url, companion), result[companion], ttl)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.stats)
+        stats["ttls"] = dict(self.ttls)
+        stats.update(self._store.get_stats())
+        return stats
@@ -1,21 +1,152 @@
-from typing import List
+import math
+import time
+from typing import Any, Dict, List, NamedTuple, Tuple
 
 from PIL import Image
 
-from .screenshot import image_to_base64
+from .screenshot import image_to_bytes
 
 
-def create_thumbnails(img: Image.Image) -> List[str]:
+# Formatos de salida soportados para los thumbnails
+THUMBNAIL_FORMATS = ("PNG", "JPEG", "WEBP")
+
+
+class ThumbnailConfig(NamedTuple):
+    """
+    Configuración del pipeline de thumbnails (se pasa a los workers del pool).
+      - sizes: tamaños máximos (ancho, alto), en el orden en que se devuelven
+      - format: PNG, JPEG o WEBP
+      - quality: calidad para JPEG/WEBP (1-100)
+      - png_compress_level: nivel de zlib para PNG (0 = sin comprimir, 9 = máximo)
+      - png_optimize: pasada extra de optimización PNG (más lenta, algo más chica)
+    """
+    sizes: Tuple[Tuple[int, int], ...] = ((400, 300), (200, 150))
+    format: str = "PNG"
+    quality: int = 80
+    png_compress_level: int = 6
+    png_optimize: bool = False
+
+
+DEFAULT_THUMBNAIL_CONFIG = ThumbnailConfig()
+
+
+def parse_sizes(value: str) -> Tuple[Tuple[int, int], ...]:
+    """
+    Convierte "400x300,200x150" en ((400, 300), (200, 150)).
+    """
+    sizes = []
+    for item in value.split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        width, _, height = item.partition("x")
+        size = (int(width), int(height))
+        if size[0] <= 0 or size[1] <= 0:
+            raise ValueError(f"Tamaño inválido: {item}")
+        sizes.append(size)
+    if not sizes:
+        raise ValueError("Hay que indicar al menos un tamaño")
+    return tuple(sizes)
+
+
+def save_options(config: ThumbnailConfig) -> Dict[str, Any]:
+    """
+    Parámetros de Image.save() según el formato elegido.
+    """
+    if config.format == "PNG":
+        return {"compress_level": config.png_compress_level, "optimize": config.png_optimize}
+    if config.format == "JPEG":
+        return {"quality": config.quality}
+    if config.format == "WEBP":
+        return {"quality": config.quality, "method": 4}
+    raise ValueError(f"Formato de thumbnail no soportado: {config.format}")
+
+
+def fit_size(size: Tuple[int, int], box: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    Tamaño que tendría una imagen de 'size' reducida para entrar en 'box'
+    manteniendo la proporción y sin agrandarla (el mismo redondeo que
+    Image.thumbnail).
+    """
+    width, height = size
+    x, y = box
+    if x >= width and y >= height:
+        return width, height
+    aspect = width / height
+    if x / y >= aspect:
+        candidates = (math.floor(y * aspect), math.ceil(y * aspect))
+        x = max(min(candidates, key=lambda n: abs(aspect - n / y)), 1)
+    else:
+        candidates = (math.floor(x / aspect), math.ceil(x / aspect))
+        y = max(min(candidates, key=lambda n: 0 if n == 0 else abs(aspect - x / n)), 1)
+    return x, y
+
+
+def create_thumbnails_with_timings(
+    img: Image.Image,
+    config: ThumbnailConfig = DEFAULT_THUMBNAIL_CONFIG,
+) -> Tuple[List[bytes], List[Dict[str, Any]]]:
     """
-    Crea un par de thumbnails a partir del screenshot.
-    Devuelve una lista de strings base64.
+    Genera los thumbnails en cascada: cada tamaño se reduce a partir del
+    anterior (ya más chico) en lugar del original completo, así cada
+    reducción procesa muchos menos píxeles. El tamaño final de cada uno
+    se calcula sobre el original; el anterior solo se reusa si es al
+    menos igual de grande en ambos ejes (con cajas de distinta proporción
+    puede no serlo, y entonces se reduce desde el original).
+    Devuelve (imágenes codificadas, info por tamaño con el tiempo de encode).
     """
-    sizes = [(400, 300), (200, 150)]
-    thumbs_b64: List[str] = []
+    options = save_options(config)
+
+    # JPEG no admite transparencia
+    source = img
+    if config.format == "JPEG" and source.mode not in ("RGB", "L"):
+        source = source.convert("RGB")
+
+    # Procesar del más grande al más chico (según el tamaño final, no el
+    # de la caja), pero devolver en el orden pedido
+    targets = [fit_size(source.size, size) for size in config.sizes]
+    order = sorted(range(len(targets)), key=lambda i: -(targets[i][0] * targets[i][1]))
+
+    thumbs: List[bytes] = [b""] * len(config.sizes)
+    info: List[Dict[str, Any]] = [{} for _ in config.sizes]
 
-    for size in sizes:
-        thumb = img.copy()
-        thumb.thumbnail(size)
-        thumbs_b64.append(image_to_base64(thumb, format="PNG"))
+    current = source
+    for index in order:
+        target = targets[index]
+        if current.width < target[0] or current.height < target[1]:
+            current = source
 
-    return thumbs_b64
+        start = time.perf_counter()
+        if current.size == target:
+            thumb = current.copy()
+        else:
+            thumb = current.resize(target, Image.Resampling.BICUBIC, reducing_gap=2.0)
+        resize_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        data = image_to_bytes(thumb, format=config.format, **options)
+        encode_ms = (time.perf_counter() - start) * 1000
+
+        thumbs[index] = data
+        info[index] = {
+            "size": list(thumb.size),
+            "format": config.format.lower(),
+            "bytes": len(data),
+            "resize_ms": round(resize_ms, 2),
+            "encode_ms": round(encode_ms, 2),
+        }
+        current = thumb
+
+    return thumbs, info
+
+
+def create_thumbnails(
+    img: Image.Image,
+    config: ThumbnailConfig = DEFAULT_THUMBNAIL_CONFIG,
+) -> List[bytes]:
+    """
+    Crea los thumbnails a partir del screenshot.
+    Devuelve una lista de imágenes codificadas en bytes.
+    """
+    thumbs, _ = create_thumbnails_with_timings(img, config)
+    return thumbs
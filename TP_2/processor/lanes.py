@@ -0,0 +1,214 @@
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Mapping, Optional, Tuple
+
+
+LANES = ("interactive", "batch")
+DEFAULT_LANE = "interactive"
+
+# Peso de cada carril en el reparto de workers y máximo de tareas en cola
+# (0 = sin límite)
+DEFAULT_LANE_WEIGHTS: Dict[str, int] = {"interactive": 8, "batch": 1}
+DEFAULT_LANE_DEPTHS: Dict[str, int] = {"interactive": 0, "batch": 1000}
+
+
+class LaneFullError(Exception):
+    """
+    La cola del carril está llena; el pedido se rechaza en el acto.
+    """
+
+
+def parse_lane_values(value: str) -> Dict[str, int]:
+    """
+    Convierte "interactive=8,batch=1" en {"interactive": 8, "batch": 1}.
+    """
+    values: Dict[str, int] = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        lane, sep, number = item.partition("=")
+        lane = lane.strip()
+        if not sep or lane not in LANES or not number.strip().isdigit():
+            raise ValueError(
+                f"Valor inválido: {item!r} (se espera carril=entero, carriles: {', '.join(LANES)})"
+            )
+        values[lane] = int(number)
+    return values
+
+
+_Item = Tuple[Future, Callable[..., Any], Tuple[Any, ...], float]
+
+
+class LaneScheduler:
+    """
+    Scheduler delante de un executor con un carril (cola FIFO) por
+    prioridad. Al executor se le pasan como máximo 'slots' tareas a la
+    vez (tantas como workers), así el orden lo decide el scheduler y no
+    la cola FIFO interna del pool:
+      - los lugares libres se reparten entre los carriles con tareas en
+        proporción a su peso (round-robin ponderado suave), así un batch
+        grande no demora a los pedidos interactivos pero tampoco se
+        queda sin avanzar
+      - cada carril tiene un máximo de tareas en cola; lleno, submit
+        lanza LaneFullError
+
+    submit devuelve un Future propio: cancelarlo mientras espera en el
+    carril lo descarta sin ocupar un worker.
+
+    Los callbacks de fin de tarea corren en el hilo que recolecta los
+    resultados del executor (en un ProcessPoolExecutor, uno solo para
+    todo el pool): ahí solo se completa el Future y el envío de la
+    siguiente tarea queda a cargo de un hilo propio del scheduler.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        slots: int,
+        weights: Optional[Mapping[str, int]] = None,
+        max_depths: Optional[Mapping[str, int]] = None,
+        on_wait: Optional[Callable[[str, float], None]] = None,
+    ) -> None:
+        if slots < 1:
+            raise ValueError("slots debe ser >= 1")
+        self.executor = executor
+        self.slots = slots
+        self.weights = {lane: 1 for lane in LANES}
+        self.weights.update(DEFAULT_LANE_WEIGHTS)
+        self.weights.update(weights or {})
+        if any(weight < 1 for weight in self.weights.values()):
+            raise ValueError("Los pesos deben ser >= 1")
+        self.max_depths = dict(DEFAULT_LANE_DEPTHS)
+        self.max_depths.update(max_depths or {})
+        # Callback con el tiempo que esperó cada tarea en su carril (métricas)
+        self.on_wait = on_wait
+        self.running = 0
+        self._queues: Dict[str, Deque[_Item]] = {lane: deque() for lane in LANES}
+        self._credit: Dict[str, int] = {lane: 0 for lane in LANES}
+        self._lock = threading.Lock()
+        self._dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lanes")
+        self.stats: Dict[str, Dict[str, int]] = {
+            lane: {"submitted": 0, "rejected": 0, "cancelled": 0} for lane in LANES
+        }
+
+    def depth(self, lane: str) -> int:
+        return len(self._queues[lane])
+
+    def submit(self, lane: str, fn: Callable[..., Any], *args: Any) -> Future:
+        if lane not in self._queues:
+            raise ValueError(f"Carril desconocido: {lane!r}")
+
+        future: Future = Future()
+        with self._lock:
+            limit = self.max_depths.get(lane, 0)
+            if limit > 0 and len(self._queues[lane]) >= limit:
+                self.stats[lane]["rejected"] += 1
+                raise LaneFullError(f"Cola '{lane}' llena ({limit} tareas en espera)")
+            self.stats[lane]["submitted"] += 1
+            self._queues[lane].append((future, fn, args, time.perf_counter()))
+        future.add_done_callback(lambda f, lane=lane: self._discard(lane, f))
+        self._dispatch()
+        return future
+
+    def _discard(self, lane: str, future: Future) -> None:
+        """
+        Saca del carril una tarea cancelada mientras esperaba, así no
+        cuenta para el límite de la cola.
+        """
+        if not future.cancelled():
+            return
+        with self._lock:
+            queue = self._queues[lane]
+            for index, item in enumerate(queue):
+                if item[0] is future:
+                    del queue[index]
+                    self.stats[lane]["cancelled"] += 1
+                    return
+
+    def _next_lane(self) -> Optional[str]:
+        """
+        Round-robin ponderado suave (el de nginx): cada carril con tareas
+        suma su peso al crédito, gana el de más crédito y se le resta el
+        total. Con pesos 8/1 salen 8 interactivos por cada batch, intercalados.
+        Se llama con el lock tomado.
+        """
+        ready = [lane for lane in LANES if self._queues[lane]]
+        if not ready:
+            return None
+        total = 0
+        for lane in ready:
+            self._credit[lane] += self.weights[lane]
+            total += self.weights[lane]
+        best = max(ready, key=lambda lane: self._credit[lane])
+        self._credit[best] -= total
+        return best
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._lock:
+                if self.running >= self.slots:
+                    return
+                lane = self._next_lane()
+                if lane is None:
+                    return
+                future, fn, args, queued_at = self._queues[lane].popleft()
+                # Cancelado mientras esperaba: no ocupa un worker
+                if not future.set_running_or_notify_cancel():
+                    self.stats[lane]["cancelled"] += 1
+                    continue
+                self.running += 1
+
+            if self.on_wait is not None:
+                self.on_wait(lane, time.perf_counter() - queued_at)
+            try:
+                inner = self.executor.submit(fn, *args)
+            except Exception as e:
+                self._finish()
+                future.set_exception(e)
+                continue
+            inner.add_done_callback(functools.partial(self._on_done, future))
+
+    def _finish(self) -> None:
+        with self._lock:
+            self.running -= 1
+
+    def _on_done(self, future: Future, inner: Future) -> None:
+        self._finish()
+        if inner.cancelled():
+            # El pool se apagó con la tarea sin empezar
+            future.set_exception(CancelledError("Tarea cancelada por el pool"))
+        elif inner.exception() is not None:
+            future.set_exception(inner.exception())
+        else:
+            future.set_result(inner.result())
+        try:
+            self._dispatcher.submit(self._dispatch)
+        except RuntimeError:
+            # Scheduler cerrado: no se despacha nada más
+            pass
+
+    def close(self) -> None:
+        """
+        Detiene el hilo de despacho (después de apagar el executor).
+        """
+        self._dispatcher.shutdown(wait=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "running": self.running,
+                "lanes": {
+                    lane: {
+                        "weight": self.weights[lane],
+                        "max_depth": self.max_depths.get(lane, 0),
+                        "depth": len(self._queues[lane]),
+                        **self.stats[lane],
+                    }
+                    for lane in LANES
+                },
+            }
@@ -1,7 +1,11 @@
+import asyncio
 import time
-from typing import Any, Dict
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
 
 import requests
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
 
 
 def analyze_performance(url: str, timeout: int = 30) -> Dict[str, Any]:
@@ -38,3 +42,173 @@ def analyze_performance(url: str, timeout: int = 30) -> Dict[str, Any]:
             "num_requests": num_requests,
             "error": str(e),
         }
+
+
+class SubresourceParser(HTMLParser):
+    """
+    Junta los sub-recursos que un navegador descargaría al cargar la página:
+    scripts externos, hojas de estilo e imágenes.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.resources: List[Tuple[str, str]] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attr = dict(attrs)
+        if tag == "script" and attr.get("src"):
+            self.resources.append(("script", attr["src"]))
+        elif tag == "img" and attr.get("src"):
+            self.resources.append(("image", attr["src"]))
+        elif tag == "link" and attr.get("href"):
+            rel = (attr.get("rel") or "").lower().split()
+            if "stylesheet" in rel:
+                self.resources.append(("stylesheet", attr["href"]))
+
+
+def find_subresources(html: str, base_url: str, limit: int) -> List[Tuple[str, str]]:
+    """
+    Devuelve [(tipo, url absoluta)] sin repetidos, como máximo 'limit'.
+    Solo se consideran recursos http(s) (se descartan data:, javascript:, etc.).
+    """
+    parser = SubresourceParser()
+    parser.feed(html)
+    parser.close()
+
+    seen = set()
+    found: List[Tuple[str, str]] = []
+    for kind, ref in parser.resources:
+        absolute = urljoin(base_url, ref.strip())
+        if urlsplit(absolute).scheme not in ("http", "https") or absolute in seen:
+            continue
+        seen.add(absolute)
+        found.append((kind, absolute))
+        if len(found) >= limit:
+            break
+    return found
+
+
+class AsyncPerformanceAnalyzer:
+    """
+    Analizador de performance asíncrono (aiohttp):
+      - una única ClientSession compartida (keep-alive + cache de DNS)
+      - descarga la página y sus sub-recursos (scripts, CSS, imágenes)
+        en paralelo, con límite de conexiones por host
+      - informa un waterfall: bytes, TTFB y tiempos por recurso
+    """
+
+    def __init__(
+        self,
+        timeout: float = 30,
+        limit: int = 100,
+        limit_per_host: int = 6,
+        dns_ttl: int = 300,
+        max_resources: int = 50,
+        fetch_subresources: bool = True,
+    ) -> None:
+        self.timeout = timeout
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.max_resources = max_resources
+        self.fetch_subresources = fetch_subresources
+        self._session: Optional[ClientSession] = None
+
+    async def start(self) -> None:
+        if self._session is None:
+            connector = TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+            )
+            self._session = ClientSession(
+                connector=connector,
+                timeout=ClientTimeout(total=self.timeout),
+            )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _fetch(
+        self,
+        url: str,
+        kind: str,
+        origin: float,
+        keep_body: bool = False,
+    ) -> Tuple[Dict[str, Any], Optional[bytes], Optional[str]]:
+        """
+        Descarga un recurso midiendo TTFB y duración.
+        Devuelve (entrada del waterfall, body si keep_body, charset).
+        """
+        assert self._session is not None
+        start = time.perf_counter()
+        entry: Dict[str, Any] = {
+            "url": url,
+            "type": kind,
+            "start_ms": round((start - origin) * 1000, 1),
+        }
+        body: Optional[bytes] = None
+        charset: Optional[str] = None
+        size = 0
+        try:
+            async with self._session.get(url) as resp:
+                # Al entrar al contexto ya llegaron status y headers
+                entry["ttfb_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                entry["status"] = resp.status
+                if str(resp.url) != url:
+                    # Hubo redirects: los sub-recursos se resuelven contra esta URL
+                    entry["final_url"] = str(resp.url)
+                resp.raise_for_status()
+                charset = resp.charset
+
+                chunks: List[bytes] = []
+                async for chunk in resp.content.iter_chunked(8192):
+                    size += len(chunk)
+                    if keep_body:
+                        chunks.append(chunk)
+                if keep_body:
+                    body = b"".join(chunks)
+        except Exception as e:
+            entry["error"] = str(e) or type(e).__name__
+
+        entry["size_bytes"] = size
+        entry["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return entry, body, charset
+
+    async def analyze(self, url: str) -> Dict[str, Any]:
+        await self.start()
+        origin = time.perf_counter()
+
+        main_entry, body, charset = await self._fetch(url, "document", origin, keep_body=True)
+        waterfall = [main_entry]
+
+        if "error" in main_entry:
+            return {
+                "load_time_ms": None,
+                "total_size_kb": None,
+                "num_requests": 1,
+                "error": main_entry["error"],
+                "waterfall": waterfall,
+            }
+
+        if self.fetch_subresources and body:
+            html = body.decode(charset or "utf-8", errors="replace")
+            base_url = main_entry.get("final_url", url)
+            resources = find_subresources(html, base_url, self.max_resources)
+            entries = await asyncio.gather(*(
+                self._fetch(res_url, kind, origin) for kind, res_url in resources
+            ))
+            waterfall.extend(entry for entry, _, _ in entries)
+
+        total_bytes = sum(entry["size_bytes"] for entry in waterfall)
+        return {
+            "load_time_ms": int((time.perf_counter() - origin) * 1000),
+            "total_size_kb": round(total_bytes / 1024, 2),
+            "total_bytes": total_bytes,
+            "num_requests": len(waterfall),
+            "failed_requests": sum(1 for entry in waterfall if "error" in entry),
+            "ttfb_ms": main_entry.get("ttfb_ms"),
+            "waterfall": waterfall,
+        }
@@ -1,25 +1,66 @@
 from io import BytesIO
+from typing import Optional, Tuple
 
-from PIL import Image, ImageDraw
-import base64
+from PIL import Image, ImageDraw, ImageFont
 
 
-def generate_dummy_screenshot(url: str) -> Image.Image:
+# Plantilla por proceso: el canvas en blanco con "Screenshot of:" ya dibujado.
+# Cada worker del pool la arma una sola vez (ver warm_up) y por cada URL
+# solo se copia y se dibuja la línea de la URL.
+SCREENSHOT_SIZE = (800, 600)
+TEXT_ORIGIN = (20, 20)
+TEXT_COLOR = (0, 0, 0)
+# Mismo interlineado que usa ImageDraw.multiline_text por defecto
+LINE_SPACING = 4
+
+_font: Optional[ImageFont.ImageFont] = None
+_template: Optional[Image.Image] = None
+_url_origin: Tuple[int, int] = TEXT_ORIGIN
+
+
+def _get_font() -> ImageFont.ImageFont:
+    # load_default() vuelve a cargar la fuente en cada ImageDraw nuevo
+    global _font
+    if _font is None:
+        _font = ImageFont.load_default()
+    return _font
+
+
+def _get_template() -> Image.Image:
+    global _template, _url_origin
+    if _template is None:
+        font = _get_font()
+        template = Image.new("RGB", SCREENSHOT_SIZE, color=(255, 255, 255))
+        draw = ImageDraw.Draw(template)
+        draw.text(TEXT_ORIGIN, "Screenshot of:", fill=TEXT_COLOR, font=font)
+
+        line_height = draw.textbbox((0, 0), "A", font=font)[3] + LINE_SPACING
+        _url_origin = (TEXT_ORIGIN[0], TEXT_ORIGIN[1] + line_height)
+        _template = template
+    return _template
+
+
+def warm_up() -> None:
     """
-    Genera una imagen PNG simple con el texto de la URL.
+    Carga la fuente y arma la plantilla del screenshot.
+    Se llama desde el initializer del pool para que el primer request de
+    cada worker no pague ese costo.
     """
-    width, height = 800, 600
-    img = Image.new("RGB", (width, height), color=(255, 255, 255))
-    draw = ImageDraw.Draw(img)
+    _get_template()
 
-    text = f"Screenshot of:\n{url}"
-    draw.text((20, 20), text, fill=(0, 0, 0))
 
+def generate_dummy_screenshot(url: str) -> Image.Image:
+    """
+    Genera una imagen simple con el texto de la URL.
+    Parte de una copia de la plantilla y solo dibuja la URL.
+    """
+    img = _get_template().copy()
+    draw = ImageDraw.Draw(img)
+    draw.text(_url_origin, url, fill=TEXT_COLOR, font=_get_font())
     return img
 
 
-def image_to_base64(img: Image.Image, format: str = "PNG") -> str:
+def image_to_bytes(img: Image.Image, format: str = "PNG", **save_options) -> bytes:
     buf = BytesIO()
-    img.save(buf, format=format)
-    data = buf.getvalue()
-    return base64.b64encode(data).decode("ascii")
+    img.save(buf, format=format, **save_options)
+    return buf.getvalue()
@@ -0,0 +1,190 @@
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .scheduler import FairScheduler
+
+
+class AdmissionRejected(Exception):
+    """
+    El request no se admite. Lleva el código HTTP a devolver y cuántos
+    segundos debería esperar el cliente antes de reintentar (Retry-After).
+    """
+
+    status = 503
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFullError(AdmissionRejected):
+    status = 503
+
+
+class QueueTimeoutError(AdmissionRejected):
+    status = 503
+
+
+class RateLimitedError(AdmissionRejected):
+    status = 429
+
+
+class AdmissionController:
+    """
+    Control de admisión delante del scraping:
+      - como máximo 'concurrency' tareas activas a la vez, y como máximo
+        'per_host' por host; los lugares libres se reparten en round-robin
+        entre hosts (ver FairScheduler)
+      - como máximo 'max_queue' tareas esperando un lugar (None = sin límite);
+        con la cola llena se rechaza en el acto en lugar de encolar
+      - una tarea que espera más de 'queue_timeout' segundos se descarta
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        retry_after: float = 1.0,
+        per_host: Optional[int] = None,
+    ) -> None:
+        self._scheduler = FairScheduler(concurrency, per_host)
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.queued = 0
+        self.stats: Dict[str, int] = {"admitted": 0, "rejected": 0, "timed_out": 0}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, host: str = "") -> AsyncIterator[None]:
+        if (
+            self.max_queue is not None
+            and self._scheduler.would_wait(host)
+            and self.queued >= self.max_queue
+        ):
+            self.stats["rejected"] += 1
+            raise QueueFullError(
+                f"Servidor saturado: {self.queued} requests en cola",
+                self.retry_after,
+            )
+
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._scheduler.acquire(host), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise QueueTimeoutError(
+                f"Se superó el tiempo máximo de espera en cola ({self.queue_timeout}s)",
+                self.retry_after,
+            ) from None
+        finally:
+            self.queued -= 1
+
+        self.active += 1
+        self.stats["admitted"] += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._scheduler.release(host)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            **self.stats,
+            **self._scheduler.snapshot(),
+        }
+
+
+class TokenBucket:
+    """
+    Token bucket clásico: se recargan 'rate' tokens por segundo hasta
+    'burst'. Cada request consume un token.
+    """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Consume los tokens si hay. Devuelve 0 si se pudo, o los segundos
+        que faltan para que alcancen.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Un token bucket por cliente. Se guardan como máximo 'max_clients'
+    buckets; los de clientes inactivos se descartan primero (LRU).
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000) -> None:
+        if rate <= 0:
+            raise ValueError("rate debe ser > 0")
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.rejected = 0
+
+    def _bucket(self, client: str) -> TokenBucket:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+            self._buckets[client] = bucket
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        return bucket
+
+    def check(self, client: str) -> None:
+        """
+        Consume un token del cliente o lanza RateLimitedError.
+        """
+        wait = self._bucket(client).try_acquire()
+        if wait > 0:
+            self.rejected += 1
+            raise RateLimitedError(
+                f"Límite de {self.rate:g} requests/s por cliente superado",
+                wait,
+            )
+
+    async def wait(self, client: str) -> None:
+        """
+        Espera hasta tener un token (para clientes que aceptan ir más lento,
+        como los batch).
+        """
+        while True:
+            wait = self._bucket(client).try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "rejected": self.rejected,
+        }
@@ -1,28 +1,135 @@
 import asyncio
-from typing import Any, Dict, Tuple
+import codecs
+from typing import Any, Dict, Optional, Tuple
 
-from aiohttp import ClientSession
+from aiohttp import ClientSession, TCPConnector
+
+from .stream_parser import ScrapingDataParser
+
+
+def create_http_session(
+    limit: int = 100,
+    limit_per_host: int = 0,
+    ttl_dns_cache: Optional[int] = 300,
+    keepalive_timeout: float = 30,
+) -> ClientSession:
+    """
+    ClientSession con el connector ajustado para scraping:
+      - 'limit' conexiones abiertas en total y 'limit_per_host' por host
+        (0 = sin límite), para no saturar a un mismo sitio
+      - cache de DNS de 'ttl_dns_cache' segundos (None = para siempre)
+      - las conexiones ociosas se mantienen 'keepalive_timeout' segundos
+        para reusarlas en el siguiente request al mismo host
+    Debe crearse dentro del event loop (en on_startup).
+    """
+    connector = TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        ttl_dns_cache=ttl_dns_cache,
+        use_dns_cache=True,
+        keepalive_timeout=keepalive_timeout,
+    )
+    return ClientSession(connector=connector)
 
 
 async def fetch_html(
     url: str,
     session: ClientSession,
-    timeout: int = 30
+    timeout: int = 30,
+    headers: Optional[Dict[str, str]] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Descarga el HTML de una URL usando aiohttp de forma asíncrona.
     Devuelve el texto y algunos datos básicos de la respuesta.
+    Con headers condicionales (If-None-Match, ...) la respuesta puede ser
+    un 304 sin body: el texto vuelve vacío e info["status"] == 304.
     """
     try:
-        async with session.get(url, timeout=timeout) as resp:
+        async with session.get(url, timeout=timeout, headers=headers) as resp:
             resp.raise_for_status()
             text = await resp.text()
             info = {
                 "status": resp.status,
                 "content_type": resp.headers.get("Content-Type"),
                 "final_url": str(resp.url),
+                **_validators(resp.headers),
             }
             return text, info
     except Exception as e:
         # Re-lanzamos para que lo maneje quien llama
         raise RuntimeError(f"Error al descargar la página: {e}") from e
+
+
+async def fetch_and_extract_stream(
+    url: str,
+    session: ClientSession,
+    timeout: int = 30,
+    max_body_bytes: Optional[int] = None,
+    chunk_size: int = 16 * 1024,
+    headers: Optional[Dict[str, str]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Descarga la página y la va parseando a medida que llegan los chunks,
+    así la extracción se superpone con la transferencia y nunca se tiene
+    el body completo en memoria.
+    Si se indica max_body_bytes, se deja de descargar al llegar a ese
+    tamaño y se devuelve lo extraído hasta ahí (info["truncated"] = True).
+    El tope no corta el <head>: si al llegar a él todavía no terminó, se
+    sigue descargando hasta tener el título y los meta tags.
+    Devuelve (scraping_data, info de la respuesta); con un 304 el
+    scraping_data no sirve y hay que usar el que se tenía (ver fetch_html).
+    """
+    try:
+        async with session.get(url, timeout=timeout, headers=headers) as resp:
+            resp.raise_for_status()
+
+            # Decoder incremental: un carácter multibyte puede quedar
+            # partido entre dos chunks
+            decoder = codecs.getincrementaldecoder(_charset_of(resp.charset))(errors="replace")
+            parser = ScrapingDataParser()
+            bytes_read = 0
+            truncated = False
+
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                over_cap = max_body_bytes is not None and bytes_read + len(chunk) > max_body_bytes
+                if over_cap and parser.head_done:
+                    chunk = chunk[:max_body_bytes - bytes_read]
+                bytes_read += len(chunk)
+                parser.feed(decoder.decode(chunk))
+                if over_cap and parser.head_done:
+                    truncated = True
+                    break
+
+            parser.feed(decoder.decode(b"", final=True))
+            parser.close()
+
+            info = {
+                "status": resp.status,
+                "content_type": resp.headers.get("Content-Type"),
+                "final_url": str(resp.url),
+                "bytes_read": bytes_read,
+                "truncated": truncated,
+                **_validators(resp.headers),
+            }
+            return parser.result(), info
+    except Exception as e:
+        raise RuntimeError(f"Error al descargar la página: {e}") from e
+
+
+def _validators(headers: Any) -> Dict[str, Optional[str]]:
+    """
+    Validadores de la respuesta para revalidar con un GET condicional.
+    """
+    return {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    }
+
+
+def _charset_of(charset: Optional[str]) -> str:
+    if charset:
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            pass
+    return "utf-8"
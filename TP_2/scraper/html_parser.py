@@ -1,8 +1,9 @@
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List
 
 from bs4 import BeautifulSoup
 
 from .metadata_extractor import extract_meta_tags
+from .stream_parser import extract_scraping_data_stream
 
 
 def extract_scraping_data(html: str) -> Dict[str, Any]:
@@ -50,3 +51,23 @@ def extract_scraping_data(html: str) -> Dict[str, Any]:
         "structure": structure,
         "images_count": images_count,
     }
+
+
+# Backends de extracción disponibles (--parser-backend)
+EXTRACTORS: Dict[str, Callable[[str], Dict[str, Any]]] = {
+    "bs4": extract_scraping_data,
+    "stream": extract_scraping_data_stream,
+}
+
+
+def get_extractor(backend: str) -> Callable[[str], Dict[str, Any]]:
+    """
+    Devuelve la función de extracción para el backend pedido.
+    """
+    try:
+        return EXTRACTORS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Backend de parseo desconocido: {backend!r} "
+            f"(opciones: {', '.join(EXTRACTORS)})"
+        ) from None
@@ -3,6 +3,14 @@ from typing import Dict
 from bs4 import BeautifulSoup
 
 
+def is_relevant_meta(name: str) -> bool:
+    """
+    Indica si un meta tag nos interesa: description, keywords u Open Graph.
+    """
+    lname = name.lower()
+    return lname in ("description", "keywords") or lname.startswith("og:")
+
+
 def extract_meta_tags(soup: BeautifulSoup) -> Dict[str, str]:
     """
     Extrae meta tags relevantes:
@@ -20,8 +28,7 @@ def extract_meta_tags(soup: BeautifulSoup) -> Dict[str, str]:
         if not name or not content:
             continue
 
-        lname = name.lower()
-        if lname in ("description", "keywords") or lname.startswith("og:"):
+        if is_relevant_meta(name):
             meta_tags[name] = content
 
     return meta_tags
@@ -0,0 +1,109 @@
+import threading
+from typing import Any, Dict, Optional
+
+from common.cache import TieredCache
+from common.urls import normalize_url
+
+
+# Cuánto se conserva una página cacheada sin que nadie la pida (segundos).
+# No es un TTL de frescura: toda página se revalida con el servidor de origen.
+DEFAULT_PAGE_TTL = 24 * 3600
+
+
+class PageCache:
+    """
+    Cache HTTP de páginas scrapeadas para revalidar con GET condicional.
+
+    Por cada página se guardan sus validadores (ETag / Last-Modified), la
+    info de la respuesta y el scraping_data ya extraído, indexados por URL
+    final (después de redirecciones). La URL pedida apunta a la final con
+    un alias, así dos URLs que redirigen a la misma página comparten entrada.
+
+    Al volver a pedirla se manda If-None-Match / If-Modified-Since; si el
+    origen responde 304 se reusa la extracción sin descargar ni parsear.
+    No se guarda el HTML: lo único que se reusa es la extracción.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        disk_dir: Optional[str] = None,
+        ttl: float = DEFAULT_PAGE_TTL,
+    ) -> None:
+        self.ttl = ttl
+        self._store = TieredCache(max_bytes, disk_dir)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "lookups": 0,
+            "revalidated": 0,
+            "changed": 0,
+            "stored": 0,
+            "uncacheable": 0,
+        }
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve la entrada de la página a la que lleva 'url', o None.
+        """
+        self._count("lookups")
+        final_url = self._store.get(f"alias:{normalize_url(url)}")
+        if final_url is None:
+            return None
+        return self._store.get(f"page:{final_url}")
+
+    @staticmethod
+    def conditional_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def revalidated(self, url: str, entry: Dict[str, Any], info: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        El origen respondió 304: se renueva la entrada y se devuelve la
+        info a informar (la de la respuesta original, marcada como cacheada).
+        """
+        self._count("revalidated")
+        self._save(url, entry)
+        return {**entry["info"], "status": info.get("status", 304), "cached": True}
+
+    def store(self, url: str, scraping_data: Dict[str, Any], info: Dict[str, Any], had_entry: bool = False) -> bool:
+        """
+        Guarda una respuesta 200 completa que traiga algún validador.
+        Devuelve False si no se puede revalidar (o vino truncada).
+        """
+        if had_entry:
+            self._count("changed")
+        etag = info.get("etag")
+        last_modified = info.get("last_modified")
+        if info.get("status") != 200 or info.get("truncated") or not (etag or last_modified):
+            self._count("uncacheable")
+            return False
+
+        self._save(url, {
+            "final_url": info.get("final_url") or url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "info": info,
+            "scraping_data": scraping_data,
+        })
+        self._count("stored")
+        return True
+
+    def _save(self, url: str, entry: Dict[str, Any]) -> None:
+        final_url = normalize_url(entry["final_url"])
+        self._store.set(f"page:{final_url}", entry, self.ttl)
+        self._store.set(f"alias:{normalize_url(url)}", final_url, self.ttl)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.stats)
+        stats["ttl"] = self.ttl
+        stats.update(self._store.get_stats())
+        return stats
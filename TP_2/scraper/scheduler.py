@@ -0,0 +1,151 @@
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from urllib.parse import urlsplit
+
+
+def host_key(url: str) -> str:
+    """
+    Clave de cortesía de una URL: host (y puerto si no es el default).
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    return f"{host}:{port}" if port else host
+
+
+class FairScheduler:
+    """
+    Reparte 'concurrency' lugares entre claves (hosts) de forma justa:
+      - cada clave tiene su propia cola FIFO
+      - como máximo 'per_key' lugares ocupados por clave (None = sin tope)
+      - cuando se libera un lugar se atiende a la clave con menos lugares
+        ocupados (a igualdad, en round-robin), no al primero que llegó;
+        así un dominio lento con muchos pedidos encolados no acapara
+        todos los workers
+    """
+
+    def __init__(self, concurrency: int, per_key: Optional[int] = None) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency debe ser >= 1")
+        self.concurrency = concurrency
+        self.per_key = per_key if per_key and per_key > 0 else None
+        self.active = 0
+        self._active: Dict[str, int] = {}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {}
+        # Claves con pedidos esperando, en orden de atención
+        self._ring: Deque[str] = deque()
+
+    def _has_room(self, key: str) -> bool:
+        if self.active >= self.concurrency:
+            return False
+        return self.per_key is None or self._active.get(key, 0) < self.per_key
+
+    def would_wait(self, key: str) -> bool:
+        return bool(self._waiters.get(key)) or not self._has_room(key)
+
+    def _grant(self, key: str) -> None:
+        self.active += 1
+        self._active[key] = self._active.get(key, 0) + 1
+
+    async def acquire(self, key: str) -> None:
+        if not self.would_wait(key):
+            self._grant(key)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._waiters.setdefault(key, deque())
+        waiters.append(future)
+        if key not in self._ring:
+            self._ring.append(key)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Se le dio el lugar justo antes de cancelarse: devolverlo
+                self.release(key)
+            else:
+                self._discard(key, future)
+            raise
+
+    def _discard(self, key: str, future: asyncio.Future) -> None:
+        waiters = self._waiters.get(key)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(future)
+        except ValueError:
+            pass
+        if not waiters:
+            del self._waiters[key]
+            try:
+                self._ring.remove(key)
+            except ValueError:
+                pass
+
+    def release(self, key: str) -> None:
+        self.active -= 1
+        remaining = self._active.get(key, 1) - 1
+        if remaining > 0:
+            self._active[key] = remaining
+        else:
+            self._active.pop(key, None)
+        self._dispatch()
+
+    def _next_key(self) -> Optional[str]:
+        """
+        Siguiente clave a atender: la que tiene menos lugares ocupados y,
+        a igualdad, la que lleva más tiempo sin ser atendida.
+        """
+        best: Optional[str] = None
+        for key in self._ring:
+            if not self._has_room(key):
+                continue
+            if best is None or self._active.get(key, 0) < self._active.get(best, 0):
+                best = key
+        return best
+
+    def _dispatch(self) -> None:
+        """
+        Da los lugares libres a las claves que esperan, de a uno por clave
+        y en round-robin.
+        """
+        while self.active < self.concurrency:
+            key = self._next_key()
+            if key is None:
+                return
+            waiters = self._waiters[key]
+            # Un waiter cancelado todavía puede estar en la cola
+            while waiters and waiters[0].done():
+                waiters.popleft()
+            self._ring.remove(key)
+            if not waiters:
+                del self._waiters[key]
+                continue
+            future = waiters.popleft()
+            if waiters:
+                self._ring.append(key)
+            else:
+                del self._waiters[key]
+            self._grant(key)
+            future.set_result(None)
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(w) for w in self._waiters.values())
+
+    def snapshot(self, top: int = 10) -> Dict[str, Any]:
+        hosts: List[Dict[str, Any]] = [
+            {"host": key, "active": self._active.get(key, 0), "waiting": len(self._waiters.get(key, ()))}
+            for key in set(self._active) | set(self._waiters)
+        ]
+        hosts.sort(key=lambda h: (h["waiting"], h["active"]), reverse=True)
+        return {
+            "per_host": self.per_key,
+            "hosts_active": len(self._active),
+            "hosts_waiting": len(self._waiters),
+            "busiest_hosts": hosts[:top],
+        }
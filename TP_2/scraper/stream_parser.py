@@ -0,0 +1,140 @@
+from html import unescape
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metadata_extractor import is_relevant_meta
+
+
+_HEADER_TAGS = {f"h{level}" for level in range(1, 7)}
+
+# Elementos cuyo contenido es texto y no tags, igual que en lxml (el
+# parser de BeautifulSoup): un <a> dentro de un <textarea> no es un link,
+# y un comentario dentro de <title> es parte del título. html.parser
+# solo lo hace con <script> y <style>. Después de <plaintext> todo el
+# resto del documento es texto.
+_RAW_TEXT_TAGS = frozenset({"title", "textarea", "iframe", "xmp", "noembed", "noframes"})
+
+# Tags que pueden ir en el <head>; cualquier otro (o </head>) indica que
+# el <head> terminó y con él el título y los meta tags
+_HEAD_TAGS = frozenset({
+    "html", "head", "title", "meta", "link", "base", "script", "style", "noscript", "template",
+})
+
+
+def _first_attr(attrs: List[Tuple[str, Optional[str]]], name: str) -> Optional[str]:
+    # Si un atributo aparece repetido, vale el primero (igual que lxml)
+    for key, value in attrs:
+        if key == name:
+            return value
+    return None
+
+
+class ScrapingDataParser(HTMLParser):
+    """
+    Extractor de una sola pasada basado en eventos (html.parser).
+    No arma árbol: va acumulando título, links, meta tags, headers e
+    imágenes a medida que aparecen los tags. Se le puede dar el HTML
+    completo o de a pedazos con feed(), por ejemplo mientras se descarga.
+    El contenido de los elementos de texto (_RAW_TEXT_TAGS) se trata
+    como en lxml, así la salida es la misma que la de extract_scraping_data.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.title_parts: List[str] = []
+        self.title_seen = False
+        self.in_title = False
+        self.in_plaintext = False
+        self.head_done = False
+        self.links: List[str] = []
+        self.meta_tags: Dict[str, str] = {}
+        self.structure: Dict[str, int] = {f"h{level}": 0 for level in range(1, 7)}
+        self.images_count = 0
+
+    def set_cdata_mode(self, elem: str, **kwargs: Any) -> None:
+        # Siempre texto crudo: las versiones de Python que tratan <title>
+        # como RCDATA decodificarían las entidades antes que nosotros
+        super().set_cdata_mode(elem)
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self.in_plaintext:
+            return
+        self._start(tag, attrs)
+        if tag in _RAW_TEXT_TAGS:
+            self.set_cdata_mode(tag)
+        elif tag == "plaintext":
+            self.in_plaintext = True
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        # <img/>, <meta/>, etc.: cuentan igual que el tag de apertura,
+        # pero no abren un elemento de texto
+        if self.in_plaintext:
+            return
+        self._start(tag, attrs)
+        if tag == "title":
+            self.in_title = False
+
+    def _start(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag not in _HEAD_TAGS:
+            self.head_done = True
+
+        if tag == "a":
+            href = _first_attr(attrs, "href")
+            if href:
+                self.links.append(href)
+        elif tag == "img":
+            self.images_count += 1
+        elif tag in _HEADER_TAGS:
+            self.structure[tag] += 1
+        elif tag == "meta":
+            name = _first_attr(attrs, "name") or _first_attr(attrs, "property")
+            content = _first_attr(attrs, "content")
+            if name and content and is_relevant_meta(name):
+                self.meta_tags[name] = content
+        elif tag == "title" and not self.title_seen:
+            self.title_seen = True
+            self.in_title = True
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "title":
+            self.in_title = False
+        elif tag == "head":
+            self.head_done = True
+
+    def handle_data(self, data: str) -> None:
+        if self.in_title:
+            self.title_parts.append(data)
+
+    def close(self) -> None:
+        if self.in_title:
+            # <title> sin cerrar: lxml toma el resto del documento como
+            # título, html.parser lo descartaría
+            self.title_parts.append(self.rawdata)
+            self.rawdata = ""
+        super().close()
+
+    def result(self) -> Dict[str, Any]:
+        title: Optional[str] = None
+        if self.title_parts:
+            # El título llega crudo (ver set_cdata_mode): las entidades se
+            # decodifican al final, por si alguna quedó partida entre chunks
+            title = unescape("".join(self.title_parts)).strip()
+
+        return {
+            "title": title,
+            "links": list(self.links),
+            "meta_tags": dict(self.meta_tags),
+            "structure": dict(self.structure),
+            "images_count": self.images_count,
+        }
+
+
+def extract_scraping_data_stream(html: str) -> Dict[str, Any]:
+    """
+    Misma salida que extract_scraping_data, pero en una sola pasada y sin
+    construir el árbol de BeautifulSoup.
+    """
+    parser = ScrapingDataParser()
+    parser.feed(html)
+    parser.close()
+    return parser.result()
@@ -0,0 +1,151 @@
+import multiprocessing
+import signal
+import socket
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+
+def reuse_port_supported() -> bool:
+    return hasattr(socket, "SO_REUSEPORT")
+
+
+def bind_socket(host: str, port: int, backlog: int = 1024) -> socket.socket:
+    """
+    Crea el socket de escucha en el proceso padre para compartirlo con
+    todos los workers (IPv6 si la IP tiene ':').
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+class _Worker:
+    def __init__(self, process: multiprocessing.Process, ready: Any) -> None:
+        self.process = process
+        self.ready = ready
+        self.started = time.monotonic()
+
+
+class Supervisor:
+    """
+    Proceso padre de --procs N: levanta N workers y los mantiene vivos.
+      - SIGTERM / SIGINT: apagado ordenado (cada worker deja de aceptar
+        conexiones y termina los requests en curso)
+      - SIGHUP: reload escalonado; se levanta un worker nuevo, se espera
+        a que esté escuchando y recién ahí se apaga uno viejo, así nunca
+        baja la capacidad. Los workers se crean con 'spawn', por lo que
+        un reload también toma el código nuevo del disco.
+      - si un worker muere solo, se lo reemplaza
+
+    target(*args, sock, ready) debe servir en 'sock' (o en su propio socket
+    con SO_REUSEPORT si sock es None), llamar a ready.set() cuando ya
+    acepta conexiones y terminar limpio al recibir SIGTERM.
+    """
+
+    def __init__(
+        self,
+        target: Callable[..., None],
+        args: Tuple[Any, ...],
+        procs: int,
+        sock: Optional[socket.socket] = None,
+        start_timeout: float = 30.0,
+        stop_timeout: float = 60.0,
+    ) -> None:
+        if procs < 1:
+            raise ValueError("procs debe ser >= 1")
+        self.target = target
+        self.args = args
+        self.procs = procs
+        self.sock = sock
+        self.start_timeout = start_timeout
+        self.stop_timeout = stop_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._workers: List[_Worker] = []
+        self._stopping = False
+        self._reload_requested = False
+
+    # Señales (solo marcan flags; el trabajo se hace en el loop de run)
+
+    def _on_stop(self, signum: int, frame: Any) -> None:
+        self._stopping = True
+
+    def _on_reload(self, signum: int, frame: Any) -> None:
+        self._reload_requested = True
+
+    def _spawn(self) -> _Worker:
+        ready = self._ctx.Event()
+        process = self._ctx.Process(
+            target=self.target,
+            args=(*self.args, self.sock, ready),
+            daemon=False,
+        )
+        process.start()
+        return _Worker(process, ready)
+
+    def _stop_worker(self, worker: _Worker) -> None:
+        if worker.process.is_alive():
+            worker.process.terminate()  # SIGTERM: apagado ordenado
+        worker.process.join(self.stop_timeout)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join()
+
+    def _start_worker(self) -> _Worker:
+        worker = self._spawn()
+        if not worker.ready.wait(self.start_timeout):
+            self._stop_worker(worker)
+            raise RuntimeError("El worker no empezó a escuchar a tiempo")
+        return worker
+
+    def _reload(self) -> None:
+        print(f"[Supervisor] Reload de {len(self._workers)} workers")
+        for index, old in enumerate(list(self._workers)):
+            if self._stopping:
+                return
+            try:
+                self._workers[index] = self._start_worker()
+            except RuntimeError as e:
+                # Si el código nuevo no arranca, se conservan los viejos
+                print(f"[Supervisor] Reload cancelado: {e}")
+                return
+            self._stop_worker(old)
+            print(f"[Supervisor] Worker {old.process.pid} -> {self._workers[index].process.pid}")
+
+    def _replace_dead(self) -> None:
+        for index, worker in enumerate(self._workers):
+            if worker.process.is_alive() or self._stopping:
+                continue
+            print(f"[Supervisor] Worker {worker.process.pid} terminó "
+                  f"(código {worker.process.exitcode}); se reemplaza")
+            # Evitar un loop de reinicios si el worker muere al arrancar
+            if time.monotonic() - worker.started < 1.0:
+                time.sleep(1.0)
+            self._workers[index] = self._spawn()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self._on_reload)
+
+        try:
+            self._workers = [self._spawn() for _ in range(self.procs)]
+            while not self._stopping:
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self._reload()
+                self._replace_dead()
+                time.sleep(0.2)
+        finally:
+            print("[Supervisor] Apagando workers...")
+            for worker in self._workers:
+                if worker.process.is_alive():
+                    worker.process.terminate()
+            for worker in self._workers:
+                self._stop_worker(worker)
+            if self.sock is not None:
+                self.sock.close()
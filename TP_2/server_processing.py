@@ -1,62 +1,475 @@
 import argparse
+import asyncio
+import functools
 import json
+import os
+import queue
 import socket
 import struct
-from concurrent.futures import ProcessPoolExecutor
-from typing import Any, Dict
+import threading
+import time
+from concurrent.futures import (
+    CancelledError,
+    Future,
+    InvalidStateError,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Any, Dict, Tuple
 
 import socketserver
 
-from processor.screenshot import generate_dummy_screenshot, image_to_base64
-from processor.image_processor import create_thumbnails
-from processor.performance import analyze_performance
-from common.protocol import send_message_sync, recv_message_sync
-
-
-# Pool de procesos (se inicializa en main)
+from processor.screenshot import generate_dummy_screenshot, image_to_bytes, warm_up
+from processor.image_processor import (
+    DEFAULT_THUMBNAIL_CONFIG,
+    THUMBNAIL_FORMATS,
+    ThumbnailConfig,
+    create_thumbnails_with_timings,
+    parse_sizes,
+)
+from processor.performance import AsyncPerformanceAnalyzer, analyze_performance
+from processor.cache import DEFAULT_TTLS, ResultCache
+from processor.lanes import (
+    DEFAULT_LANE,
+    DEFAULT_LANE_DEPTHS,
+    DEFAULT_LANE_WEIGHTS,
+    LANES,
+    LaneFullError,
+    LaneScheduler,
+    parse_lane_values,
+)
+from common.loop_thread import LoopThread
+from common.metrics import MetricsRegistry
+from common.protocol import (
+    DEFAULT_WIRE,
+    MessageTooLargeError,
+    negotiate_version,
+    register_traffic_metrics,
+    set_max_message_size,
+    send_message_sync,
+    recv_message_sync,
+    send_message_async,
+    recv_message_async,
+)
+
+
+# Pool de procesos para trabajo CPU-bound (se inicializa en main)
 PROCESS_POOL: ProcessPoolExecutor | None = None
 
+# Carriles de prioridad delante del pool de procesos (se inicializa en main)
+PROCESS_LANES: LaneScheduler | None = None
+
+# Pool de hilos para trabajo I/O-bound (se inicializa en main)
+IO_POOL: ThreadPoolExecutor | None = None
+
+# Analizador de performance asíncrono y el event loop (en un hilo propio)
+# donde vive su ClientSession compartida. None = usar el analizador síncrono.
+PERF_LOOP: LoopThread | None = None
+PERF_ANALYZER: AsyncPerformanceAnalyzer | None = None
+
+# Configuración de thumbnails (se define en main y viaja a los workers)
+THUMBNAIL_CONFIG: ThumbnailConfig = DEFAULT_THUMBNAIL_CONFIG
+
+# Cache de resultados por URL (se inicializa en main; None = deshabilitado)
+RESULT_CACHE: ResultCache | None = None
+
+# Hilo que guarda los resultados en el cache, fuera del hilo que recolecta
+# los resultados del pool (se inicializa en main; None = escribir en el acto)
+CACHE_WRITER: ThreadPoolExecutor | None = None
+
+
+# Métricas del proceso (se consultan con el comando "stats")
+METRICS = MetricsRegistry(prefix="processing_")
+STAGE_SECONDS = METRICS.histogram(
+    "stage_seconds",
+    "Duración de cada etapa del procesamiento, en segundos",
+    ("stage",),
+)
+REQUEST_SECONDS = METRICS.histogram(
+    "request_seconds",
+    "Tiempo total de un pedido, desde que llega hasta que se arma la respuesta",
+)
+REQUESTS_TOTAL = METRICS.counter(
+    "requests_total",
+    "Pedidos atendidos según resultado (computed, cached, error, expired, cancelled, rejected)",
+    ("outcome",),
+)
+IN_FLIGHT = METRICS.gauge("in_flight", "Pedidos en curso")
+POOL_PENDING = METRICS.gauge(
+    "pool_pending",
+    "Sub-tareas enviadas a cada pool que todavía no terminaron",
+    ("pool",),
+)
+POOL_QUEUE_DEPTH = METRICS.gauge(
+    "pool_queue_depth",
+    "Sub-tareas esperando un worker libre en cada pool",
+    ("pool",),
+)
+LANE_DEPTH = METRICS.gauge(
+    "lane_depth",
+    "Sub-tareas de imágenes esperando en cada carril de prioridad",
+    ("lane",),
+)
+LANE_WAIT_SECONDS = METRICS.histogram(
+    "lane_wait_seconds",
+    "Tiempo que espera una sub-tarea en su carril hasta tener un worker, en segundos",
+    ("lane",),
+)
+register_traffic_metrics(METRICS)
+
 
 # Lógica de procesamiento (worker)
 
-def process_task(payload: Dict[str, Any]) -> Dict[str, Any]:
+IMAGE_FIELDS = ("screenshot", "thumbnails")
+PERFORMANCE_FIELDS = ("performance",)
+ALL_FIELDS = IMAGE_FIELDS + PERFORMANCE_FIELDS
+
+
+def requested_fields(payload: Dict[str, Any]) -> Tuple[str, ...]:
+    """
+    Campos pedidos en el payload ("fields"); sin "fields", todos.
+    Lanza ValueError si hay alguno desconocido.
+    """
+    fields = payload.get("fields")
+    if fields is None:
+        return ALL_FIELDS
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    unknown = [f for f in fields if f not in ALL_FIELDS]
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(map(str, unknown))}")
+    return tuple(f for f in ALL_FIELDS if f in fields)
+
+
+def init_worker(config: ThumbnailConfig = DEFAULT_THUMBNAIL_CONFIG) -> None:
+    """
+    Initializer de cada proceso del pool: carga la fuente, arma la
+    plantilla del screenshot y hace un render completo descartable para
+    que los plugins de encoding (PNG/JPEG/WEBP) ya estén importados.
+    """
+    warm_up()
+    render_images("about:blank", config)
+
+
+def render_images(
+    url: str,
+    config: ThumbnailConfig = DEFAULT_THUMBNAIL_CONFIG,
+    fields: Tuple[str, ...] = IMAGE_FIELDS,
+) -> Dict[str, Any]:
+    """
+    Sub-tarea CPU-bound: corre en un proceso del pool.
+    Genera el screenshot dummy (PNG) y sus thumbnails en bytes;
+    el protocolo decide cómo viajan. Solo se codifica lo que está en
+    'fields' (los thumbnails se reducen igual desde la imagen en memoria,
+    sin pasar por el PNG del screenshot).
+    Los tiempos de cada etapa vuelven en "timings" para que el proceso
+    principal los registre en sus métricas (ver _record_timings).
+    """
+    timings: Dict[str, float] = {}
+
+    start = time.perf_counter()
+    screenshot_img = generate_dummy_screenshot(url)
+    timings["generate_dummy_screenshot"] = time.perf_counter() - start
+
+    result: Dict[str, Any] = {}
+    if "screenshot" in fields:
+        start = time.perf_counter()
+        result["screenshot"] = image_to_bytes(
+            screenshot_img,
+            compress_level=config.png_compress_level,
+            optimize=config.png_optimize,
+        )
+        timings["encode_screenshot"] = time.perf_counter() - start
+
+    if "thumbnails" in fields:
+        start = time.perf_counter()
+        result["thumbnails"], result["thumbnails_info"] = create_thumbnails_with_timings(
+            screenshot_img, config
+        )
+        timings["create_thumbnails"] = time.perf_counter() - start
+
+    result["timings"] = timings
+    return result
+
+
+def _record_timings(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Saca los tiempos que mandó un worker y los registra por etapa.
+    """
+    for stage, seconds in result.pop("timings", {}).items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    return result
+
+
+def measure_performance(url: str) -> Dict[str, Any]:
+    """
+    Sub-tarea I/O-bound: corre en el pool de hilos, así un proceso
+    no queda bloqueado esperando la descarga.
+    """
+    with STAGE_SECONDS.time(stage="analyze_performance"):
+        return {"performance": analyze_performance(url)}
+
+
+async def measure_performance_async(url: str, deadline: float | None = None) -> Dict[str, Any]:
+    """
+    Igual que measure_performance, con el analizador aiohttp
+    (sesión compartida + sub-recursos + waterfall). Si se vence el
+    deadline se corta el análisis en curso.
+    """
+    timeout = None
+    if deadline is not None:
+        timeout = deadline - time.time()
+        if timeout <= 0:
+            raise TimeoutError("Deadline vencido antes de empezar")
+    with STAGE_SECONDS.time(stage="analyze_performance"):
+        try:
+            return {"performance": await asyncio.wait_for(PERF_ANALYZER.analyze(url), timeout)}
+        except asyncio.TimeoutError:
+            raise TimeoutError("Deadline vencido durante el análisis de performance") from None
+
+
+def run_before_deadline(deadline: float | None, func: Any, *args: Any) -> Any:
+    """
+    Corre func(*args) salvo que el deadline (time.time()) haya pasado
+    mientras la sub-tarea esperaba en la cola del pool: en ese caso se
+    descarta sin hacer el trabajo y el worker queda libre para otra.
+    """
+    if deadline is not None and time.time() >= deadline:
+        raise TimeoutError("Deadline vencido antes de empezar")
+    return func(*args)
+
+
+def submit_images(
+    url: str,
+    lane: str = DEFAULT_LANE,
+    deadline: float | None = None,
+    fields: Tuple[str, ...] = IMAGE_FIELDS,
+) -> Future:
+    args = (deadline, render_images, url, THUMBNAIL_CONFIG, fields)
+    if PROCESS_LANES is not None:
+        return PROCESS_LANES.submit(lane, run_before_deadline, *args)
+    return PROCESS_POOL.submit(run_before_deadline, *args)
+
+
+def submit_performance(url: str, deadline: float | None = None) -> Future:
+    if PERF_ANALYZER is not None and PERF_LOOP is not None:
+        return PERF_LOOP.submit(measure_performance_async(url, deadline))
+    return IO_POOL.submit(run_before_deadline, deadline, measure_performance, url)
+
+
+# Despacho de mensajes (común a ambos engines)
+
+def _track(pool: str, future: Future) -> Future:
     """
-    Función que corre en un proceso del pool.
-    Recibe un dict con al menos 'url' y devuelve
-    los datos de procesamiento.
+    Cuenta la sub-tarea como pendiente en su pool hasta que termine.
     """
+    POOL_PENDING.inc(pool=pool)
+    future.add_done_callback(lambda _: POOL_PENDING.dec(pool=pool))
+    return future
+
+
+def _resolved(result: Dict[str, Any]) -> Future:
+    future: Future = Future()
+    future.set_result(result)
+    return future
+
+
+def submit_payload(payload: Any) -> Future:
+    """
+    Decide cómo atender un mensaje y devuelve un Future con la respuesta:
+      - comandos de control ({"command": ...}) se responden en el acto
+      - los campos vigentes en cache se devuelven sin usar ningún pool
+      - lo que falta se reparte en sub-tareas que corren en paralelo:
+        imágenes en el pool de procesos, performance en el analizador
+        asíncrono (o en el pool de hilos con --perf-analyzer sync)
+
+    Si el pedido trae 'deadline_ms' (milisegundos que le quedan al
+    Servidor A para responder; relativo, así no depende de que los
+    relojes de las dos máquinas coincidan) las sub-tareas que no llegan
+    a empezar antes de ese momento se descartan. Cancelar el Future
+    devuelto cancela las sub-tareas que todavía no empezaron.
+
+    'priority' ("interactive", el default, o "batch") elige el carril en
+    el que la sub-tarea de imágenes espera un worker (ver LaneScheduler);
+    con el carril lleno el pedido se rechaza con "overloaded": True.
+
+    Con 'fields' (ej. ["performance"]) solo se calculan y se devuelven
+    esos campos; sin él, todos.
+    """
+    if not isinstance(payload, dict):
+        return _resolved({"status": "error", "error": "Payload inválido"})
+
+    command = payload.get("command")
+    if command == "cache_stats":
+        stats = RESULT_CACHE.get_stats() if RESULT_CACHE is not None else None
+        return _resolved({"status": "success", "cache": stats})
+    if command == "ping":
+        return _resolved({"status": "success", "pong": True})
+    if command == "stats":
+        if payload.get("format") == "prometheus":
+            return _resolved({"status": "success", "text": METRICS.render()})
+        lanes = PROCESS_LANES.snapshot() if PROCESS_LANES is not None else None
+        return _resolved({"status": "success", "metrics": METRICS.snapshot(), "lanes": lanes})
+    if command is not None:
+        return _resolved({"status": "error", "error": f"Comando desconocido: {command}"})
+
     url = payload.get("url")
     if not url:
-        return {
-            "status": "error",
-            "error": "Falta campo 'url' en el payload",
-        }
+        return _resolved({"status": "error", "error": "Falta campo 'url' en el payload"})
+
+    lane = payload.get("priority", DEFAULT_LANE)
+    if lane not in LANES:
+        return _resolved({"status": "error", "error": f"Prioridad desconocida: {lane!r}"})
+    try:
+        fields = requested_fields(payload)
+    except ValueError as e:
+        return _resolved({"status": "error", "error": str(e)})
+
+    deadline = None
+    if payload.get("deadline_ms") is not None:
+        deadline = time.time() + payload["deadline_ms"] / 1000
+        if payload["deadline_ms"] <= 0:
+            REQUESTS_TOTAL.inc(outcome="expired")
+            return _resolved(_expired("Deadline vencido al recibir el pedido"))
+
+    cached: Dict[str, Any] = {}
+    if RESULT_CACHE is not None:
+        cached = RESULT_CACHE.get_fields(url, fields)
+
+    jobs: Dict[str, Future] = {}
+    missing = [field for field in fields if field not in cached]
+    image_fields = tuple(field for field in IMAGE_FIELDS if field in missing)
+    if image_fields:
+        try:
+            jobs["images"] = _track("process", submit_images(url, lane, deadline, image_fields))
+        except LaneFullError as e:
+            REQUESTS_TOTAL.inc(outcome="rejected")
+            return _resolved({"status": "error", "error": str(e), "overloaded": True})
+    if any(field in missing for field in PERFORMANCE_FIELDS):
+        jobs["performance"] = _track("performance", submit_performance(url, deadline))
 
-    # Screenshot dummy
-    screenshot_img = generate_dummy_screenshot(url)
-    screenshot_b64 = image_to_base64(screenshot_img)
+    if not jobs:
+        REQUESTS_TOTAL.inc(outcome="cached")
+        result = {"status": "success", **cached, "cached": True}
+        return _resolved(result)
 
-    # Thumbnails
-    thumbnails_b64 = create_thumbnails(screenshot_img)
+    return _merge_jobs(url, cached, jobs)
 
-    # Análisis de rendimiento
-    performance_info = analyze_performance(url)
 
-    return {
-        "status": "success",
-        "screenshot": screenshot_b64,
-        "performance": performance_info,
-        "thumbnails": thumbnails_b64,
-    }
+def _merge_jobs(url: str, cached: Dict[str, Any], jobs: Dict[str, Future]) -> Future:
+    """
+    Devuelve un Future que se completa cuando terminan todas las sub-tareas,
+    con sus resultados combinados con lo que vino del cache.
+    Cada pool queda ocupado solo el tiempo de su propia sub-tarea.
+
+    on_done corre en el hilo que recolecta los resultados de cada pool:
+    solo arma la respuesta; guardar en el cache (estimar tamaños y tal vez
+    escribir a disco) queda para CACHE_WRITER.
+    """
+    merged: Future = Future()
+    remaining = [len(jobs)]
+    lock = threading.Lock()
+    started = time.perf_counter()
+    IN_FLIGHT.inc()
+
+    def on_done(_: Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] > 0:
+                return
+
+        IN_FLIGHT.dec()
+        REQUEST_SECONDS.observe(time.perf_counter() - started)
+
+        if merged.cancelled():
+            REQUESTS_TOTAL.inc(outcome="cancelled")
+            return
+
+        fresh: Dict[str, Any] = {}
+        for job in jobs.values():
+            try:
+                fresh.update(_record_timings(job.result()))
+            except TimeoutError as e:
+                REQUESTS_TOTAL.inc(outcome="expired")
+                _settle(merged, _expired(str(e)))
+                return
+            except (Exception, CancelledError) as e:
+                REQUESTS_TOTAL.inc(outcome="error")
+                _settle(merged, {"status": "error", "error": str(e) or type(e).__name__})
+                return
+
+        REQUESTS_TOTAL.inc(outcome="computed")
+        _settle(merged, {"status": "success", **cached, **fresh})
+
+        if RESULT_CACHE is not None:
+            _cache_put(url, {"status": "success", **fresh})
+
+    def on_cancel(_: Future) -> None:
+        # Nadie espera la respuesta: liberar los pools de lo que no empezó
+        if merged.cancelled():
+            for job in jobs.values():
+                job.cancel()
+
+    for job in jobs.values():
+        job.add_done_callback(on_done)
+    merged.add_done_callback(on_cancel)
+    return merged
+
+
+def _cache_put(url: str, result: Dict[str, Any]) -> None:
+    if CACHE_WRITER is None:
+        RESULT_CACHE.put(url, result)
+        return
+    try:
+        CACHE_WRITER.submit(RESULT_CACHE.put, url, result)
+    except RuntimeError:
+        # Apagando: el resultado simplemente no se cachea
+        pass
+
+
+def _settle(future: Future, result: Dict[str, Any]) -> None:
+    try:
+        future.set_result(result)
+    except InvalidStateError:
+        # Se canceló mientras terminaban las sub-tareas
+        pass
+
+
+def _expired(error: str) -> Dict[str, Any]:
+    return {"status": "error", "error": error, "expired": True}
+
+
+def _shutdown_pools() -> None:
+    if PERF_LOOP is not None:
+        if PERF_ANALYZER is not None:
+            try:
+                PERF_LOOP.submit(PERF_ANALYZER.close()).result(timeout=5)
+            except Exception:
+                pass
+        PERF_LOOP.stop()
+    IO_POOL.shutdown(wait=True)
+    PROCESS_POOL.shutdown(wait=True)
+    PROCESS_LANES.close()
+    CACHE_WRITER.shutdown(wait=True)
 
 
 # Servidor TCP con socketserver
 class ProcessingTCPHandler(socketserver.BaseRequestHandler):
     """
-    Handler que:
-      - recibe un mensaje (protocolo común)
-      - ejecuta process_task en el pool de procesos
-      - devuelve la respuesta con el mismo protocolo
+    Handler de una conexión persistente:
+      - recibe mensajes (protocolo común) mientras el cliente no cierre
+      - despacha cada pedido con submit_payload (cache + sub-tareas)
+      - devuelve cada respuesta con el mismo protocolo y su 'request_id'
+
+    Varias peticiones pueden estar en vuelo sobre el mismo socket: las
+    respuestas se envían a medida que terminan (no necesariamente en orden)
+    desde un hilo escritor dedicado.
+
+    La conexión arranca en protocolo v1; si el cliente manda un hello se
+    pasa a la versión negociada. Con {"command": "cancel", "target": id}
+    el cliente avisa que ya no espera la respuesta del pedido 'id' (no se
+    responde); si la conexión se cierra se cancela todo lo que quedó en vuelo.
     """
 
     def handle(self) -> None:
@@ -64,31 +477,246 @@ class ProcessingTCPHandler(socketserver.BaseRequestHandler):
         if PROCESS_POOL is None:
             return
 
+        outbox: "queue.Queue[Tuple[Dict[str, Any], Tuple[int, str]] | None]" = queue.Queue()
+        writer = threading.Thread(target=self._writer_loop, args=(outbox,), daemon=True)
+        writer.start()
+
+        wire = DEFAULT_WIRE
+        pending: set[Future] = set()
+        by_id: Dict[Any, Future] = {}
         try:
-            # 1) Recibir payload desde el Servidor A
-            payload = recv_message_sync(self.request)
+            while True:
+                # 1) Recibir payload desde el Servidor A
+                try:
+                    payload = recv_message_sync(self.request, wire[0])
+                except MessageTooLargeError as e:
+                    # Avisar antes de cortar: el resto del mensaje no se lee
+                    outbox.put(({"status": "error", "error": str(e)}, wire))
+                    break
+                except (ConnectionError, OSError):
+                    # El cliente cerró la conexión
+                    break
+                except Exception as e:
+                    outbox.put(({"status": "error", "error": str(e)}, wire))
+                    break
+
+                if _is_hello(payload):
+                    # La respuesta al hello siempre viaja en v1
+                    reply, version, codec = negotiate_version(payload)
+                    outbox.put((reply, DEFAULT_WIRE))
+                    wire = (version, codec)
+                    continue
+
+                if _is_cancel(payload):
+                    future = by_id.get(payload.get("target"))
+                    if future is not None:
+                        future.cancel()
+                    continue
+
+                request_id = payload.get("request_id") if isinstance(payload, dict) else None
+
+                # 2) Cache o pool de procesos; la respuesta sale al terminar
+                try:
+                    future = submit_payload(payload)
+                except Exception as e:
+                    error = {"status": "error", "error": str(e)}
+                    outbox.put((_with_request_id(error, request_id), wire))
+                    continue
+
+                pending.add(future)
+                if request_id is not None:
+                    by_id[request_id] = future
+                    future.add_done_callback(lambda _, rid=request_id: by_id.pop(rid, None))
+                future.add_done_callback(
+                    functools.partial(_enqueue_result, outbox, request_id, wire)
+                )
+                pending = {f for f in pending if not f.done()}
+        finally:
+            # 3) Nadie va a leer lo que quedó en vuelo: cancelar lo que no
+            #    empezó y esperar el resto antes de cerrar el socket
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            outbox.put(None)
+            writer.join()
+
+    def _writer_loop(self, outbox: "queue.Queue[Tuple[Dict[str, Any], Tuple[int, str]] | None]") -> None:
+        while True:
+            item = outbox.get()
+            if item is None:
+                return
+            message, (version, codec) = item
+            try:
+                send_message_sync(self.request, message, version, codec)
+            except OSError:
+                # Si falla el envío, no hay mucho más que hacer con esta conexión
+                pass
+
+
+def _is_hello(payload: Any) -> bool:
+    return isinstance(payload, dict) and payload.get("command") == "hello"
+
+
+def _is_cancel(payload: Any) -> bool:
+    return isinstance(payload, dict) and payload.get("command") == "cancel"
+
+
+def _with_request_id(obj: Dict[str, Any], request_id: Any) -> Dict[str, Any]:
+    if request_id is not None:
+        obj["request_id"] = request_id
+    return obj
 
-            # 2) Enviar al pool de procesos
-            future = PROCESS_POOL.submit(process_task, payload)
-            result = future.result()
 
-            # 3) Devolver respuesta
-            send_message_sync(self.request, result)
+def _enqueue_result(
+    outbox: "queue.Queue[Tuple[Dict[str, Any], Tuple[int, str]] | None]",
+    request_id: Any,
+    wire: Tuple[int, str],
+    future: Future,
+) -> None:
+    if future.cancelled():
+        # El cliente canceló el pedido: no espera respuesta
+        return
+    try:
+        result = future.result()
+    except Exception as e:
+        result = {"status": "error", "error": str(e)}
+    outbox.put((_with_request_id(result, request_id), wire))
+
+
+class ThreadedTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+# Servidor TCP con asyncio (--engine asyncio)
+
+def _submit_off_loop(loop: asyncio.AbstractEventLoop, payload: Any) -> Future:
+    """
+    submit_payload desde el pool de hilos por defecto del loop: con el
+    cache en disco la consulta lee archivos y no debe frenar el event
+    loop. Devuelve en el acto un Future que sigue al real, así el pedido
+    se puede cancelar aunque todavía no se haya despachado.
+    """
+    outer: Future = Future()
 
+    def forward(inner: Future) -> None:
+        if inner.cancelled():
+            outer.cancel()
+        elif inner.exception() is not None:
+            _settle(outer, {"status": "error", "error": str(inner.exception())})
+        else:
+            _settle(outer, inner.result())
+
+    def submit() -> None:
+        try:
+            inner = submit_payload(payload)
         except Exception as e:
-            # Enviar mensaje de error usando el mismo protocolo
+            inner = _resolved({"status": "error", "error": str(e)})
+        outer.add_done_callback(lambda _: inner.cancel() if outer.cancelled() else None)
+        inner.add_done_callback(forward)
+
+    loop.run_in_executor(None, submit)
+    return outer
+
+
+async def handle_connection_async(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    """
+    Atiende una conexión sin hilos propios: el event loop lee los mensajes
+    y cada uno se despacha con submit_payload (cache o pool de procesos)
+    sin bloquear el loop; con el cache en disco el despacho corre en un
+    hilo (ver _submit_off_loop). Se pueden enviar
+    varios requests seguidos (pipelining) sin esperar las respuestas;
+    cada respuesta sale con su 'request_id' apenas termina. Los pedidos
+    se cancelan igual que en ProcessingTCPHandler.
+    """
+    loop = asyncio.get_running_loop()
+    write_lock = asyncio.Lock()
+    tasks: set[asyncio.Task] = set()
+    by_id: Dict[Any, Future] = {}
+    wire = DEFAULT_WIRE
+
+    async def reply(message: Dict[str, Any], wire: Tuple[int, str]) -> None:
+        async with write_lock:
             try:
-                error_obj = {
-                    "status": "error",
-                    "error": str(e),
-                }
-                send_message_sync(self.request, error_obj)
-            except Exception:
-                # Si falla incluso el envío de error, no hay mucho más que hacer
+                await send_message_async(writer, message, *wire)
+            except (ConnectionError, OSError):
                 pass
 
-class ThreadedTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
-    allow_reuse_address = True
+    async def run_task(future: Future, request_id: Any, wire: Tuple[int, str]) -> None:
+        try:
+            result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # El cliente canceló el pedido: no espera respuesta
+            return
+        except Exception as e:
+            result = {"status": "error", "error": str(e)}
+        finally:
+            by_id.pop(request_id, None)
+        await reply(_with_request_id(result, request_id), wire)
+
+    try:
+        while True:
+            try:
+                payload = await recv_message_async(reader, wire[0])
+            except MessageTooLargeError as e:
+                # Avisar antes de cortar: el resto del mensaje no se lee
+                await reply({"status": "error", "error": str(e)}, wire)
+                break
+            except (asyncio.IncompleteReadError, ConnectionError, OSError):
+                # El cliente cerró la conexión
+                break
+            except Exception as e:
+                await reply({"status": "error", "error": str(e)}, wire)
+                break
+
+            if _is_hello(payload):
+                # La respuesta al hello siempre viaja en v1
+                hello_reply, version, codec = negotiate_version(payload)
+                await reply(hello_reply, DEFAULT_WIRE)
+                wire = (version, codec)
+                continue
+
+            if _is_cancel(payload):
+                future = by_id.get(payload.get("target"))
+                if future is not None:
+                    future.cancel()
+                continue
+
+            request_id = payload.get("request_id") if isinstance(payload, dict) else None
+            if RESULT_CACHE is not None and RESULT_CACHE.has_disk:
+                future = _submit_off_loop(loop, payload)
+            else:
+                try:
+                    future = submit_payload(payload)
+                except Exception as e:
+                    future = _resolved({"status": "error", "error": str(e)})
+            if request_id is not None:
+                by_id[request_id] = future
+            task = asyncio.create_task(run_task(future, request_id, wire))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        # Nadie va a leer lo que quedó en vuelo: cancelar lo que no empezó
+        # y terminar el resto antes de cerrar el socket
+        for future in list(by_id.values()):
+            future.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+async def serve_asyncio(host: str, port: int) -> None:
+    server = await asyncio.start_server(
+        handle_connection_async, host, port, reuse_address=True,
+    )
+    async with server:
+        await server.serve_forever()
 
 
 # CLI y main
@@ -114,14 +742,199 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Número de procesos en el pool (default: CPU count)",
     )
+    parser.add_argument(
+        "--io-workers",
+        type=int,
+        default=32,
+        help="Hilos para el análisis de performance síncrono (default: 32)",
+    )
+    parser.add_argument(
+        "--perf-analyzer",
+        choices=("async", "sync"),
+        default="async",
+        help="Analizador de performance: aiohttp con sub-recursos y waterfall "
+             "(async) o una única request con requests (sync) (default: async)",
+    )
+    parser.add_argument(
+        "--perf-limit-per-host",
+        type=int,
+        default=6,
+        help="Conexiones simultáneas por host al bajar sub-recursos (default: 6)",
+    )
+    parser.add_argument(
+        "--perf-max-resources",
+        type=int,
+        default=50,
+        help="Máximo de sub-recursos a descargar por página (0 = solo el HTML) "
+             "(default: 50)",
+    )
+    parser.add_argument(
+        "--thumb-sizes",
+        type=parse_sizes,
+        default=DEFAULT_THUMBNAIL_CONFIG.sizes,
+        help="Tamaños de thumbnails, ej: 400x300,200x150 (default: 400x300,200x150)",
+    )
+    parser.add_argument(
+        "--thumb-format",
+        type=str.upper,
+        choices=THUMBNAIL_FORMATS,
+        default=DEFAULT_THUMBNAIL_CONFIG.format,
+        help="Formato de los thumbnails: png, jpeg o webp (default: png)",
+    )
+    parser.add_argument(
+        "--thumb-quality",
+        type=int,
+        default=DEFAULT_THUMBNAIL_CONFIG.quality,
+        help="Calidad JPEG/WEBP de los thumbnails, 1-100 (default: 80)",
+    )
+    parser.add_argument(
+        "--png-compress-level",
+        type=int,
+        choices=range(0, 10),
+        default=DEFAULT_THUMBNAIL_CONFIG.png_compress_level,
+        metavar="0-9",
+        help="Nivel zlib de los PNG (screenshot y thumbnails): menos = más "
+             "rápido y más grande (default: 6)",
+    )
+    parser.add_argument(
+        "--png-optimize",
+        action="store_true",
+        help="Pasada extra de optimización PNG (más CPU, archivos algo más chicos)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("threading", "asyncio"),
+        default="threading",
+        help="Front end TCP: un hilo por conexión (threading) "
+             "o un único event loop (asyncio) (default: threading)",
+    )
+    parser.add_argument(
+        "--lane-weights",
+        type=parse_lane_values,
+        default=dict(DEFAULT_LANE_WEIGHTS),
+        help="Peso de cada carril de prioridad en el reparto del pool de procesos "
+             f"(default: {','.join(f'{k}={v}' for k, v in DEFAULT_LANE_WEIGHTS.items())})",
+    )
+    parser.add_argument(
+        "--lane-depth",
+        type=parse_lane_values,
+        default=dict(DEFAULT_LANE_DEPTHS),
+        help="Máximo de sub-tareas en cola por carril; con la cola llena el pedido "
+             "se rechaza (0 = sin límite, default: "
+             f"{','.join(f'{k}={v}' for k, v in DEFAULT_LANE_DEPTHS.items())})",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=64,
+        help="Tamaño máximo del cache de resultados en memoria, en MB "
+             "(0 = sin cache) (default: 64)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directorio para el nivel de cache en disco (opcional)",
+    )
+    parser.add_argument(
+        "--ttl-screenshot",
+        type=float,
+        default=DEFAULT_TTLS["screenshot"],
+        help="TTL en segundos del screenshot cacheado",
+    )
+    parser.add_argument(
+        "--ttl-thumbnails",
+        type=float,
+        default=DEFAULT_TTLS["thumbnails"],
+        help="TTL en segundos de los thumbnails cacheados",
+    )
+    parser.add_argument(
+        "--ttl-performance",
+        type=float,
+        default=DEFAULT_TTLS["performance"],
+        help="TTL en segundos de las métricas de performance cacheadas",
+    )
+    parser.add_argument(
+        "--max-message-mb",
+        type=float,
+        default=64,
+        help="Tamaño máximo de un mensaje entre servidores, en MB (default: 64)",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
-    global PROCESS_POOL
+    global PROCESS_POOL, PROCESS_LANES, IO_POOL, PERF_LOOP, PERF_ANALYZER, RESULT_CACHE, CACHE_WRITER
+    global THUMBNAIL_CONFIG
     args = parse_args()
 
-    PROCESS_POOL = ProcessPoolExecutor(max_workers=args.processes)
+    THUMBNAIL_CONFIG = ThumbnailConfig(
+        sizes=args.thumb_sizes,
+        format=args.thumb_format,
+        quality=args.thumb_quality,
+        png_compress_level=args.png_compress_level,
+        png_optimize=args.png_optimize,
+    )
+
+    set_max_message_size(int(args.max_message_mb * 1024 * 1024))
+
+    PROCESS_POOL = ProcessPoolExecutor(
+        max_workers=args.processes,
+        initializer=init_worker,
+        initargs=(THUMBNAIL_CONFIG,),
+    )
+    processes = args.processes or os.cpu_count() or 1
+    PROCESS_LANES = LaneScheduler(
+        PROCESS_POOL,
+        slots=processes,
+        weights=args.lane_weights,
+        max_depths=args.lane_depth,
+        on_wait=lambda lane, seconds: LANE_WAIT_SECONDS.observe(seconds, lane=lane),
+    )
+    IO_POOL = ThreadPoolExecutor(max_workers=args.io_workers)
+    CACHE_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-writer")
+
+    for lane in LANES:
+        LANE_DEPTH.set_function(lambda lane=lane: PROCESS_LANES.depth(lane), lane=lane)
+    POOL_QUEUE_DEPTH.set_function(
+        lambda: sum(PROCESS_LANES.depth(lane) for lane in LANES),
+        pool="process",
+    )
+    if args.perf_analyzer == "sync":
+        POOL_QUEUE_DEPTH.set_function(
+            lambda: max(0, POOL_PENDING.get(pool="performance") - args.io_workers),
+            pool="performance",
+        )
+
+    if args.perf_analyzer == "async":
+        PERF_LOOP = LoopThread(name="performance-loop")
+        PERF_LOOP.start()
+        PERF_ANALYZER = AsyncPerformanceAnalyzer(
+            limit_per_host=args.perf_limit_per_host,
+            max_resources=args.perf_max_resources,
+            fetch_subresources=args.perf_max_resources > 0,
+        )
+
+    if args.cache_max_mb > 0:
+        RESULT_CACHE = ResultCache(
+            max_bytes=int(args.cache_max_mb * 1024 * 1024),
+            disk_dir=args.cache_dir,
+            ttls={
+                "screenshot": args.ttl_screenshot,
+                "thumbnails": args.ttl_thumbnails,
+                "performance": args.ttl_performance,
+            },
+        )
+
+    if args.engine == "asyncio":
+        print(f"[Servidor B] Escuchando en {args.ip}:{args.port} (asyncio) "
+              f"con pool de procesos (max_workers={args.processes})")
+        try:
+            asyncio.run(serve_asyncio(args.ip, args.port))
+        except KeyboardInterrupt:
+            print("\n[Servidor B] Apagando...")
+        finally:
+            _shutdown_pools()
+        return
 
     # Elegir IPv4 o IPv6 según la IP
     server_cls = ThreadedTCPServer
@@ -138,7 +951,7 @@ def main() -> None:
         except KeyboardInterrupt:
             print("\n[Servidor B] Apagando...")
         finally:
-            PROCESS_POOL.shutdown(wait=True)
+            _shutdown_pools()
 
 
 if __name__ == "__main__":
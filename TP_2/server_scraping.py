@@ -3,64 +3,322 @@ import argparse
 import asyncio
 import datetime as dt
 import json
+import math
+import os
+import signal
 import struct
-from typing import Any, Dict, Optional
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
 
 from aiohttp import web, ClientSession
 
-from scraper.async_http import fetch_html
-from scraper.html_parser import extract_scraping_data
-from common.protocol import send_message_async, recv_message_async
+from scraper.admission import AdmissionController, AdmissionRejected, RateLimiter
+from scraper.async_http import create_http_session, fetch_html, fetch_and_extract_stream
+from scraper.html_parser import get_extractor
+from scraper.page_cache import DEFAULT_PAGE_TTL, PageCache
+from scraper.scheduler import host_key
+from scraper.supervisor import Supervisor, bind_socket, reuse_port_supported
+from common.balancer import STRATEGIES, ProcessingBalancer, parse_backends
+from common.loop_monitor import LoopLagMonitor
+from common.metrics import MetricsRegistry
+from common.protocol import register_traffic_metrics, set_max_message_size
+from common.serialization import available_codecs, bytes_to_base64
+from common.singleflight import SingleFlight
+from common.urls import normalize_url
+
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonlines", "application/ndjson")
+
+# Campos que se pueden pedir con fields=; los del Servidor B van dentro
+# de processing_data
+PROCESSING_FIELDS = ("screenshot", "thumbnails", "performance")
+RESPONSE_FIELDS = ("scraping_data",) + PROCESSING_FIELDS
+
+
+def parse_fields(value: Any) -> Tuple[str, ...]:
+    """
+    Campos pedidos con fields= ("scraping_data,performance" o una lista
+    JSON). Sin valor se piden todos. Lanza ValueError si hay alguno
+    desconocido o si no queda ninguno.
+    """
+    if value is None or value == "":
+        return RESPONSE_FIELDS
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list):
+        raise ValueError("'fields' debe ser una lista o un string separado por comas")
+    names = [str(name).strip() for name in value if str(name).strip()]
+    unknown = [name for name in names if name not in RESPONSE_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Campos desconocidos: {', '.join(unknown)} "
+            f"(disponibles: {', '.join(RESPONSE_FIELDS)})"
+        )
+    if not names:
+        raise ValueError("'fields' no puede estar vacío")
+    return tuple(field for field in RESPONSE_FIELDS if field in names)
+
+
+def _select_fields(processing_data: Any, fields: Sequence[str]) -> Any:
+    """
+    Deja en la respuesta del Servidor B solo los artefactos pedidos (un
+    Servidor B viejo ignora "fields" y devuelve todo).
+    """
+    if not isinstance(processing_data, dict):
+        return processing_data
+    dropped = {field for field in PROCESSING_FIELDS if field not in fields}
+    if "thumbnails" in dropped:
+        dropped.add("thumbnails_info")
+    return {k: v for k, v in processing_data.items() if k not in dropped}
 
 
 # Comunicación con Servidor B
 
 async def call_processing_server(
     url: str,
-    processing_host: str,
-    processing_port: int,
+    pool: ProcessingBalancer,
+    key: Optional[str] = None,
+    deadline: Optional[float] = None,
+    priority: str = "interactive",
+    fields: Optional[Sequence[str]] = None,
 ) -> Dict[str, Any]:
     """
-    Se conecta al Servidor B via TCP (socket) usando el protocolo común:
-      - 4 bytes de longitud + JSON serializado.
+    Envía la URL a algún Servidor B (ver ProcessingBalancer) usando su pool
+    de conexiones persistentes. El protocolo común viaja con un
+    'request_id' para poder multiplexar varias peticiones por socket.
+    'key' (la URL normalizada) se usa con el balanceo por hash.
+    Con 'deadline' (hora del event loop) el pedido lleva 'deadline_ms',
+    lo que le queda de tiempo, y el Servidor B descarta el trabajo que
+    no llegue a empezar antes. 'priority' ("interactive" o "batch") elige
+    el carril del pool de procesos del Servidor B. Con 'fields' el
+    Servidor B calcula solo esos artefactos (sin él, todos).
     """
-    reader, writer = await asyncio.open_connection(
-        processing_host, processing_port
-    )
+    payload: Dict[str, Any] = {"url": url, "priority": priority}
+    if fields is not None:
+        payload["fields"] = list(fields)
+    if deadline is not None:
+        remaining = deadline - asyncio.get_running_loop().time()
+        payload["deadline_ms"] = max(0, int(remaining * 1000))
+    return await pool.request(payload, key=key)
+
+# Scraping
+
+async def scrape_page(app: web.Application, url: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Descarga y parsea la página (con límite de workers, tope por host y
+    cola acotada, ver AdmissionController). Devuelve (scraping_data, info de la respuesta HTTP).
+    Si la página está en el cache (--page-cache-mb) se revalida con un GET
+    condicional y, ante un 304, se reusa la extracción anterior.
+    """
+    session: ClientSession = app["http_session"]
+    admission: AdmissionController = app["admission"]
+    stages = app["stage_seconds"]
+    cache: Optional[PageCache] = app["page_cache"]
+
+    entry = cache.lookup(url) if cache is not None else None
+    headers = PageCache.conditional_headers(entry) if entry is not None else None
+
+    queued_at = time.perf_counter()
+    async with admission.slot(host_key(url)):
+        stages.observe(time.perf_counter() - queued_at, stage="admission_wait")
+        if app["streaming_parse"]:
+            with stages.time(stage="fetch_and_extract_stream"):
+                scraping_data, resp_info = await fetch_and_extract_stream(
+                    url,
+                    session=session,
+                    max_body_bytes=app["max_body_bytes"],
+                    headers=headers,
+                )
+        else:
+            with stages.time(stage="fetch_html"):
+                html, resp_info = await fetch_html(url, session=session, headers=headers)
+            not_modified = entry is not None and resp_info["status"] == 304
+            if not not_modified:
+                with stages.time(stage="extract_scraping_data"):
+                    scraping_data = await parse_html(app, html)
+
+    if cache is None:
+        return scraping_data, resp_info
+    if entry is not None and resp_info["status"] == 304:
+        return entry["scraping_data"], cache.revalidated(url, entry, resp_info)
+    cache.store(url, scraping_data, resp_info, had_entry=entry is not None)
+    return scraping_data, resp_info
+
+
+async def parse_html(app: web.Application, html: str) -> Dict[str, Any]:
+    """
+    Parsea el HTML sin bloquear el event loop: los documentos grandes se
+    mandan al pool de parseo (--parse-workers); los chicos se parsean
+    inline porque el costo de enviarlos al pool supera al del parseo.
+    """
+    extractor = app["extractor"]
+    executor: Optional[Executor] = app["parse_executor"]
+    if executor is None or len(html) < app["parse_inline_threshold"]:
+        return extractor(html)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, extractor, html)
 
+
+# Pipeline completo para una URL
+
+async def scrape_url(
+    app: web.Application,
+    url: str,
+    priority: str = "interactive",
+    fields: Sequence[str] = RESPONSE_FIELDS,
+) -> Tuple[int, Dict[str, Any]]:
+    """
+    Ejecuta el pipeline para una URL con el tiempo máximo de
+    --request-timeout: si se vence se cancela todo lo que quedó en curso
+    (cola, descarga, pedido al Servidor B) y se responde 504.
+    Devuelve (código HTTP, JSON consolidado).
+    """
+    timeout: Optional[float] = app["request_timeout"]
+    if timeout is None:
+        return await run_pipeline(app, url, priority=priority, fields=fields)
+
+    deadline = asyncio.get_running_loop().time() + timeout
     try:
-        payload = {"url": url}
-        # Enviar mensaje usando protocolo común
-        await send_message_async(writer, payload)
+        return await asyncio.wait_for(run_pipeline(app, url, deadline, priority, fields), timeout)
+    except asyncio.TimeoutError:
+        return 504, {
+            "url": url,
+            "status": "error",
+            "error": f"Se superó el tiempo máximo del request ({timeout:g}s)",
+        }
 
-        # Recibir respuesta
-        resp_obj = await recv_message_async(reader)
-        return resp_obj
-    finally:
-        writer.close()
-        await writer.wait_closed()
 
-# Handler HTTP
+async def run_pipeline(
+    app: web.Application,
+    url: str,
+    deadline: Optional[float] = None,
+    priority: str = "interactive",
+    fields: Sequence[str] = RESPONSE_FIELDS,
+) -> Tuple[int, Dict[str, Any]]:
+    """
+    Ejecuta el pipeline completo para una URL:
+      - scraping asíncrono
+      - procesamiento extra en el servidor B, en el carril 'priority'
+    Solo se hace lo necesario para los campos pedidos en 'fields': sin
+    scraping_data no se descarga la página, y sin screenshot, thumbnails
+    ni performance no se llama al Servidor B.
+    Devuelve (código HTTP, JSON consolidado).
+    """
+    try:
+        key = normalize_url(url)
+    except ValueError as e:
+        return 400, {"url": url, "status": "error", "error": f"URL inválida: {e}"}
+    want_scraping = "scraping_data" in fields
+    processing_fields = tuple(field for field in PROCESSING_FIELDS if field in fields)
+
+    #  Scraping asíncrono. Requests concurrentes por la misma URL
+    #  (normalizada) comparten una única descarga y un único parseo.
+    scrape_flights: SingleFlight = app["scrape_flights"]
+    scraping_data: Optional[Dict[str, Any]] = None
+    resp_info: Optional[Dict[str, Any]] = None
+
+    try:
+        if want_scraping:
+            scraping_data, resp_info = await scrape_flights.do(
+                key, lambda: scrape_page(app, url)
+            )
+    except AdmissionRejected as e:
+        return e.status, {
+            "url": url,
+            "status": "error",
+            "error": str(e),
+            "retry_after": e.retry_after,
+        }
+    except RuntimeError as e:
+        return 502, {
+            "url": url,
+            "status": "error",
+            "error": str(e),
+        }
+
+    #  Llamar al servidor de procesamiento
+    processing_data: Optional[Dict[str, Any]] = None
+    if processing_fields:
+        pool: ProcessingBalancer = app["processing_pool"]
+        processing_flights: SingleFlight = app["processing_flights"]
+        # Con todos los campos el payload no lleva "fields" (igual que antes)
+        requested = None if processing_fields == PROCESSING_FIELDS else processing_fields
+
+        # Cada prioridad (y cada selección de campos) tiene su propio
+        # single-flight: un /scrape no debe quedar esperando un pedido que
+        # va por el carril batch
+        flight_key = f"{priority}:{','.join(processing_fields)}:{key}"
+        led: List[bool] = []
+
+        async def call() -> Dict[str, Any]:
+            led.append(True)
+            return await call_processing_server(
+                url=url, pool=pool, key=key, deadline=deadline,
+                priority=priority, fields=requested,
+            )
+
+        try:
+            with app["stage_seconds"].time(stage="call_processing_server"):
+                processing_data = await processing_flights.do(flight_key, call)
+                # El pedido compartido viaja con el deadline de quien lo
+                # inició: si venció con el de otro request y a este todavía
+                # le queda tiempo, se vuelve a pedir
+                while (
+                    not led
+                    and isinstance(processing_data, dict)
+                    and processing_data.get("expired")
+                    and (deadline is None or asyncio.get_running_loop().time() < deadline)
+                ):
+                    processing_data = await processing_flights.do(flight_key, call)
+        except Exception:
+            # Si falla el servidor B, respondemos igual con lo que tenemos
+            processing_data = None
+
+        # Con protocolo v2 las imágenes llegan como bytes crudos; hacia el
+        # cliente HTTP se siguen mandando en base64 dentro del JSON
+        processing_data = bytes_to_base64(_select_fields(processing_data, processing_fields))
+
+    #  Armar respuesta final (solo con los campos pedidos)
+    now_utc = dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+    result: Dict[str, Any] = {"url": url, "timestamp": now_utc}
+    if want_scraping:
+        result["scraping_data"] = scraping_data
+    if processing_fields:
+        result["processing_data"] = processing_data
+    result["status"] = "success"
+    if want_scraping:
+        result["extra_info"] = {"http_response": resp_info}
+    return 200, result
+
+
+# Handlers HTTP
 
 async def handle_scrape(request: web.Request) -> web.Response:
     """
     Handler principal:
-      - recibe la URL
+      - recibe la URL (y opcionalmente fields=, los campos a devolver)
       - hace scraping asíncrono
       - pide procesamiento extra al servidor B
       - devuelve JSON consolidado
     """
     app = request.app
 
-    #  Obtener URL desde query o JSON
+    #  Obtener URL y campos desde query o JSON
     url: Optional[str] = request.rel_url.query.get("url")
+    fields_value: Any = request.rel_url.query.get("fields")
 
-    if not url and request.method in ("POST", "PUT"):
+    if (not url or fields_value is None) and request.method in ("POST", "PUT"):
         try:
             data = await request.json()
-            url = data.get("url")
         except json.JSONDecodeError:
-            url = None
+            data = None
+        if isinstance(data, dict):
+            url = url or data.get("url")
+            if fields_value is None:
+                fields_value = data.get("fields")
 
     if not url:
         return web.json_response(
@@ -71,60 +329,299 @@ async def handle_scrape(request: web.Request) -> web.Response:
             status=400,
         )
 
-    #  Scraping asíncrono (con límite de workers usando un semáforo)
-    session: ClientSession = app["http_session"]
-    semaphore: asyncio.Semaphore = app["semaphore"]
-
     try:
-        async with semaphore:
-            html, resp_info = await fetch_html(url, session=session)
-            scraping_data = extract_scraping_data(html)
-    except RuntimeError as e:
-        return web.json_response(
-            {
+        fields = parse_fields(fields_value)
+    except ValueError as e:
+        return web.json_response({"url": url, "status": "error", "error": str(e)}, status=400)
+
+    limiter: Optional[RateLimiter] = app["rate_limiter"]
+    if limiter is not None:
+        try:
+            limiter.check(client_id(request))
+        except AdmissionRejected as e:
+            app["requests_total"].inc(endpoint="/scrape", status=e.status)
+            return rejection_response(e.status, {
+                "url": url,
                 "status": "error",
                 "error": str(e),
-            },
-            status=502,
-        )
+                "retry_after": e.retry_after,
+            })
 
-    #  Llamar al servidor de procesamiento
-    processing_host: str = app["processing_host"]
-    processing_port: int = app["processing_port"]
+    app["in_flight"].inc(endpoint="/scrape")
+    try:
+        with app["request_seconds"].time(endpoint="/scrape"):
+            status, result = await scrape_url(app, url, fields=fields)
+    finally:
+        app["in_flight"].dec(endpoint="/scrape")
+    app["requests_total"].inc(endpoint="/scrape", status=status)
+    if "retry_after" in result:
+        return rejection_response(status, result)
+    return web.json_response(result, status=status)
+
+
+def client_id(request: web.Request) -> str:
+    """
+    Identidad del cliente para el rate limit: su IP.
+    """
+    return request.remote or "unknown"
+
+
+def rejection_response(status: int, result: Dict[str, Any]) -> web.Response:
+    """
+    Respuesta 429/503 con el header Retry-After (en segundos enteros).
+    """
+    retry_after = max(1, math.ceil(result["retry_after"]))
+    return web.json_response(
+        result,
+        status=status,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def _parse_batch_line(line: str) -> Optional[str]:
+    """
+    Una línea NDJSON puede ser un string JSON, un objeto {"url": ...}
+    o directamente la URL sin comillas. Líneas vacías se ignoran.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line[0] in "{\"":
+        item = json.loads(line)
+        if isinstance(item, dict):
+            item = item.get("url")
+        if not isinstance(item, str) or not item:
+            raise ValueError("Cada línea debe ser una URL o un objeto {'url': ...}")
+        return item
+    return line
+
+
+async def _iter_batch_urls(request: web.Request) -> AsyncIterator[Any]:
+    """
+    Genera las URLs del batch a medida que se leen del body:
+      - application/x-ndjson: una URL por línea (se lee en streaming)
+      - JSON: lista de URLs o {"urls": [...]}
+    Las líneas inválidas se devuelven como ValueError para reportarlas.
+    """
+    if request.content_type in NDJSON_CONTENT_TYPES:
+        try:
+            async for raw in request.content:
+                try:
+                    url = _parse_batch_line(raw.decode("utf-8"))
+                except (UnicodeDecodeError, ValueError) as e:
+                    yield ValueError(f"Línea inválida: {e}")
+                    continue
+                if url is not None:
+                    yield url
+        except ValueError as e:
+            # Línea más larga que el buffer de lectura: el resto del body
+            # no se puede seguir leyendo
+            yield ValueError(f"Línea inválida: {e}")
+        return
+
+    data = await request.json()
+    urls = data.get("urls") if isinstance(data, dict) else data
+    if not isinstance(urls, list):
+        raise ValueError("Se esperaba una lista de URLs o {'urls': [...]}")
+    for url in urls:
+        if isinstance(url, str) and url:
+            yield url
+        else:
+            yield ValueError(f"URL inválida: {url!r}")
+
+
+async def _scrape_batch_item(
+    app: web.Application,
+    url: str,
+    fields: Sequence[str] = RESPONSE_FIELDS,
+) -> Dict[str, Any]:
+    """
+    Resultado de una URL del batch. Nunca lanza (salvo cancelación): un
+    error inesperado se devuelve como una línea de error más, así no se
+    corta el stream ni se pierden los resultados de las demás URLs.
+    """
+    app["in_flight"].inc(endpoint="/scrape/batch")
+    try:
+        status, result = await scrape_url(app, url, priority="batch", fields=fields)
+    except Exception as e:
+        status, result = 500, {
+            "url": url,
+            "status": "error",
+            "error": str(e) or type(e).__name__,
+        }
+    finally:
+        app["in_flight"].dec(endpoint="/scrape/batch")
+    app["requests_total"].inc(endpoint="/scrape/batch", status=status)
+    result["http_status"] = status
+    return result
+
+
+async def handle_scrape_batch(request: web.Request) -> web.StreamResponse:
+    """
+    POST /scrape/batch
+    Recibe muchas URLs y responde en streaming una línea NDJSON por URL,
+    en orden de finalización. Solo se mantienen en vuelo unas pocas
+    URLs a la vez (múltiplo de --workers), así la memoria no crece con
+    el tamaño del batch. El control de admisión sigue limitando el scraping
+    y, si hay rate limit, el batch avanza al ritmo permitido al cliente en
+    lugar de recibir 429. En el Servidor B las URLs del batch van por el
+    carril de prioridad "batch", así no demoran a los /scrape interactivos.
+    ?fields= aplica a todas las URLs del batch.
+    """
+    app = request.app
+    try:
+        fields = parse_fields(request.rel_url.query.get("fields"))
+    except ValueError as e:
+        return web.json_response({"status": "error", "error": str(e)}, status=400)
+    window: int = app["batch_window"]
+    limiter: Optional[RateLimiter] = app["rate_limiter"]
+    client = client_id(request)
+
+    response: Optional[web.StreamResponse] = None
+    pending: Set["asyncio.Task[Dict[str, Any]]"] = set()
+
+    async def write_line(result: Dict[str, Any]) -> None:
+        line = json.dumps(result, ensure_ascii=False) + "\n"
+        await response.write(line.encode("utf-8"))
 
+    async def flush(tasks: Set["asyncio.Task[Dict[str, Any]]"]) -> None:
+        # _scrape_batch_item no lanza: cada tarea termina con su línea
+        for task in tasks:
+            await write_line(task.result())
+
+    items = _iter_batch_urls(request)
     try:
-        processing_data = await call_processing_server(
-            url=url,
-            processing_host=processing_host,
-            processing_port=processing_port,
+        # Un body JSON se valida entero antes de la primera URL: si es
+        # inválido todavía se puede responder 400. Desde acá los errores
+        # son por URL y viajan como líneas del stream.
+        try:
+            item: Any = await anext(items, None)
+        except (json.JSONDecodeError, ValueError) as e:
+            return web.json_response(
+                {"status": "error", "error": f"Body inválido: {e}"},
+                status=400,
+            )
+
+        response = web.StreamResponse(
+            status=200,
+            headers={"Content-Type": "application/x-ndjson"},
         )
-    except Exception:
-        # Si falla el servidor B, respondemos igual con lo que tenemos
-        processing_data = None
+        await response.prepare(request)
 
-    #  Armar respuesta final
-    now_utc = dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+        while item is not None:
+            if isinstance(item, Exception):
+                await write_line({"status": "error", "error": str(item), "http_status": 400})
+            else:
+                if limiter is not None:
+                    await limiter.wait(client)
+                pending.add(asyncio.create_task(_scrape_batch_item(app, item, fields)))
+                if len(pending) >= window:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    await flush(done)
+            item = await anext(items, None)
 
-    result: Dict[str, Any] = {
-        "url": url,
-        "timestamp": now_utc,
-        "scraping_data": scraping_data,
-        "processing_data": processing_data,
-        "status": "success",
-        "extra_info": {
-            "http_response": resp_info,
-        },
-    }
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            await flush(done)
+    finally:
+        # Si el cliente se desconecta, no seguir scrapeando para nadie
+        for task in pending:
+            task.cancel()
 
-    return web.json_response(result, status=200)
+    await response.write_eof()
+    return response
 
 
 # Creación de la app y CLI
 
+def _register_state_gauges(app: web.Application, metrics: MetricsRegistry) -> None:
+    """
+    Gauges que se leen del estado actual al exportar: cola de admisión,
+    pool de conexiones al Servidor B, single-flights, cache de páginas y
+    lag del event loop.
+    Los recursos creados en on_startup se buscan recién al exportar.
+    """
+    admission: AdmissionController = app["admission"]
+
+    admission_gauge = metrics.gauge(
+        "admission",
+        "Tareas de scraping activas y en cola",
+        ("state",),
+    )
+    admission_gauge.set_function(lambda: admission.active, state="active")
+    admission_gauge.set_function(lambda: admission.queued, state="queued")
+
+    pool_gauge = metrics.gauge(
+        "processing_pool",
+        "Conexiones abiertas al Servidor B y pedidos en vuelo sobre ellas",
+        ("state",),
+    )
+    pool_gauge.set_function(lambda: app["processing_pool"].size, state="connections")
+    pool_gauge.set_function(lambda: app["processing_pool"].in_flight, state="in_flight")
+
+    flights_gauge = metrics.gauge(
+        "singleflight_in_flight",
+        "Claves con trabajo en curso en cada single-flight",
+        ("kind",),
+    )
+    flights_gauge.set_function(lambda: app["scrape_flights"].in_flight, kind="scrape")
+    flights_gauge.set_function(lambda: app["processing_flights"].in_flight, kind="processing")
+
+    cache: Optional[PageCache] = app["page_cache"]
+    if cache is not None:
+        cache_counter = metrics.counter(
+            "page_cache_total",
+            "Páginas del cache según resultado de la revalidación",
+            ("result",),
+        )
+        for result in ("revalidated", "changed", "stored", "uncacheable"):
+            cache_counter.set_function(lambda result=result: cache.stats[result], result=result)
+
+    lag_gauge = metrics.gauge(
+        "event_loop_lag_ms",
+        "Lag del event loop en milisegundos",
+        ("stat",),
+    )
+    for stat in ("last", "avg", "max"):
+        lag_gauge.set_function(
+            lambda stat=stat: app["loop_monitor"].snapshot()[f"{stat}_ms"],
+            stat=stat,
+        )
+
+
 def create_app(
     workers: int,
     processing_host: str,
     processing_port: int,
+    processing_pool_size: int = 4,
+    processing_codecs: Optional[List[str]] = None,
+    parse_workers: int = 0,
+    parse_executor: str = "process",
+    parse_inline_threshold: int = 64 * 1024,
+    parser_backend: str = "bs4",
+    streaming_parse: bool = False,
+    max_body_bytes: Optional[int] = None,
+    max_queue: Optional[int] = 100,
+    queue_timeout: Optional[float] = None,
+    retry_after: float = 1.0,
+    rate_limit: float = 0,
+    rate_burst: float = 10,
+    processing_backends: Optional[List[Tuple[str, int]]] = None,
+    balance_strategy: str = "least-outstanding",
+    probe_interval: float = 5.0,
+    max_failures: int = 3,
+    per_host: int = 0,
+    http_limit: int = 100,
+    dns_ttl: int = 300,
+    keepalive: float = 30,
+    page_cache_bytes: int = 32 * 1024 * 1024,
+    page_cache_dir: Optional[str] = None,
+    page_cache_ttl: float = DEFAULT_PAGE_TTL,
+    request_timeout: Optional[float] = 60,
 ) -> web.Application:
     """
     Crea la aplicación aiohttp, registra rutas y maneja recursos compartidos.
@@ -135,14 +632,114 @@ def create_app(
     app["workers"] = workers
     app["processing_host"] = processing_host
     app["processing_port"] = processing_port
-    app["semaphore"] = asyncio.Semaphore(workers)
+    # Lista de Servidores B; sin lista, el único es processing_host:port
+    app["processing_backends"] = processing_backends or [(processing_host, processing_port)]
+    app["balance_strategy"] = balance_strategy
+    app["probe_interval"] = probe_interval
+    app["max_failures"] = max_failures
+    app["processing_pool_size"] = processing_pool_size
+    app["processing_codecs"] = processing_codecs
+    app["parse_workers"] = parse_workers
+    app["parse_executor_kind"] = parse_executor
+    app["parse_inline_threshold"] = parse_inline_threshold
+    app["parser_backend"] = parser_backend
+    app["extractor"] = get_extractor(parser_backend)
+    app["streaming_parse"] = streaming_parse
+    app["max_body_bytes"] = max_body_bytes
+    # Tiempo máximo de punta a punta de cada URL (None = sin límite)
+    app["request_timeout"] = request_timeout
+    # Connector de aiohttp hacia los sitios scrapeados
+    app["http_limit"] = http_limit
+    app["per_host"] = per_host
+    app["dns_ttl"] = dns_ttl
+    app["keepalive"] = keepalive
+    # Cache de páginas para GET condicional (0 bytes = deshabilitado)
+    app["page_cache"] = (
+        PageCache(page_cache_bytes, disk_dir=page_cache_dir, ttl=page_cache_ttl)
+        if page_cache_bytes > 0 else None
+    )
+    app["admission"] = AdmissionController(
+        concurrency=workers,
+        max_queue=max_queue,
+        queue_timeout=queue_timeout,
+        retry_after=retry_after,
+        per_host=per_host or None,
+    )
+    # Token bucket por cliente (IP); 0 = sin rate limit
+    app["rate_limiter"] = RateLimiter(rate_limit, rate_burst) if rate_limit > 0 else None
+    # URLs de un batch en vuelo a la vez (el resto espera en el body)
+    app["batch_window"] = max(2 * workers, 1)
+    app["scrape_flights"] = SingleFlight()
+    app["processing_flights"] = SingleFlight()
+
+    # Métricas (GET /metrics)
+    metrics = MetricsRegistry(prefix="scraping_")
+    app["metrics"] = metrics
+    app["stage_seconds"] = metrics.histogram(
+        "stage_seconds",
+        "Duración de cada etapa del pipeline, en segundos",
+        ("stage",),
+    )
+    app["request_seconds"] = metrics.histogram(
+        "request_seconds",
+        "Tiempo total de cada request HTTP, en segundos",
+        ("endpoint",),
+    )
+    app["requests_total"] = metrics.counter(
+        "requests_total",
+        "Requests atendidos por endpoint y código HTTP",
+        ("endpoint", "status"),
+    )
+    app["in_flight"] = metrics.gauge(
+        "in_flight",
+        "URLs en proceso por endpoint",
+        ("endpoint",),
+    )
+    _register_state_gauges(app, metrics)
+    register_traffic_metrics(metrics)
 
     async def on_startup(app: web.Application) -> None:
-        app["http_session"] = ClientSession()
+        app["http_session"] = create_http_session(
+            limit=app["http_limit"],
+            limit_per_host=app["per_host"],
+            ttl_dns_cache=app["dns_ttl"] or None,
+            keepalive_timeout=app["keepalive"],
+        )
+        balancer = ProcessingBalancer(
+            app["processing_backends"],
+            strategy=app["balance_strategy"],
+            pool_size=app["processing_pool_size"],
+            codecs=app["processing_codecs"],
+            probe_interval=app["probe_interval"],
+            max_failures=app["max_failures"],
+            metrics=app["metrics"],
+        )
+        balancer.start()
+        app["processing_pool"] = balancer
+
+        # Pool para parsear HTML fuera del event loop (0 workers = inline)
+        executor: Optional[Executor] = None
+        if app["parse_workers"] > 0:
+            if app["parse_executor_kind"] == "thread":
+                executor = ThreadPoolExecutor(max_workers=app["parse_workers"])
+            else:
+                executor = ProcessPoolExecutor(max_workers=app["parse_workers"])
+        app["parse_executor"] = executor
+
+        monitor = LoopLagMonitor()
+        monitor.start()
+        app["loop_monitor"] = monitor
 
     async def on_cleanup(app: web.Application) -> None:
         session: ClientSession = app["http_session"]
         await session.close()
+        pool: ProcessingBalancer = app["processing_pool"]
+        await pool.close()
+        monitor: LoopLagMonitor = app["loop_monitor"]
+        await monitor.stop()
+        executor: Optional[Executor] = app["parse_executor"]
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
 
     app.on_startup.append(on_startup)
     app.on_cleanup.append(on_cleanup)
@@ -150,12 +747,39 @@ def create_app(
     # Rutas
     app.router.add_get("/scrape", handle_scrape)
     app.router.add_post("/scrape", handle_scrape)
+    app.router.add_post("/scrape/batch", handle_scrape_batch)
 
     async def health(request: web.Request) -> web.Response:
-        return web.json_response({"status": "ok", "service": "server_scraping"})
+        monitor: LoopLagMonitor = request.app["loop_monitor"]
+        admission: AdmissionController = request.app["admission"]
+        limiter: Optional[RateLimiter] = request.app["rate_limiter"]
+        cache: Optional[PageCache] = request.app["page_cache"]
+        return web.json_response({
+            "status": "ok",
+            "service": "server_scraping",
+            "pid": os.getpid(),
+            "event_loop_lag": monitor.snapshot(),
+            "parse_workers": request.app["parse_workers"],
+            "queue_depth": admission.queued,
+            "admission": admission.snapshot(),
+            "rate_limit": limiter.snapshot() if limiter is not None else None,
+            "processing": request.app["processing_pool"].snapshot(),
+            "page_cache": cache.get_stats() if cache is not None else None,
+        })
 
     app.router.add_get("/health", health)
 
+    async def metrics_handler(request: web.Request) -> web.Response:
+        registry: MetricsRegistry = request.app["metrics"]
+        if request.rel_url.query.get("format") == "json":
+            return web.json_response(registry.snapshot())
+        return web.Response(
+            body=registry.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    app.router.add_get("/metrics", metrics_handler)
+
     return app
 
 
@@ -191,20 +815,312 @@ def parse_args() -> argparse.Namespace:
         default=9000,
         help="Puerto del servidor de procesamiento (Servidor B)",
     )
+    parser.add_argument(
+        "--processing-pool-size",
+        type=int,
+        default=4,
+        help="Máximo de conexiones persistentes a cada Servidor B (default: 4)",
+    )
+    parser.add_argument(
+        "--processing-backends",
+        type=parse_backends,
+        default=None,
+        help="Lista de Servidores B host:puerto separados por coma "
+             "(ej: 10.0.0.1:9000,10.0.0.2:9000,[::1]:9001); reemplaza a "
+             "--processing-ip/--processing-port",
+    )
+    parser.add_argument(
+        "--balance",
+        choices=STRATEGIES,
+        default="least-outstanding",
+        help="Cómo repartir entre Servidores B: el de menos pedidos en vuelo o "
+             "hash consistente por URL, que mantiene caliente el cache de "
+             "cada nodo (default: least-outstanding)",
+    )
+    parser.add_argument(
+        "--probe-interval",
+        type=float,
+        default=5.0,
+        help="Segundos entre health checks (ping) a cada Servidor B; 0 = sin "
+             "health checks (default: 5)",
+    )
+    parser.add_argument(
+        "--max-failures",
+        type=int,
+        default=3,
+        help="Fallas seguidas para sacar a un Servidor B de rotación (default: 3)",
+    )
+    parser.add_argument(
+        "--processing-codecs",
+        type=lambda value: [c.strip() for c in value.split(",") if c.strip()],
+        default=None,
+        help="Codecs a ofrecer al Servidor B, en orden de preferencia "
+             f"(ej: orjson,msgpack,json; default: {','.join(available_codecs())})",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        help="Workers para parsear HTML fuera del event loop (0 = inline, default: 0)",
+    )
+    parser.add_argument(
+        "--parse-executor",
+        choices=("process", "thread"),
+        default="process",
+        help="Tipo de pool de parseo (default: process)",
+    )
+    parser.add_argument(
+        "--parse-inline-threshold",
+        type=int,
+        default=64 * 1024,
+        help="Documentos con menos caracteres que esto se parsean inline "
+             "(default: 65536)",
+    )
+    parser.add_argument(
+        "--parser-backend",
+        choices=("bs4", "stream"),
+        default="bs4",
+        help="Extractor de HTML: árbol BeautifulSoup (bs4) o una sola pasada "
+             "por eventos sin árbol (stream) (default: bs4)",
+    )
+    parser.add_argument(
+        "--streaming-parse",
+        action="store_true",
+        help="Parsear el HTML mientras se descarga (usa el extractor stream)",
+    )
+    parser.add_argument(
+        "--max-body-bytes",
+        type=int,
+        default=None,
+        help="Con --streaming-parse, dejar de descargar al llegar a estos bytes "
+             "(una vez leído el <head>; default: sin tope)",
+    )
+    parser.add_argument(
+        "--max-message-mb",
+        type=float,
+        default=64,
+        help="Tamaño máximo de un mensaje entre servidores, en MB (default: 64)",
+    )
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        default=60,
+        help="Segundos máximos para resolver una URL de punta a punta "
+             "(cola, descarga y Servidor B); al vencerse se responde 504 y "
+             "se cancela el trabajo pendiente, también en el Servidor B "
+             "(0 = sin límite, default: 60)",
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=100,
+        help="Máximo de requests esperando un worker; con la cola llena se "
+             "responde 503 + Retry-After (-1 = sin límite, default: 100)",
+    )
+    parser.add_argument(
+        "--queue-timeout",
+        type=float,
+        default=0,
+        help="Segundos máximos de espera en cola antes de responder 503 "
+             "(0 = sin límite, default: 0)",
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=float,
+        default=1.0,
+        help="Segundos sugeridos en Retry-After cuando la cola rechaza (default: 1)",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=0,
+        help="Requests por segundo permitidos por cliente (IP); se responde "
+             "429 al superarlo (0 = sin límite, default: 0)",
+    )
+    parser.add_argument(
+        "--rate-burst",
+        type=float,
+        default=10,
+        help="Ráfaga máxima del rate limit por cliente (default: 10)",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=0,
+        help="Máximo de descargas simultáneas a un mismo host; los workers "
+             "libres se reparten en round-robin entre hosts igual (0 = sin "
+             "tope, default: 0)",
+    )
+    parser.add_argument(
+        "--http-limit",
+        type=int,
+        default=100,
+        help="Máximo de conexiones HTTP abiertas hacia los sitios (default: 100)",
+    )
+    parser.add_argument(
+        "--dns-ttl",
+        type=int,
+        default=300,
+        help="Segundos que se cachean las resoluciones DNS (0 = sin "
+             "vencimiento, default: 300)",
+    )
+    parser.add_argument(
+        "--keepalive",
+        type=float,
+        default=30,
+        help="Segundos que se mantiene abierta una conexión HTTP ociosa "
+             "para reusarla (default: 30)",
+    )
+    parser.add_argument(
+        "--page-cache-mb",
+        type=float,
+        default=32,
+        help="Tamaño máximo en memoria del cache de páginas, en MB; las "
+             "páginas con ETag o Last-Modified se revalidan con un GET "
+             "condicional y un 304 reusa la extracción (0 = sin cache, default: 32)",
+    )
+    parser.add_argument(
+        "--page-cache-dir",
+        default=None,
+        help="Directorio para el nivel en disco del cache de páginas (opcional)",
+    )
+    parser.add_argument(
+        "--page-cache-ttl",
+        type=float,
+        default=DEFAULT_PAGE_TTL,
+        help="Segundos que se conserva una página cacheada sin pedidos "
+             f"(default: {DEFAULT_PAGE_TTL})",
+    )
+    parser.add_argument(
+        "--procs",
+        type=int,
+        default=1,
+        help="Procesos worker, cada uno con su event loop, su ClientSession y "
+             "su pool hacia el Servidor B (default: 1)",
+    )
+    parser.add_argument(
+        "--listen",
+        choices=("reuseport", "shared"),
+        default="reuseport" if reuse_port_supported() else "shared",
+        help="Con --procs > 1: cada worker abre su socket con SO_REUSEPORT "
+             "(el kernel reparte las conexiones) o todos comparten un socket "
+             "creado por el padre (default: reuseport si el SO lo soporta)",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=30,
+        help="Segundos que un worker espera a los requests en curso al "
+             "apagarse o en un reload (default: 30)",
+    )
 
-    return parser.parse_args()
-
+    args = parser.parse_args()
+    if args.max_body_bytes is not None:
+        if not args.streaming_parse:
+            parser.error("--max-body-bytes requiere --streaming-parse")
+        if args.max_body_bytes <= 0:
+            parser.error("--max-body-bytes debe ser mayor que 0")
+    return args
 
-def main() -> None:
-    args = parse_args()
 
-    app = create_app(
+def app_from_args(args: argparse.Namespace) -> web.Application:
+    return create_app(
         workers=args.workers,
         processing_host=args.processing_ip,
         processing_port=args.processing_port,
+        processing_pool_size=args.processing_pool_size,
+        processing_codecs=args.processing_codecs,
+        parse_workers=args.parse_workers,
+        parse_executor=args.parse_executor,
+        parse_inline_threshold=args.parse_inline_threshold,
+        parser_backend=args.parser_backend,
+        streaming_parse=args.streaming_parse,
+        max_body_bytes=args.max_body_bytes,
+        max_queue=args.max_queue if args.max_queue >= 0 else None,
+        queue_timeout=args.queue_timeout or None,
+        retry_after=args.retry_after,
+        rate_limit=args.rate_limit,
+        rate_burst=args.rate_burst,
+        processing_backends=args.processing_backends,
+        balance_strategy=args.balance,
+        probe_interval=args.probe_interval,
+        max_failures=args.max_failures,
+        per_host=args.per_host,
+        http_limit=args.http_limit,
+        dns_ttl=args.dns_ttl,
+        keepalive=args.keepalive,
+        page_cache_bytes=int(args.page_cache_mb * 1024 * 1024),
+        page_cache_dir=args.page_cache_dir,
+        page_cache_ttl=args.page_cache_ttl,
+        request_timeout=args.request_timeout or None,
     )
 
-    web.run_app(app, host=args.ip, port=args.port)
+
+async def _serve_worker(
+    app: web.Application,
+    args: argparse.Namespace,
+    sock: Optional[Any],
+    ready: Any,
+) -> None:
+    runner = web.AppRunner(
+        app,
+        shutdown_timeout=args.graceful_timeout,
+        handler_cancellation=True,
+    )
+    await runner.setup()
+    if sock is not None:
+        site = web.SockSite(runner, sock)
+    else:
+        site = web.TCPSite(runner, args.ip, args.port, reuse_port=True)
+    await site.start()
+    ready.set()
+    print(f"[Servidor A] Worker {os.getpid()} escuchando en {args.ip}:{args.port}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        # Deja de aceptar conexiones y espera a los requests en curso
+        await runner.cleanup()
+
+
+def run_worker(args: argparse.Namespace, sock: Optional[Any], ready: Any) -> None:
+    """
+    Proceso worker de --procs N (lo lanza el Supervisor). Crea su propia
+    app, y con ella su ClientSession y su pool de conexiones al Servidor B.
+    """
+    if hasattr(signal, "SIGHUP"):
+        # El reload lo maneja el padre
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    set_max_message_size(int(args.max_message_mb * 1024 * 1024))
+    asyncio.run(_serve_worker(app_from_args(args), args, sock, ready))
+
+
+def main() -> None:
+    args = parse_args()
+
+    if args.procs > 1:
+        sock = None
+        if args.listen == "shared":
+            sock = bind_socket(args.ip, args.port)
+        print(f"[Servidor A] {args.procs} workers en {args.ip}:{args.port} "
+              f"({args.listen}); SIGHUP = reload, SIGTERM = apagar")
+        Supervisor(
+            run_worker,
+            (args,),
+            procs=args.procs,
+            sock=sock,
+            stop_timeout=args.graceful_timeout + 5,
+        ).run()
+        return
+
+    set_max_message_size(int(args.max_message_mb * 1024 * 1024))
+    # handler_cancellation: si el cliente corta la conexión se cancela su
+    # handler, y con él la cola, la descarga y el pedido al Servidor B
+    web.run_app(app_from_args(args), host=args.ip, port=args.port, handler_cancellation=True)
 
 
 if __name__ == "__main__":
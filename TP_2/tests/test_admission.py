@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from scraper.admission import (
+    AdmissionController,
+    QueueFullError,
+    QueueTimeoutError,
+    RateLimitedError,
+    RateLimiter,
+)
+
+
+def test_queue_full_is_rejected():
+    async def run():
+        admission = AdmissionController(concurrency=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with admission.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert admission.active == 1
+        assert admission.queued == 1
+
+        with pytest.raises(QueueFullError) as excinfo:
+            async with admission.slot():
+                pass
+        assert excinfo.value.status == 503
+
+        release.set()
+        await asyncio.gather(holder, waiter)
+        assert admission.snapshot()["admitted"] == 2
+        assert admission.queued == 0
+
+    asyncio.run(run())
+
+
+def test_queue_wait_timeout():
+    async def run():
+        admission = AdmissionController(concurrency=1, queue_timeout=0.05)
+        async with admission.slot():
+            with pytest.raises(QueueTimeoutError):
+                async with admission.slot():
+                    pass
+        assert admission.stats["timed_out"] == 1
+        # El lugar se liberó: se puede volver a entrar
+        async with admission.slot():
+            pass
+
+    asyncio.run(run())
+
+
+def test_rate_limiter_is_per_client():
+    limiter = RateLimiter(rate=1, burst=2)
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(RateLimitedError) as excinfo:
+        limiter.check("a")
+    assert excinfo.value.status == 429
+    assert 0 < excinfo.value.retry_after <= 1
+    # Otro cliente tiene su propio bucket
+    limiter.check("b")
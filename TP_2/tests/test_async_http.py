@@ -0,0 +1,87 @@
+import asyncio
+
+from aiohttp import ClientSession, web
+
+from scraper.async_http import fetch_and_extract_stream
+from scraper.html_parser import extract_scraping_data
+from scraper.stream_parser import ScrapingDataParser
+
+
+HEAD = (
+    "<html><head><title>Título ñandú</title>"
+    "<meta name='description' content='desc'></head><body>"
+)
+PAGE = HEAD + "<h1>x</h1>" + "<a href='/l'>l</a><img src='i.png'>" * 200 + "</body></html>"
+
+
+async def start_origin():
+    async def page(request):
+        # El body sale en pedazos chicos, con caracteres multibyte partidos
+        body = PAGE.encode("utf-8")
+        resp = web.StreamResponse(headers={"Content-Type": "text/html; charset=utf-8"})
+        await resp.prepare(request)
+        for start in range(0, len(body), 7):
+            await resp.write(body[start:start + 7])
+        await resp.write_eof()
+        return resp
+
+    app = web.Application()
+    app.router.add_get("/page", page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}/page"
+
+
+def test_parser_accepts_chunks():
+    parser = ScrapingDataParser()
+    for start in range(0, len(PAGE), 5):
+        parser.feed(PAGE[start:start + 5])
+    parser.close()
+    assert parser.result() == extract_scraping_data(PAGE)
+
+
+def test_streaming_fetch_matches_full_parse():
+    async def run():
+        runner, url = await start_origin()
+        try:
+            async with ClientSession() as session:
+                data, info = await fetch_and_extract_stream(url, session, chunk_size=16)
+        finally:
+            await runner.cleanup()
+
+        assert data == extract_scraping_data(PAGE)
+        assert data["title"] == "Título ñandú"
+        assert info["truncated"] is False
+        assert info["bytes_read"] == len(PAGE.encode("utf-8"))
+
+    asyncio.run(run())
+
+
+def test_max_body_bytes_truncates_after_the_head():
+    async def run():
+        runner, url = await start_origin()
+        try:
+            async with ClientSession() as session:
+                data, info = await fetch_and_extract_stream(
+                    url, session, chunk_size=64, max_body_bytes=500
+                )
+                # Un tope más chico que el <head> no pierde el título ni los meta
+                small, small_info = await fetch_and_extract_stream(
+                    url, session, chunk_size=64, max_body_bytes=10
+                )
+        finally:
+            await runner.cleanup()
+
+        assert info["truncated"] is True
+        assert info["bytes_read"] == 500
+        assert data["title"] == "Título ñandú"
+        assert 0 < len(data["links"]) < 200
+
+        assert small_info["truncated"] is True
+        assert len(HEAD.encode("utf-8")) <= small_info["bytes_read"] < 500
+        assert small["title"] == "Título ñandú"
+        assert small["meta_tags"] == {"description": "desc"}
+
+    asyncio.run(run())
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from common.balancer import ProcessingBalancer, parse_backends
+
+
+class FakePool:
+    def __init__(self, name):
+        self.name = name
+        self.up = True
+        # Responde pings pero falla los pedidos reales
+        self.only_pings = False
+        # Respuesta fija al ping (None = la normal)
+        self.ping_reply = None
+        self.size = 0
+
+    async def request(self, payload):
+        if not self.up or (self.only_pings and payload.get("command") != "ping"):
+            raise ConnectionError(f"{self.name} caído")
+        if payload.get("command") == "ping" and self.ping_reply is not None:
+            return self.ping_reply
+        return {"status": "success", "backend": self.name}
+
+    async def close(self):
+        pass
+
+
+def make_balancer(strategy, n=3, max_failures=2):
+    balancer = ProcessingBalancer(
+        [("127.0.0.1", 9000 + i) for i in range(n)],
+        strategy=strategy,
+        probe_interval=0,
+        max_failures=max_failures,
+    )
+    for backend in balancer.backends:
+        backend.pool = FakePool(backend.name)
+    return balancer
+
+
+def test_parse_backends():
+    assert parse_backends("10.0.0.1:9000, [::1]:9001") == [("10.0.0.1", 9000), ("::1", 9001)]
+    with pytest.raises(ValueError):
+        parse_backends("sin-puerto")
+
+
+def test_consistent_hash_is_stable_and_fails_over():
+    async def run():
+        balancer = make_balancer("consistent-hash")
+        keys = [f"https://example.com/{i}" for i in range(30)]
+        first = [(await balancer.request({}, key=k))["backend"] for k in keys]
+        again = [(await balancer.request({}, key=k))["backend"] for k in keys]
+        assert first == again
+        assert len(set(first)) > 1
+
+        # Si cae un nodo, solo se mueven sus claves
+        down = balancer.backends[0]
+        down.pool.up = False
+        moved = [(await balancer.request({}, key=k))["backend"] for k in keys]
+        for before, after in zip(first, moved):
+            assert after != down.name
+            if before != down.name:
+                assert after == before
+
+    asyncio.run(run())
+
+
+def test_ejection_and_readmission():
+    async def run():
+        balancer = make_balancer("least-outstanding", n=2, max_failures=2)
+        bad = balancer.backends[0]
+        bad.pool.up = False
+
+        for _ in range(6):
+            reply = await balancer.request({"url": "x"})
+            assert reply["backend"] != bad.name
+        assert not bad.healthy
+        assert bad.ejections == 1
+
+        bad.pool.up = True
+        assert await balancer.probe(bad)
+        assert bad.healthy
+        assert balancer.snapshot()["backends"][0]["healthy"] is True
+
+    asyncio.run(run())
+
+
+def test_probes_do_not_hide_failing_requests():
+    async def run():
+        balancer = make_balancer("least-outstanding", n=2, max_failures=2)
+        bad = balancer.backends[0]
+        bad.pool.only_pings = True
+
+        # Un ping que responde entre pedido y pedido no borra las fallas
+        for _ in range(4):
+            reply = await balancer.request({"url": "x"})
+            assert reply["backend"] != bad.name
+            await balancer.probe(bad)
+        assert bad.ejections == 1
+        assert bad.consecutive_failures == 2
+
+        # El ping lo readmite, pero sale de nuevo en la primera falla
+        assert bad.healthy
+        for _ in range(2):
+            reply = await balancer.request({"url": "x"})
+            assert reply["backend"] != bad.name
+        assert not bad.healthy
+        assert bad.ejections == 2
+
+        # Un pedido exitoso sí reinicia el contador
+        bad.pool.only_pings = False
+        assert await balancer.probe(bad)
+        # A igual carga se rota: en dos pedidos uno va al backend
+        served = [(await balancer.request({"url": "x"}))["backend"] for _ in range(2)]
+        assert bad.name in served
+        assert bad.consecutive_failures == 0
+
+    asyncio.run(run())
+
+
+def test_probe_reply_that_is_not_an_object_counts_as_failure():
+    async def run():
+        balancer = make_balancer("least-outstanding", n=2, max_failures=2)
+        backend = balancer.backends[0]
+
+        # Un Servidor B viejo sin "ping" responde un error: está vivo
+        backend.pool.ping_reply = {"status": "error", "error": "Comando desconocido: ping"}
+        assert await balancer.probe(backend)
+
+        backend.pool.ping_reply = ["basura"]
+        assert not await balancer.probe(backend)
+        assert backend.healthy and backend.probe_failures == 1
+        assert not await balancer.probe(backend)
+        assert not backend.healthy and backend.ejections == 1
+
+        # Vuelve a responder bien: se readmite
+        backend.pool.ping_reply = None
+        assert await balancer.probe(backend)
+        assert backend.healthy and backend.probe_failures == 0
+
+    asyncio.run(run())
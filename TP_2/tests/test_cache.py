@@ -0,0 +1,99 @@
+import time
+
+from common.cache import ByteLRUCache, DiskCache, TieredCache
+from processor.cache import ResultCache
+
+
+def test_lru_is_bounded_by_bytes():
+    cache = ByteLRUCache(max_bytes=10)
+    assert cache.set("a", b"1234", ttl=60)
+    assert cache.set("b", b"1234", ttl=60)
+    assert cache.get("a") == b"1234"  # "a" pasa a ser el más reciente
+
+    assert cache.set("c", b"1234", ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.current_bytes == 8
+    assert cache.stats["evictions"] == 1
+
+    # Lo que no entra en todo el cache no se guarda ni desaloja a nadie
+    assert not cache.set("big", b"x" * 11, ttl=60)
+    assert len(cache) == 2
+
+    # Reemplazar una clave no duplica sus bytes
+    cache.set("a", b"12", ttl=60)
+    assert cache.current_bytes == 6
+
+
+def test_lru_entries_expire():
+    cache = ByteLRUCache(max_bytes=100)
+    assert not cache.set("zero", b"x", ttl=0)
+    cache.set("short", b"x", ttl=0.05)
+    cache.set("long", b"y", ttl=60)
+    time.sleep(0.1)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == b"y"
+    assert cache.stats["expirations"] == 1
+    assert cache.current_bytes == 1
+
+
+def test_disk_cache_roundtrip_and_expiry(tmp_path):
+    disk = DiskCache(str(tmp_path))
+    value = {"screenshot": b"\x89PNG", "thumbnails": [b"a", b"b"], "n": 1}
+    disk.set("k", value, ttl=60)
+
+    found, remaining = disk.get("k")
+    assert found == value
+    assert 0 < remaining <= 60
+
+    disk.set("old", b"x", ttl=0.05)
+    time.sleep(0.1)
+    assert disk.get("old") is None
+    assert len(list(tmp_path.iterdir())) == 1  # el vencido se borra
+
+    # Un archivo corrupto cuenta como miss
+    next(tmp_path.iterdir()).write_text("{no es json")
+    assert disk.get("k") is None
+    assert disk.stats == {"hits": 1, "misses": 2, "writes": 2}
+
+
+def test_tiered_cache_promotes_from_disk(tmp_path):
+    TieredCache(1024, str(tmp_path)).set("k", b"valor", ttl=60)
+
+    # Otro proceso (cache nuevo, memoria vacía) lo encuentra en disco
+    cache = TieredCache(1024, str(tmp_path))
+    assert cache.get("k") == b"valor"
+    assert cache.get("k") == b"valor"
+    stats = cache.get_stats()
+    assert stats["disk"]["hits"] == 1
+    assert stats["memory"]["hits"] == 1
+    assert stats["memory_entries"] == 1
+
+
+def test_result_cache_keeps_response_shape():
+    cache = ResultCache(max_bytes=1024 * 1024, ttls={"performance": 0.05})
+    info = [{"size": [400, 300], "format": "png", "bytes": 1}]
+    cache.put("https://Example.com/", {
+        "status": "success",
+        "screenshot": b"png",
+        "thumbnails": [b"t"],
+        "thumbnails_info": info,
+        "performance": {"load_time_ms": 10},
+    })
+
+    # Clave por URL normalizada; thumbnails vuelve con su thumbnails_info
+    found = cache.get_fields("https://example.com", ["screenshot", "thumbnails"])
+    assert found == {"screenshot": b"png", "thumbnails": [b"t"], "thumbnails_info": info}
+
+    time.sleep(0.1)
+    found = cache.get_fields("https://example.com", ["thumbnails", "performance"])
+    assert set(found) == {"thumbnails", "thumbnails_info"}
+    assert cache.get("https://example.com") is None
+
+    # Los errores no se cachean
+    cache.put("https://otra.com", {"status": "success", "performance": {"error": "timeout"}})
+    assert cache.get_fields("https://otra.com", ["performance"]) == {}
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["partial_hits"] == 2
+    assert cache.get_stats()["misses"] == 1
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+import server_processing
+from common.connection_pool import ProcessingConnection
+from common.protocol import recv_message_async
+from common.singleflight import SingleFlight
+
+
+def test_singleflight_cancels_work_when_nobody_waits():
+    async def run():
+        flights = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        first = asyncio.create_task(flights.do("k", work))
+        second = asyncio.create_task(flights.do("k", work))
+        await started.wait()
+
+        # Se va uno: el trabajo sigue para el otro
+        first.cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled.is_set()
+        assert flights.in_flight == 1
+
+        # Se van todos: se cancela el trabajo y se libera la clave
+        second.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert flights.in_flight == 0
+        assert flights.stats["cancelled"] == 1
+
+    asyncio.run(run())
+
+
+def test_cancelled_request_notifies_processing_server():
+    async def run():
+        received = []
+        got_cancel = asyncio.Event()
+
+        async def handle(reader, writer):
+            while True:
+                try:
+                    message = await recv_message_async(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                received.append(message)
+                if message.get("command") == "cancel":
+                    got_cancel.set()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        conn = ProcessingConnection(reader, writer)
+
+        request = asyncio.create_task(conn.request(7, {"url": "https://example.com", "deadline_ms": 500}))
+        await asyncio.sleep(0.05)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        await asyncio.wait_for(got_cancel.wait(), 1)
+
+        assert received[0]["deadline_ms"] == 500
+        assert received[1] == {"command": "cancel", "target": 7}
+
+        await conn.close()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_expired_deadline_is_dropped():
+    reply = server_processing.submit_payload({"url": "https://example.com", "deadline_ms": 0}).result()
+    assert reply["status"] == "error"
+    assert reply["expired"] is True
+
+    with pytest.raises(TimeoutError):
+        server_processing.run_before_deadline(0, server_processing.render_images, "https://example.com")
@@ -0,0 +1,103 @@
+import asyncio
+
+from common.connection_pool import ProcessingConnectionPool
+from common.protocol import PROTOCOL_V1, recv_message_async, send_message_async
+
+
+class FakeServerB:
+    """
+    Servidor B de prueba: junta 'batch' mensajes (de todas sus conexiones)
+    y recién ahí responde, en orden inverso, con el mismo request_id.
+    Con drop_first corta la primera conexión sin responder.
+    """
+
+    def __init__(self, batch=1, drop_first=False):
+        self.batch = batch
+        self.drop_first = drop_first
+        self.connections = 0
+        self.held = []
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        number = self.connections
+        try:
+            while True:
+                message = await recv_message_async(reader)
+                if self.drop_first and number == 1:
+                    break
+                self.held.append((writer, number, message))
+                if len(self.held) >= self.batch:
+                    held, self.held = self.held, []
+                    for out, conn, msg in reversed(held):
+                        reply = {"request_id": msg["request_id"], "echo": msg["n"], "conn": conn}
+                        await send_message_async(out, reply)
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def test_requests_are_multiplexed_by_request_id():
+    async def run():
+        fake = FakeServerB(batch=3)
+        port = await fake.start()
+        pool = ProcessingConnectionPool("127.0.0.1", port, max_size=1, protocol_version=PROTOCOL_V1)
+        try:
+            # Las respuestas llegan en orden inverso por el mismo socket
+            replies = await asyncio.gather(*(pool.request({"n": n}) for n in range(3)))
+            assert [r["echo"] for r in replies] == [0, 1, 2]
+            assert fake.connections == 1
+            assert pool.in_flight == 0
+        finally:
+            await pool.close()
+            await fake.close()
+
+    asyncio.run(run())
+
+
+def test_pool_opens_at_most_max_size_connections():
+    async def run():
+        fake = FakeServerB(batch=6)
+        port = await fake.start()
+        pool = ProcessingConnectionPool("127.0.0.1", port, max_size=2, protocol_version=PROTOCOL_V1)
+        try:
+            replies = await asyncio.gather(*(pool.request({"n": n}) for n in range(6)))
+            assert [r["echo"] for r in replies] == list(range(6))
+            assert fake.connections == 2
+            assert pool.size == 2
+            assert {r["conn"] for r in replies} == {1, 2}
+        finally:
+            await pool.close()
+            await fake.close()
+
+    asyncio.run(run())
+
+
+def test_reconnects_when_the_peer_drops():
+    async def run():
+        fake = FakeServerB(drop_first=True)
+        port = await fake.start()
+        pool = ProcessingConnectionPool("127.0.0.1", port, max_size=1, protocol_version=PROTOCOL_V1)
+        try:
+            # La primera conexión se cae con el pedido en vuelo: se reintenta en otra
+            reply = await pool.request({"n": 7})
+            assert reply == {"echo": 7, "conn": 2}
+            assert pool.size == 1
+
+            reply = await pool.request({"n": 8})
+            assert reply["conn"] == 2
+            assert fake.connections == 2
+        finally:
+            await pool.close()
+            await fake.close()
+
+    asyncio.run(run())
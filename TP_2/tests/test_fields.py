@@ -0,0 +1,31 @@
+import pytest
+
+import server_processing
+from server_scraping import RESPONSE_FIELDS, _select_fields, parse_fields
+
+
+def test_parse_fields():
+    assert parse_fields(None) == RESPONSE_FIELDS
+    # Se respeta el orden canónico, no el del pedido
+    assert parse_fields("performance, scraping_data") == ("scraping_data", "performance")
+    assert parse_fields(["thumbnails"]) == ("thumbnails",)
+
+    for invalid in ("bogus", ",", [], {"a": 1}):
+        with pytest.raises(ValueError):
+            parse_fields(invalid)
+
+
+def test_only_requested_artifacts_are_rendered():
+    assert server_processing.requested_fields({}) == server_processing.ALL_FIELDS
+    assert server_processing.requested_fields({"fields": "thumbnails"}) == ("thumbnails",)
+    with pytest.raises(ValueError):
+        server_processing.requested_fields({"fields": ["scraping_data"]})
+
+    result = server_processing.render_images("https://example.com", fields=("thumbnails",))
+    assert "screenshot" not in result
+    assert "encode_screenshot" not in result["timings"]
+    assert result["thumbnails"]
+
+    # Un Servidor B viejo devuelve todo: A filtra lo que no se pidió
+    full = {"status": "success", "screenshot": b"x", "thumbnails": [b"y"], "thumbnails_info": {}}
+    assert _select_fields(full, ("screenshot",)) == {"status": "success", "screenshot": b"x"}
@@ -0,0 +1,89 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from processor.lanes import LaneFullError, LaneScheduler, parse_lane_values
+
+
+def make_scheduler(**kwargs):
+    executor = ThreadPoolExecutor(max_workers=1)
+    return executor, LaneScheduler(executor, slots=1, **kwargs)
+
+
+def test_parse_lane_values():
+    assert parse_lane_values("interactive=4, batch=1") == {"interactive": 4, "batch": 1}
+    with pytest.raises(ValueError):
+        parse_lane_values("urgente=1")
+
+
+def test_weighted_fair_order_between_lanes():
+    executor, lanes = make_scheduler(weights={"interactive": 3, "batch": 1})
+    gate = threading.Event()
+    order = []
+
+    blocker = lanes.submit("batch", gate.wait)
+    futures = [lanes.submit("batch", order.append, f"b{i}") for i in range(4)]
+    futures += [lanes.submit("interactive", order.append, f"i{i}") for i in range(6)]
+    assert lanes.depth("batch") == 4 and lanes.depth("interactive") == 6
+
+    gate.set()
+    for future in [blocker, *futures]:
+        future.result(timeout=5)
+    executor.shutdown()
+
+    # Aunque el batch llegó primero, salen 3 interactivos por cada batch,
+    # intercalados; cuando no quedan interactivos el batch usa todo el pool
+    assert order == ["i0", "i1", "b0", "i2", "i3", "i4", "b1", "i5", "b2", "b3"]
+
+
+def test_lane_depth_limit_and_cancellation():
+    executor, lanes = make_scheduler(max_depths={"batch": 2})
+    gate = threading.Event()
+
+    blocker = lanes.submit("interactive", gate.wait)
+    first = lanes.submit("batch", lambda: "primero")
+    second = lanes.submit("batch", lambda: "segundo")
+    with pytest.raises(LaneFullError):
+        lanes.submit("batch", lambda: "no entra")
+    # El interactivo no tiene límite por default
+    interactive = lanes.submit("interactive", lambda: "interactivo")
+
+    # Cancelar una tarea en espera libera su lugar en la cola
+    assert second.cancel()
+    third = lanes.submit("batch", lambda: "tercero")
+
+    gate.set()
+    assert [f.result(timeout=5) for f in (first, third, interactive)] == ["primero", "tercero", "interactivo"]
+    blocker.result(timeout=5)
+    executor.shutdown()
+
+    snapshot = lanes.snapshot()["lanes"]["batch"]
+    assert snapshot["rejected"] == 1 and snapshot["cancelled"] == 1 and snapshot["depth"] == 0
+
+
+def test_next_task_is_dispatched_off_the_pool_thread():
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pool")
+    submitted_from = []
+    submit = executor.submit
+
+    def recording_submit(fn, *args):
+        submitted_from.append(threading.current_thread().name)
+        return submit(fn, *args)
+
+    executor.submit = recording_submit
+    lanes = LaneScheduler(executor, slots=1)
+    gate = threading.Event()
+
+    blocker = lanes.submit("interactive", gate.wait)
+    second = lanes.submit("interactive", lambda: "segundo")
+    gate.set()
+    assert second.result(timeout=5) == "segundo"
+    blocker.result(timeout=5)
+    lanes.close()
+    executor.shutdown()
+
+    # El primero se envía desde submit; el segundo, desde el hilo del
+    # scheduler y no desde el callback del pool
+    assert submitted_from[0] == threading.current_thread().name
+    assert submitted_from[1].startswith("lanes")
@@ -0,0 +1,19 @@
+from benchmarks.load_test import percentile
+
+
+def test_percentile_uses_nearest_rank():
+    assert percentile([], 50) is None
+
+    even = [1, 2, 3, 4, 5, 6]
+    assert percentile(even, 50) == 3
+    assert percentile(even, 95) == 6
+    assert percentile(even, 0) == 1
+
+    odd = [1, 2, 3, 4, 5]
+    assert percentile(odd, 50) == 3
+    assert percentile(odd, 20) == 1
+    assert percentile(odd, 21) == 2
+    assert percentile(odd, 100) == 5
+
+    values = list(range(1, 101))
+    assert [percentile(values, q) for q in (7, 50, 95, 99)] == [7, 50, 95, 99]
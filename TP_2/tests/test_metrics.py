@@ -0,0 +1,47 @@
+import pytest
+
+from common.metrics import MetricsRegistry, _Metric
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry(prefix="test_")
+    stages = registry.histogram("stage_seconds", "Etapas", ("stage",), buckets=(0.1, 1.0))
+    stages.observe(0.05, stage="fetch_html")
+    stages.observe(0.5, stage="fetch_html")
+    stages.observe(3.0, stage="fetch_html")
+
+    text = registry.render()
+
+    assert "# TYPE test_stage_seconds histogram" in text
+    assert 'test_stage_seconds_bucket{stage="fetch_html",le="0.1"} 1' in text
+    assert 'test_stage_seconds_bucket{stage="fetch_html",le="1"} 2' in text
+    assert 'test_stage_seconds_bucket{stage="fetch_html",le="+Inf"} 3' in text
+    assert 'test_stage_seconds_count{stage="fetch_html"} 3' in text
+
+    snapshot = registry.snapshot()["test_stage_seconds"]["fetch_html"]
+    assert snapshot["count"] == 3
+    assert snapshot["p50_le_s"] == 1.0
+    assert snapshot["p99_le_s"] == "+Inf"
+
+
+def test_gauge_function_and_counter():
+    registry = MetricsRegistry()
+    depth = [0]
+    gauge = registry.gauge("queue_depth", "Cola", ("pool",))
+    gauge.set_function(lambda: depth[0], pool="process")
+    counter = registry.counter("requests_total", "Requests")
+    counter.inc()
+    counter.inc(2)
+
+    depth[0] = 7
+    assert registry.snapshot() == {"queue_depth": {"process": 7.0}, "requests_total": 3.0}
+    assert 'queue_depth{pool="process"} 7' in registry.render()
+
+
+def test_incomplete_metric_fails_on_creation():
+    class OnlySamples(_Metric):
+        def samples(self):
+            return []
+
+    with pytest.raises(TypeError):
+        OnlySamples("incompleta", "Sin snapshot")
@@ -0,0 +1,73 @@
+import asyncio
+
+from aiohttp import ClientSession, web
+
+from scraper.async_http import fetch_html
+from scraper.page_cache import PageCache
+
+
+PAGE = "<html><head><title>Hola</title></head><body><h1>x</h1></body></html>"
+
+
+async def start_origin(hits):
+    async def page(request):
+        hits.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304, headers={"ETag": '"v1"'})
+        return web.Response(text=PAGE, content_type="text/html", headers={"ETag": '"v1"'})
+
+    async def redirect(request):
+        raise web.HTTPFound("/page")
+
+    app = web.Application()
+    app.router.add_get("/page", page)
+    app.router.add_get("/old", redirect)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def test_conditional_get_reuses_extraction(tmp_path):
+    async def run():
+        hits = []
+        runner, base = await start_origin(hits)
+        cache = PageCache(1024 * 1024, disk_dir=str(tmp_path))
+        try:
+            async with ClientSession() as session:
+                html, info = await fetch_html(f"{base}/old", session)
+                assert info["etag"] == '"v1"'
+                assert cache.store(f"{base}/old", {"title": "Hola"}, info)
+
+                # La entrada queda indexada por la URL final (tras el redirect)
+                entry = cache.lookup(f"{base}/old")
+                assert entry["final_url"] == f"{base}/page"
+                headers = PageCache.conditional_headers(entry)
+                html, info = await fetch_html(f"{base}/old", session, headers=headers)
+                assert info["status"] == 304 and html == ""
+
+                reported = cache.revalidated(f"{base}/old", entry, info)
+                assert reported["cached"] is True
+                assert reported["final_url"] == f"{base}/page"
+                assert entry["scraping_data"] == {"title": "Hola"}
+        finally:
+            await runner.cleanup()
+
+        assert hits == [None, '"v1"']
+        assert cache.get_stats()["revalidated"] == 1
+
+        # El nivel en disco sobrevive a un cache nuevo (otro proceso)
+        again = PageCache(1024 * 1024, disk_dir=str(tmp_path))
+        assert again.lookup(f"{base}/old")["etag"] == '"v1"'
+
+    asyncio.run(run())
+
+
+def test_responses_without_validators_are_not_cached():
+    cache = PageCache(1024 * 1024)
+    info = {"status": 200, "final_url": "https://example.com/", "etag": None, "last_modified": None}
+    assert not cache.store("https://example.com/", {"title": "x"}, info)
+    assert cache.lookup("https://example.com/") is None
+    assert cache.get_stats()["uncacheable"] == 1
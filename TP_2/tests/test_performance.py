@@ -0,0 +1,128 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from processor.performance import AsyncPerformanceAnalyzer, find_subresources
+
+
+PAGE = b"""
+<html>
+  <head>
+    <link rel="stylesheet" href="/style.css">
+    <link rel="icon" href="/favicon.ico">
+    <script src="/app.js"></script>
+  </head>
+  <body>
+    <img src="/logo.png">
+    <img src="/logo.png">
+    <img src="/falta.png">
+    <img src="data:image/png;base64,AAAA">
+  </body>
+</html>
+"""
+
+FILES = {
+    "/": (PAGE, "text/html; charset=utf-8"),
+    "/style.css": (b"body { color: red; }" * 10, "text/css"),
+    "/app.js": (b"console.log(1);" * 100, "application/javascript"),
+    "/logo.png": (b"\x89PNG" + b"\x00" * 500, "image/png"),
+    "/nuevo/": (b'<img src="foto.png"><script src="../app.js"></script>', "text/html"),
+    "/nuevo/foto.png": (b"\x89PNG", "image/png"),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/viejo":
+            self.send_response(301)
+            self.send_header("Location", "/nuevo/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path not in FILES:
+            self.send_error(404)
+            return
+        body, content_type = FILES[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _analyze(url, **kwargs):
+    async def run():
+        analyzer = AsyncPerformanceAnalyzer(timeout=5, **kwargs)
+        try:
+            return await analyzer.analyze(url)
+        finally:
+            await analyzer.close()
+
+    return asyncio.run(run())
+
+
+def test_find_subresources_resolves_and_dedupes():
+    found = find_subresources(PAGE.decode(), "http://host/dir/", limit=10)
+
+    assert found == [
+        ("stylesheet", "http://host/style.css"),
+        ("script", "http://host/app.js"),
+        ("image", "http://host/logo.png"),
+        ("image", "http://host/falta.png"),
+    ]
+
+
+def test_analyzer_reports_waterfall(http_server):
+    perf = _analyze(http_server + "/")
+
+    expected_bytes = sum(len(FILES[path][0]) for path in ("/", "/style.css", "/app.js", "/logo.png"))
+    assert perf["num_requests"] == 5
+    assert perf["failed_requests"] == 1
+    assert perf["total_bytes"] == expected_bytes
+    assert perf["ttfb_ms"] is not None
+
+    by_url = {entry["url"]: entry for entry in perf["waterfall"]}
+    assert by_url[http_server + "/app.js"]["size_bytes"] == len(FILES["/app.js"][0])
+    assert by_url[http_server + "/falta.png"]["status"] == 404
+    for entry in perf["waterfall"]:
+        assert entry["duration_ms"] >= 0
+
+
+def test_analyzer_without_subresources(http_server):
+    perf = _analyze(http_server + "/", fetch_subresources=False)
+
+    assert perf["num_requests"] == 1
+    assert perf["total_bytes"] == len(PAGE)
+
+
+def test_analyzer_reports_page_error(http_server):
+    perf = _analyze(http_server + "/no-existe")
+
+    assert perf["load_time_ms"] is None
+    assert "error" in perf
+
+
+def test_subresources_resolve_against_the_final_url(http_server):
+    perf = _analyze(http_server + "/viejo")
+
+    assert perf["waterfall"][0]["final_url"] == http_server + "/nuevo/"
+    assert [entry["url"] for entry in perf["waterfall"][1:]] == [
+        http_server + "/nuevo/foto.png",
+        http_server + "/app.js",
+    ]
+    assert perf["failed_requests"] == 0
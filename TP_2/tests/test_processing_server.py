@@ -0,0 +1,197 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+import server_processing
+from common.protocol import recv_message_async, send_message_async
+from processor.cache import ResultCache
+
+
+@pytest.fixture
+def busy_pool(monkeypatch):
+    """
+    Pool de un solo worker ocupado hasta que se libere el evento: lo que
+    se mande al pool queda esperando.
+    """
+    pool = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    pool.submit(release.wait)
+    monkeypatch.setattr(server_processing, "PROCESS_POOL", pool)
+    yield release
+    release.set()
+    pool.shutdown(wait=True)
+
+
+def test_asyncio_engine_pipelines_and_replies_out_of_order(busy_pool):
+    async def run():
+        server = await asyncio.start_server(
+            server_processing.handle_connection_async, "127.0.0.1", 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            # Dos pedidos seguidos sin esperar respuesta: el primero queda
+            # en el pool, el segundo se responde en el acto
+            await send_message_async(
+                writer, {"request_id": 1, "url": "https://example.com", "fields": ["screenshot"]}
+            )
+            await send_message_async(writer, {"request_id": 2, "command": "ping"})
+
+            first = await asyncio.wait_for(recv_message_async(reader), 5)
+            assert first == {"status": "success", "pong": True, "request_id": 2}
+
+            busy_pool.set()
+            second = await asyncio.wait_for(recv_message_async(reader), 5)
+            assert second["request_id"] == 1
+            assert second["status"] == "success"
+            assert second["screenshot"]
+            assert "thumbnails" not in second
+        finally:
+            writer.close()
+            await writer.wait_closed()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
+
+
+class SlowDiskCache:
+    """
+    Cache con nivel en disco cuya consulta se traba hasta que se libere
+    el evento (como una lectura de disco lenta).
+    """
+
+    has_disk = True
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.lookups = []
+
+    def get_fields(self, url, fields):
+        self.lookups.append(threading.current_thread().name)
+        self.release.wait(5)
+        return {"performance": {"load_time_ms": 5}}
+
+
+def test_asyncio_engine_reads_the_disk_cache_off_the_loop(monkeypatch):
+    cache = SlowDiskCache()
+    monkeypatch.setattr(server_processing, "RESULT_CACHE", cache)
+
+    async def run():
+        server = await asyncio.start_server(
+            server_processing.handle_connection_async, "127.0.0.1", 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            # Mientras la consulta al cache está trabada el loop sigue
+            # atendiendo: el ping responde primero
+            pending = {"url": "https://example.com", "fields": ["performance"]}
+            await send_message_async(writer, {"request_id": 1, **pending})
+            await send_message_async(writer, {"request_id": 2, "command": "ping"})
+            first = await asyncio.wait_for(recv_message_async(reader), 5)
+            assert first == {"status": "success", "pong": True, "request_id": 2}
+
+            # Un pedido se puede cancelar aunque siga consultando el cache
+            await send_message_async(writer, {"request_id": 3, **pending})
+            await send_message_async(writer, {"command": "cancel", "target": 3})
+
+            cache.release.set()
+            second = await asyncio.wait_for(recv_message_async(reader), 5)
+            assert second == {
+                "status": "success",
+                "performance": {"load_time_ms": 5},
+                "cached": True,
+                "request_id": 1,
+            }
+            await send_message_async(writer, {"request_id": 4, "command": "ping"})
+            third = await asyncio.wait_for(recv_message_async(reader), 5)
+            assert third["request_id"] == 4
+        finally:
+            cache.release.set()
+            writer.close()
+            await writer.wait_closed()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
+    assert len(cache.lookups) == 2
+    assert threading.main_thread().name not in cache.lookups
+
+
+def test_partial_cache_hit_only_computes_missing_fields(monkeypatch):
+    cache = ResultCache(max_bytes=1024 * 1024)
+    cache.put("https://example.com", {"status": "success", "performance": {"load_time_ms": 5}})
+    monkeypatch.setattr(server_processing, "RESULT_CACHE", cache)
+    # Sin IO_POOL ni analizador: si se pidiera la performance fallaría
+    monkeypatch.setattr(server_processing, "IO_POOL", None)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        monkeypatch.setattr(server_processing, "PROCESS_POOL", pool)
+        reply = server_processing.submit_payload({"url": "https://example.com/"}).result(5)
+
+        assert reply["status"] == "success"
+        assert reply["performance"] == {"load_time_ms": 5}
+        assert reply["screenshot"] and len(reply["thumbnails"]) == 2
+        assert len(reply["thumbnails_info"]) == 2
+        assert "timings" not in reply
+        assert cache.get_stats()["partial_hits"] == 1
+
+        # Ahora está todo en cache: no se usa ningún pool
+        again = server_processing.submit_payload({"url": "https://example.com"}).result(0)
+        assert again["cached"] is True
+        assert {k: again[k] for k in reply} == reply
+
+
+def test_merge_jobs_combines_sub_jobs_with_cache():
+    images, performance = Future(), Future()
+    merged = server_processing._merge_jobs(
+        "https://example.com",
+        {"screenshot": b"cacheado"},
+        {"images": images, "performance": performance},
+    )
+    images.set_result({"thumbnails": [b"t"], "timings": {"create_thumbnails": 0.01}})
+    assert not merged.done()
+    performance.set_result({"performance": {"load_time_ms": 1}})
+
+    assert merged.result(0) == {
+        "status": "success",
+        "screenshot": b"cacheado",
+        "thumbnails": [b"t"],
+        "performance": {"load_time_ms": 1},
+    }
+
+
+def test_merge_jobs_writes_the_cache_from_the_writer_thread(monkeypatch):
+    written = []
+
+    class RecordingCache:
+        def put(self, url, result):
+            written.append((threading.current_thread().name, url, result))
+
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-writer")
+    monkeypatch.setattr(server_processing, "RESULT_CACHE", RecordingCache())
+    monkeypatch.setattr(server_processing, "CACHE_WRITER", writer)
+
+    images = Future()
+    merged = server_processing._merge_jobs("https://example.com", {}, {"images": images})
+    images.set_result({"screenshot": b"s"})
+    assert merged.result(0) == {"status": "success", "screenshot": b"s"}
+
+    writer.shutdown(wait=True)
+    assert written == [("cache-writer_0", "https://example.com", {"status": "success", "screenshot": b"s"})]
+
+
+def test_merge_jobs_reports_failed_or_expired_sub_jobs():
+    images, performance = Future(), Future()
+    merged = server_processing._merge_jobs("https://example.com", {}, {"images": images, "performance": performance})
+    images.set_result({"screenshot": b"s"})
+    performance.set_exception(RuntimeError("sin red"))
+    assert merged.result(0) == {"status": "error", "error": "sin red"}
+
+    images = Future()
+    merged = server_processing._merge_jobs("https://example.com", {}, {"images": images})
+    images.set_exception(TimeoutError("Deadline vencido antes de empezar"))
+    assert merged.result(0)["expired"] is True
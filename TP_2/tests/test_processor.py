@@ -1,3 +1,10 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageChops, ImageDraw
+
+from processor.image_processor import ThumbnailConfig, create_thumbnails_with_timings
+from processor.screenshot import generate_dummy_screenshot
 from scraper.html_parser import extract_scraping_data
 
 
@@ -24,3 +31,50 @@ def test_extract_scraping_data_basic():
     assert data["structure"]["h1"] == 1
     assert len(data["links"]) == 2
     assert "description" in {k.lower() for k in data["meta_tags"].keys()}
+
+
+def test_thumbnails_cascade_keeps_requested_order():
+    img = generate_dummy_screenshot("https://example.com")
+    config = ThumbnailConfig(sizes=((100, 75), (400, 300)), format="JPEG", quality=70)
+
+    thumbs, info = create_thumbnails_with_timings(img, config)
+
+    assert [entry["size"] for entry in info] == [[100, 75], [400, 300]]
+    for data, entry in zip(thumbs, info):
+        decoded = Image.open(BytesIO(data))
+        assert decoded.format == "JPEG"
+        assert list(decoded.size) == entry["size"]
+        assert entry["bytes"] == len(data)
+        assert entry["encode_ms"] >= 0
+
+
+@pytest.mark.parametrize("sizes", [
+    ((400, 300), (350, 350)),
+    ((600, 200), (300, 300)),
+    ((100, 500), (500, 100), (1000, 1000), (333, 222)),
+])
+def test_thumbnails_fit_boxes_that_are_not_nested(sizes):
+    img = generate_dummy_screenshot("https://example.com")
+    config = ThumbnailConfig(sizes=sizes)
+
+    thumbs, info = create_thumbnails_with_timings(img, config)
+
+    for box, data, entry in zip(sizes, thumbs, info):
+        # Mismo tamaño que reduciendo el original directamente
+        expected = img.copy()
+        expected.thumbnail(box)
+        assert entry["size"] == list(expected.size)
+        assert Image.open(BytesIO(data)).size == expected.size
+
+
+def test_screenshot_template_matches_full_render():
+    url = "https://example.com/path?q=1"
+    expected = Image.new("RGB", (800, 600), color=(255, 255, 255))
+    ImageDraw.Draw(expected).text((20, 20), f"Screenshot of:\n{url}", fill=(0, 0, 0))
+
+    first = generate_dummy_screenshot(url)
+    second = generate_dummy_screenshot(url)
+
+    assert ImageChops.difference(expected, first).getbbox() is None
+    # La plantilla no se modifica entre renders
+    assert ImageChops.difference(first, second).getbbox() is None
@@ -0,0 +1,64 @@
+import base64
+import socket
+
+import pytest
+
+from common.protocol import (
+    MessageTooLargeError,
+    PROTOCOL_V1,
+    PROTOCOL_V2,
+    accepted_codec,
+    accepted_version,
+    hello_message,
+    negotiate_version,
+    recv_message_sync,
+    send_message_sync,
+)
+from common.serialization import available_codecs
+
+
+def _roundtrip(obj, version, codec="json"):
+    a, b = socket.socketpair()
+    try:
+        send_message_sync(a, obj, version, codec)
+        return recv_message_sync(b, version)
+    finally:
+        a.close()
+        b.close()
+
+
+@pytest.mark.parametrize("codec", available_codecs())
+def test_v2_sends_raw_attachments(codec):
+    png = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+    msg = {"status": "success", "screenshot": png, "thumbnails": [png[:10], png[:5]]}
+
+    assert _roundtrip(msg, PROTOCOL_V2, codec) == msg
+
+
+def test_v1_keeps_base64_for_old_peers():
+    png = b"\x89PNG\r\n"
+    received = _roundtrip({"screenshot": png, "request_id": 7}, PROTOCOL_V1)
+
+    assert received == {"screenshot": base64.b64encode(png).decode("ascii"), "request_id": 7}
+
+
+def test_hello_negotiation():
+    reply, version, codec = negotiate_version(hello_message(codecs=["no-existe", "json"]))
+    assert version == PROTOCOL_V2
+    assert codec == "json"
+    assert accepted_version(reply) == PROTOCOL_V2
+    assert accepted_codec(reply) == "json"
+
+    # Un servidor viejo responde un error sin protocol_version -> v1
+    assert accepted_version({"status": "error", "error": "Falta campo 'url'"}) == PROTOCOL_V1
+
+
+def test_oversized_frame_is_rejected_before_reading_body():
+    a, b = socket.socketpair()
+    try:
+        send_message_sync(a, {"screenshot": bytes(2048)}, PROTOCOL_V2)
+        with pytest.raises(MessageTooLargeError):
+            recv_message_sync(b, PROTOCOL_V2, max_size=1024)
+    finally:
+        a.close()
+        b.close()
@@ -0,0 +1,59 @@
+import asyncio
+
+from scraper.scheduler import FairScheduler, host_key
+
+
+def test_host_key():
+    assert host_key("https://Example.com/a?b=1") == "example.com"
+    assert host_key("http://example.com:8080/") == "example.com:8080"
+
+
+def test_slow_host_does_not_starve_others():
+    async def run():
+        scheduler = FairScheduler(concurrency=2)
+        order = []
+        release = asyncio.Event()
+
+        async def job(host, name):
+            await scheduler.acquire(host)
+            order.append(name)
+            try:
+                await release.wait()
+            finally:
+                scheduler.release(host)
+
+        # Un host lento encola muchos pedidos antes que el otro
+        tasks = [asyncio.create_task(job("slow", f"slow-{i}")) for i in range(6)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(job("fast", "fast-0")))
+        await asyncio.sleep(0)
+        assert order == ["slow-0", "slow-1"]
+
+        release.set()
+        await asyncio.gather(*tasks)
+        # Con el primer lugar libre se atiende al otro host, no al siguiente del lento
+        assert order.index("fast-0") == 2
+        assert scheduler.active == 0 and scheduler.waiting == 0
+
+    asyncio.run(run())
+
+
+def test_per_host_cap_and_cancellation():
+    async def run():
+        scheduler = FairScheduler(concurrency=4, per_key=1)
+        await scheduler.acquire("a")
+        assert scheduler.would_wait("a")
+        assert not scheduler.would_wait("b")
+
+        waiter = asyncio.create_task(scheduler.acquire("a"))
+        await asyncio.sleep(0)
+        assert scheduler.snapshot()["busiest_hosts"][0] == {"host": "a", "active": 1, "waiting": 1}
+
+        # Un waiter cancelado no se lleva el lugar
+        waiter.cancel()
+        scheduler.release("a")
+        await asyncio.sleep(0)
+        assert waiter.cancelled()
+        assert scheduler.active == 0 and scheduler.waiting == 0
+
+    asyncio.run(run())
@@ -1,4 +1,7 @@
-from scraper.html_parser import extract_scraping_data
+import pytest
+
+from scraper.html_parser import extract_scraping_data, get_extractor
+from scraper.stream_parser import extract_scraping_data_stream
 
 
 def test_extract_scraping_data_basic():
@@ -24,3 +27,49 @@ def test_extract_scraping_data_basic():
     assert data["structure"]["h1"] == 1
     assert len(data["links"]) == 2
     assert "description" in {k.lower() for k in data["meta_tags"].keys()}
+
+
+EQUIVALENCE_DOCS = [
+    """
+    <html>
+      <head>
+        <title>  Pagina &amp; Prueba  </title>
+        <meta name="description" content="Descripcion">
+        <meta name="Keywords" content="a, b">
+        <meta property="og:title" content="OG titulo">
+        <meta property="og:image" content="">
+        <meta name="viewport" content="width=device-width">
+        <meta charset="utf-8">
+      </head>
+      <body>
+        <h1>Uno</h1><h2>Dos</h2><h2>Dos bis</h2><h6>Seis</h6>
+        <a href="/relativo">rel</a>
+        <a href="https://example.com/?a=1&amp;b=2">abs</a>
+        <a href="">vacio</a>
+        <a name="ancla">sin href</a>
+        <img src="a.png"><img src="b.png"/>
+        <script>var s = "<a href='x'>no cuenta</a><img>";</script>
+      </body>
+    </html>
+    """,
+    "<html><head><title></title></head><body><p>Sin título</p></body></html>",
+    "<p>Fragmento <a href='x.html'>link</a> <img src='i.png'> <h3>h3</h3>",
+    "",
+    # El contenido de <title>, <textarea>, <iframe>, ... es texto, no tags
+    "<html><head><title>Hola <!-- c --> &amp; <b>mundo</b></title></head></html>",
+    "<title>Sin cerrar <a href='/no'>",
+    "<textarea><a href='/no'>x</a><img src='x.png'><h1>y</h1></textarea><a href='/si'>si</a>",
+    "<iframe><a href='/no'>x</a><img src='x.png'></iframe><xmp><h2>no</h2></xmp><a href='/si'>si</a>",
+    "<p><a href='/si'>si</a><plaintext><a href='/no'>no</a></plaintext><img src='x.png'>",
+]
+
+
+@pytest.mark.parametrize("html", EQUIVALENCE_DOCS)
+def test_stream_extractor_matches_bs4(html):
+    assert extract_scraping_data_stream(html) == extract_scraping_data(html)
+
+
+def test_get_extractor_rejects_unknown_backend():
+    assert get_extractor("stream") is extract_scraping_data_stream
+    with pytest.raises(ValueError):
+        get_extractor("regex")
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from scraper.admission import AdmissionController
+from scraper.html_parser import get_extractor
+from server_scraping import create_app, parse_html, run_pipeline
+
+
+async def start_client(**kwargs):
+    kwargs.setdefault("probe_interval", 0)
+    app = create_app(workers=2, processing_host="127.0.0.1", processing_port=1, **kwargs)
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    return client
+
+
+def test_invalid_url_is_rejected_with_400():
+    async def run():
+        client = await start_client()
+        try:
+            resp = await client.get("/scrape", params={"url": "http://127.0.0.1:abc/x"})
+            assert resp.status == 400
+            body = await resp.json()
+            assert body["status"] == "error"
+            assert "URL inválida" in body["error"]
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+
+
+async def start_origin(stats):
+    """
+    Sitio de prueba: /page?d=S tarda S segundos en responder; registra
+    cuántas descargas hay en curso a la vez.
+    """
+    async def page(request):
+        stats["active"] += 1
+        stats["max_active"] = max(stats["max_active"], stats["active"])
+        try:
+            await asyncio.sleep(float(request.query.get("d", 0)))
+        finally:
+            stats["active"] -= 1
+        title = request.query.get("t", "ok")
+        return web.Response(text=f"<html><title>{title}</title></html>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/page", page)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def failing_extractor(html):
+    data = get_extractor("bs4")(html)
+    if data["title"] == "boom":
+        raise ValueError("extractor roto")
+    return data
+
+
+async def post_batch(client, urls):
+    resp = await client.post("/scrape/batch", json=urls, params={"fields": "scraping_data"})
+    assert resp.status == 200
+    return [json.loads(line) for line in (await resp.text()).splitlines()]
+
+
+def test_batch_streams_in_completion_order_and_keeps_going_after_errors():
+    async def run():
+        origin = await start_origin({"active": 0, "max_active": 0})
+        client = await start_client(page_cache_bytes=0)
+        client.app["extractor"] = failing_extractor
+        base = str(origin.make_url("/page"))
+        try:
+            lines = await post_batch(client, [
+                f"{base}?d=0.3&t=lenta",
+                f"{base}?t=rapida",
+                "http://127.0.0.1:abc/x",
+                f"{base}?t=boom",
+                42,
+            ])
+            # La URL lenta sale última aunque se pidió primero
+            assert len(lines) == 5
+            assert lines[-1]["scraping_data"]["title"] == "lenta"
+            by_status = sorted((line["http_status"], line.get("url", "")) for line in lines)
+            assert by_status == [
+                (200, f"{base}?d=0.3&t=lenta"),
+                (200, f"{base}?t=rapida"),
+                (400, ""),
+                (400, "http://127.0.0.1:abc/x"),
+                (500, f"{base}?t=boom"),
+            ]
+            boom = next(line for line in lines if line["http_status"] == 500)
+            assert boom == {
+                "url": f"{base}?t=boom",
+                "status": "error",
+                "error": "extractor roto",
+                "http_status": 500,
+            }
+        finally:
+            await client.close()
+            await origin.close()
+
+    asyncio.run(run())
+
+
+def test_batch_caps_urls_in_flight():
+    async def run():
+        stats = {"active": 0, "max_active": 0}
+        origin = await start_origin(stats)
+        # La admisión dejaría 8 a la vez; la ventana del batch es de 2
+        client = await start_client(page_cache_bytes=0)
+        client.app["admission"] = AdmissionController(concurrency=8)
+        client.app["batch_window"] = 2
+        base = str(origin.make_url("/page"))
+        try:
+            urls = [f"{base}?d=0.05&t={i}" for i in range(8)]
+            lines = await post_batch(client, urls)
+            assert sorted(line["url"] for line in lines) == sorted(urls)
+            assert stats["max_active"] == 2
+        finally:
+            await client.close()
+            await origin.close()
+
+    asyncio.run(run())
+
+
+def test_batch_rejects_invalid_body_before_streaming():
+    async def run():
+        client = await start_client()
+        try:
+            resp = await client.post("/scrape/batch", json={"no": "urls"})
+            assert resp.status == 400
+            assert "Body inválido" in (await resp.json())["error"]
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+
+
+def extract_with_pid(html):
+    data = get_extractor("bs4")(html)
+    data["pid"] = os.getpid()
+    return data
+
+
+def test_large_documents_are_parsed_in_the_pool():
+    async def run():
+        app = create_app(
+            workers=1, processing_host="127.0.0.1", processing_port=1,
+            parse_workers=1, parse_inline_threshold=1000,
+        )
+        app["extractor"] = extract_with_pid
+        small = "<html><title>chica</title><h1>x</h1><a href='/a'>a</a></html>"
+        large = small.replace("</html>", "<p>relleno</p>" * 200 + "</html>")
+
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            app["parse_executor"] = executor
+            inline = await parse_html(app, small)
+            pooled = await parse_html(app, large)
+
+        assert inline.pop("pid") == os.getpid()
+        assert pooled.pop("pid") != os.getpid()
+        # Mismo resultado que el extractor corriendo inline
+        assert inline == get_extractor("bs4")(small)
+        assert pooled == get_extractor("bs4")(large)
+        assert pooled == inline
+
+    asyncio.run(run())
+
+
+class DeadlineProcessing:
+    """
+    Servidor B de prueba: tarda 'delay' segundos y, como el real, vence
+    el pedido si su deadline_ms no alcanza.
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.payloads = []
+
+    async def request(self, payload, key=None):
+        self.payloads.append(payload)
+        await asyncio.sleep(self.delay)
+        if payload["deadline_ms"] < self.delay * 1000:
+            return {"status": "error", "error": "Deadline vencido", "expired": True}
+        return {"status": "success", "screenshot": b"png"}
+
+
+def test_follower_retries_when_the_shared_call_expires_with_the_leaders_deadline():
+    async def run():
+        app = create_app(workers=1, processing_host="127.0.0.1", processing_port=1)
+        fake = DeadlineProcessing(delay=0.1)
+        app["processing_pool"] = fake
+        now = asyncio.get_running_loop().time()
+
+        fields = ("screenshot",)
+        leader = asyncio.create_task(run_pipeline(app, "https://example.com", now + 0.05, fields=fields))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(run_pipeline(app, "https://example.com", now + 5, fields=fields))
+        (_, hurried), (_, patient) = await asyncio.gather(leader, follower)
+
+        assert hurried["processing_data"]["expired"] is True
+        assert patient["processing_data"] == {"status": "success", "screenshot": "cG5n"}
+        # Un solo pedido compartido más el reintento del que tenía tiempo
+        assert len(fake.payloads) == 2
+        assert fake.payloads[1]["deadline_ms"] > 4000
+
+    asyncio.run(run())
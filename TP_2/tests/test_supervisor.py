@@ -0,0 +1,96 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from scraper.supervisor import reuse_port_supported
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def serve(directory, port, sock, ready):
+    """
+    Worker de prueba: escucha con SO_REUSEPORT, responde su pid y deja
+    registro de cuándo arrancó y de si terminó limpio con SIGTERM.
+    """
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    listener.bind(("127.0.0.1", port))
+    listener.listen()
+    listener.settimeout(0.05)
+    Path(directory, f"started-{os.getpid()}").touch()
+    ready.set()
+
+    while not stopping:
+        try:
+            conn, _ = listener.accept()
+        except (socket.timeout, InterruptedError):
+            continue
+        with conn:
+            conn.sendall(str(os.getpid()).encode())
+    listener.close()
+    Path(directory, f"stopped-{os.getpid()}").touch()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _pids(directory, prefix):
+    return {int(path.name.split("-")[1]) for path in Path(directory).glob(f"{prefix}-*")}
+
+
+def _wait_for(condition, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.05)
+    raise AssertionError("Tiempo agotado esperando al supervisor")
+
+
+@pytest.mark.skipif(not reuse_port_supported(), reason="SO_REUSEPORT no disponible")
+def test_supervisor_starts_restarts_and_stops_workers(tmp_path):
+    port = _free_port()
+    script = (
+        "from scraper.supervisor import Supervisor\n"
+        "from tests.test_supervisor import serve\n"
+        f"Supervisor(serve, ({str(tmp_path)!r}, {port}), procs=2, stop_timeout=5).run()\n"
+    )
+    supervisor = subprocess.Popen(
+        [sys.executable, "-c", script],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        # Arranque: dos workers escuchando en el mismo puerto
+        _wait_for(lambda: len(_pids(tmp_path, "started")) == 2)
+        first = _pids(tmp_path, "started")
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as conn:
+            assert int(conn.recv(32)) in first
+
+        # Un worker que muere se reemplaza
+        crashed = min(first)
+        os.kill(crashed, signal.SIGKILL)
+        _wait_for(lambda: len(_pids(tmp_path, "started")) == 3)
+        alive = _pids(tmp_path, "started") - {crashed}
+
+        # Apagado ordenado: los workers vivos terminan limpio con SIGTERM
+        supervisor.send_signal(signal.SIGTERM)
+        assert supervisor.wait(timeout=15) == 0
+        assert _pids(tmp_path, "stopped") == alive
+    finally:
+        if supervisor.poll() is None:
+            supervisor.kill()
+            supervisor.wait()